@@ -6,6 +6,7 @@ from admin_panel.backend.routers.admin_users import router as users_router
 from admin_panel.backend.routers.admin_samples import router as samples_router
 from admin_panel.backend.routers.admin_multi_prompts import router as multi_prompts_router
 from admin_panel.backend.routers.admin_upload import router as upload_router
+from admin_panel.backend.routers.admin_exports import router as exports_router
 from admin_panel.backend.core.config import settings
 from database.engine import create_db
 
@@ -41,3 +42,4 @@ app.include_router(stats_router)
 app.include_router(users_router)
 app.include_router(samples_router)
 app.include_router(upload_router)
+app.include_router(exports_router)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import re
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from admin_panel.backend.core.auth import admin_auth
+from database.crud import admin_list_reports_for_export
+from services import report_export
+
+router = APIRouter(prefix="/admin/exports", tags=["Admin Exports"])
+
+_EXPORT_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+
+
+class ReportExportRequest(BaseModel):
+    user_ids: List[int] = Field(default_factory=list)
+    channel_ids: List[str] = Field(default_factory=list)
+    analysis_types: List[str] = Field(default_factory=list)
+    limit: int = Field(500, ge=1, le=5000)
+
+
+def _check_export(export_id: str) -> None:
+    if not _EXPORT_ID_RE.match(export_id) or report_export.load_manifest(export_id) is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+
+
+@router.post("/reports", response_model=dict)
+async def create_report_export(payload: ReportExportRequest, _: None = Depends(admin_auth)):
+    rows = await admin_list_reports_for_export(
+        user_ids=payload.user_ids or None,
+        channel_ids=payload.channel_ids or None,
+        analysis_types=payload.analysis_types or None,
+        limit=payload.limit,
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="No reports match the selection")
+    export = report_export.create_export(rows)
+    export["download_url"] = f"{router.prefix}/reports/{export['export_id']}.zip"
+    return export
+
+
+@router.get("/reports/{export_id}.zip")
+async def download_report_export(export_id: str, request: Request, _: None = Depends(admin_auth)):
+    """ZIP download: streamed while it is being built, ranged/resumable once complete."""
+    _check_export(export_id)
+    filename = f"reports_{export_id}.zip"
+
+    # A resumed download needs stable offsets, i.e. the finished file
+    if request.headers.get("range") or report_export.zip_path(export_id).exists():
+        path = await report_export.wait_for_export(export_id)
+        return FileResponse(path, media_type="application/zip", filename=filename)
+
+    return StreamingResponse(
+        report_export.stream_export(export_id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/reports/{export_id}", response_model=dict)
+async def get_report_export(export_id: str, _: None = Depends(admin_auth)):
+    _check_export(export_id)
+    return report_export.export_status(export_id)
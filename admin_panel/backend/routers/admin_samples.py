@@ -20,6 +20,9 @@ class SampleCreate(BaseModel):
     video_url: str = Field(..., min_length=1)
     video_type: str = "regular"  # regular | shorts
     analysis_data: Dict[str, Any] = Field(default_factory=dict)
+    # Markdown report: rendered to PDF once here, demos then send the stored file
+    report_text: Optional[str] = None
+    analysis_type: Optional[str] = None
 
 
 class SampleOut(BaseModel):
@@ -29,6 +32,8 @@ class SampleOut(BaseModel):
     video_type: str
     analysis_data: Dict[str, Any]
     is_active: bool
+    pdf_path: Optional[str] = None
+    has_telegram_file_id: bool = False
     created_at: Optional[str] = None
 
 
@@ -42,6 +47,8 @@ def _to_out(payload: Dict[str, Any]) -> SampleOut:
         video_type=str(payload.get("video_type") or "regular"),
         analysis_data=payload.get("analysis_data") or {},
         is_active=bool(payload.get("is_active")),
+        pdf_path=payload.get("pdf_path"),
+        has_telegram_file_id=bool(payload.get("telegram_file_id")),
         created_at=created_at,
     )
 
@@ -130,13 +137,28 @@ async def create_sample(
     if data.video_type not in ("regular", "shorts"):
         raise HTTPException(status_code=400, detail="video_type must be regular|shorts")
 
+    analysis_data = dict(data.analysis_data)
+    if data.report_text:
+        analysis_type = data.analysis_type or ("shorts" if data.video_type == "shorts" else "simple")
+        try:
+            pdf_path = await SampleReportsService.render_sample_pdf(data.video_url, data.report_text, analysis_type)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to render PDF: {str(e)}")
+        analysis_data.update({
+            "pdf_path": pdf_path,
+            "video_id": extract_video_id(data.video_url) or "unknown",
+            "file_size": os.path.getsize(pdf_path),
+            "uploaded_at": datetime.now().isoformat(),
+            "analysis_type": analysis_type,
+        })
+
     new_id = await SampleReportsService.add_sample_report(
         report_name=data.report_name,
         video_url=data.video_url,
-        analysis_data=data.analysis_data,
+        analysis_data=analysis_data,
         video_type=data.video_type,
     )
-    return {"id": new_id, "status": "created"}
+    return {"id": new_id, "status": "created", "analysis_data": analysis_data}
 
 
 @router.post("/{sample_id}/toggle")
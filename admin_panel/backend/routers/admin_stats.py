@@ -1,31 +1,24 @@
+import asyncio
+
 from fastapi import APIRouter, Depends
 from admin_panel.backend.core.auth import admin_auth
-from database.crud import (
-    get_total_users,
-    get_total_videos,
-    get_total_ai_requests,
-    get_users_today,
-    get_videos_today,
-    get_ai_requests_today,
-    get_analysis_type_stats,
-    get_top_active_users,
-    get_recent_videos,
-)
+from database.crud import get_top_active_users, get_recent_videos
+from services.admin_stats_service import get_daily_series, get_dashboard_stats
+from services.retry_policy import get_retry_policy
+from services.tracing import exporter
 
 router = APIRouter(prefix="/admin/stats", tags=["Admin Stats"])
 
 
 @router.get("")
 async def get_stats(_: str = Depends(admin_auth)):
-    return {
-        "total_users": await get_total_users(),
-        "total_videos": await get_total_videos(),
-        "total_requests": await get_total_ai_requests(),
-        "users_today": await get_users_today(),
-        "videos_today": await get_videos_today(),
-        "requests_today": await get_ai_requests_today(),
-        "analysis_types": await get_analysis_type_stats(),
-    }
+    return await get_dashboard_stats()
+
+
+@router.get("/series")
+async def daily_series(days: int = 30, _: str = Depends(admin_auth)):
+    """Per-day new users, videos and AI requests (UTC days, zero-filled)."""
+    return await get_daily_series(days)
 
 
 @router.get("/top-users")
@@ -36,3 +29,21 @@ async def top_users(limit: int = 10, _: str = Depends(admin_auth)):
 @router.get("/recent-videos")
 async def recent_videos(limit: int = 10, _: str = Depends(admin_auth)):
     return await get_recent_videos(limit)
+
+
+@router.get("/latency")
+async def stage_latency(hours: int = 24 * 7, limit_per_stage: int = 500, _: str = Depends(admin_auth)):
+    """Per-stage p50/p95 of recent analysis runs (from the local span store)."""
+    stages = await asyncio.to_thread(
+        exporter.stage_latency_stats,
+        since_hours=hours,
+        limit_per_stage=limit_per_stage,
+    )
+    return {"hours": hours, "stages": stages}
+
+
+@router.get("/retry-policy")
+async def retry_policy(_: str = Depends(admin_auth)):
+    """Per-module retry success statistics and the resulting retry budget."""
+    policy = await get_retry_policy()
+    return policy.summary()
@@ -25,6 +25,11 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class UserPage(BaseModel):
+    items: List[UserOut]
+    next_cursor: Optional[str] = None
+
+
 class LimitUpdate(BaseModel):
     limit: int = Field(..., ge=0)
 
@@ -33,14 +38,19 @@ class TariffUpdate(BaseModel):
     tariff: str = Field(..., min_length=1)
 
 
-@router.get("", response_model=List[UserOut])
+@router.get("", response_model=UserPage)
 async def list_users(
     search: str = "",
-    page: int = 1,
+    cursor: Optional[str] = None,
     limit: int = 20,
     _: str = Depends(admin_auth),
 ):
-    return await db_crud.admin_list_users(search=search, page=page, limit=limit)
+    """Newest users first; pass `next_cursor` back as `cursor` for the next page."""
+    try:
+        users, next_cursor = await db_crud.admin_list_users(search=search, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": users, "next_cursor": next_cursor}
 
 
 @router.get("/{user_id}", response_model=UserOut)
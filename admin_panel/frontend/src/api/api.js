@@ -123,8 +123,9 @@ class AdminAPI {
   }
 
   // ==================== USERS ====================
-  static async getUsers({ search = '', page = 1, limit = 20 } = {}) {
-    return this.request(`/admin/users${buildQuery({ search, page, limit })}`);
+  // -> { items, next_cursor }; pass next_cursor back as `cursor` for the next page
+  static async getUsers({ search = '', cursor = null, limit = 20 } = {}) {
+    return this.request(`/admin/users${buildQuery({ search, cursor, limit })}`);
   }
 
   static async getUserById(userId) {
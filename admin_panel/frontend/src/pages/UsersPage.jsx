@@ -17,7 +17,7 @@ const UsersPage = () => {
     setLoading(true);
     try {
       const data = await AdminAPI.getUsers();
-      setUsers(data);
+      setUsers(data.items);
     } catch (error) {
       console.error('Failed to load users:', error);
     } finally {
@@ -0,0 +1,62 @@
+# Middleware overhead per Telegram update (synthetic load, no network/DB)
+#
+#   python bench_middleware.py [--updates N] [--repeat N]
+#
+# Compares AdminMiddleware against the previous implementation, which built
+# Config() (env/.env parsing + ADMIN_IDS regex) for every update.
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from config import Config
+from middlewares.admin_check import AdminMiddleware
+
+
+class ConfigPerUpdateMiddleware(AdminMiddleware):
+    """The old behaviour, kept here as the baseline."""
+
+    async def __call__(self, handler, event, data):
+        config = Config()
+        data['is_admin'] = event.from_user.id in config.ADMIN_IDS
+        return await handler(event, data)
+
+
+async def _noop_handler(event, data):
+    return data['is_admin']
+
+
+async def _run(middleware, events) -> float:
+    t0 = time.perf_counter()
+    for event in events:
+        await middleware(_noop_handler, event, {})
+    return (time.perf_counter() - t0) * 1e6 / len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Mix of regular users and (if configured) admins
+    admin_ids = list(Config().ADMIN_IDS)
+    events = [
+        SimpleNamespace(from_user=SimpleNamespace(id=admin_ids[i % len(admin_ids)] if admin_ids and i % 50 == 0 else 10_000_000 + i))
+        for i in range(args.updates)
+    ]
+    # Config() is slow: the baseline runs on a slice and is reported per update
+    baseline_events = events[: max(1, args.updates // 20)]
+
+    print(f"{'middleware':<28}{'median µs/update':>18}{'min':>10}")
+    for name, middleware, sample in (
+        ("Config() per update", ConfigPerUpdateMiddleware(), baseline_events),
+        ("AdminMiddleware", AdminMiddleware(), events),
+    ):
+        times = [asyncio.run(_run(middleware, sample)) for _ in range(args.repeat)]
+        print(f"{name:<28}{statistics.median(times):>18.2f}{min(times):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# PDF generation benchmarks
+#
+#   python bench_pdf.py styles    [--reports GLOB] [--limit N] [--repeat N]
+#   python bench_pdf.py markdown  [--reports GLOB] [--limit N] [--repeat N] [--min-kb 200] [--baseline-rev REV]
+#   python bench_pdf.py backends  [--reports GLOB] [--limit N] [--repeat N] [--out DIR]
+#
+# Reports are taken from AI response logs (ai_logs/<user>/*response*.txt);
+# the log header written by save_ai_interaction is stripped. The markdown bench
+# compares against services/pdf_generator.py as of --baseline-rev (git show);
+# by default, the parent of the commit that introduced iter_markdown_html.
+import argparse
+import glob
+import re
+import shutil
+import statistics
+import subprocess
+import time
+import types
+from pathlib import Path
+
+from weasyprint import CSS, HTML
+
+from services import pdf_generator as pg
+
+DEFAULT_REPORTS_GLOB = "ai_logs/*/*response*.txt"
+BASELINE_PATH = "services/pdf_generator.py"
+# Added by the single-pass clean_markdown rewrite; its parent is the baseline
+BASELINE_MARKER = "def iter_markdown_html"
+
+
+def load_reports(pattern: str, limit: int) -> list[tuple[str, str]]:
+    reports = []
+    for path in sorted(glob.glob(pattern))[:limit]:
+        text = Path(path).read_text(encoding="utf-8", errors="ignore")
+        # Header: "====\nAI RESPONSE ...\n====\n\n<meta>\n\n====\n\n<body>"
+        parts = text.split("=" * 80 + "\n\n")
+        body = parts[-1] if len(parts) >= 3 else text
+        reports.append((Path(path).name, body))
+    return reports
+
+
+def _timed(fn, repeat: int) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def _print_row(label: str, times: list[float]) -> None:
+    print(
+        f"  {label:<28} median {statistics.median(times):8.1f} ms"
+        f"   min {min(times):8.1f} ms   n={len(times)}"
+    )
+
+
+def bench_styles(reports, repeat: int) -> None:
+    """Per-report render: stylesheet parsed per call vs. cached CSS + FontConfiguration."""
+    for name, body in reports:
+        html = f"<html><body><main class='content'>{pg.clean_markdown(body)}</main></body></html>"
+        print(f"{name} ({len(body) / 1024:.0f} KB)")
+
+        def per_call():
+            HTML(string=html).write_pdf(stylesheets=[CSS(string=pg.REPORT_CSS)])
+
+        def cached():
+            HTML(string=html).write_pdf(
+                stylesheets=[pg.get_report_stylesheet()],
+                font_config=pg.FONT_CONFIG,
+            )
+
+        pg.warm_up()
+        _print_row("CSS parsed per report", _timed(per_call, repeat))
+        _print_row("cached CSS + fonts", _timed(cached, repeat))
+
+
+def _git(*args: str) -> str | None:
+    """stdout of a git command, or None when it fails."""
+    try:
+        result = subprocess.run(["git", *args], capture_output=True, text=True)
+    except FileNotFoundError:
+        raise SystemExit("git is required for the markdown bench")
+    return result.stdout if result.returncode == 0 else None
+
+
+def default_baseline_rev() -> str:
+    """Parent of the commit that introduced BASELINE_MARKER (survives rebases and squashes)."""
+    found = _git("log", "-S", BASELINE_MARKER, "--format=%h", "--reverse", "--", BASELINE_PATH)
+    if not found or not found.split():
+        raise SystemExit(
+            f"Could not find the commit adding '{BASELINE_MARKER}' to {BASELINE_PATH} "
+            f"(shallow clone?); pass --baseline-rev REV"
+        )
+    return found.split()[0] + "^"
+
+
+def load_baseline(rev: str) -> types.ModuleType:
+    """services/pdf_generator.py as of git revision `rev`, imported as a module."""
+    if _git("rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}") is None:
+        raise SystemExit(f"Baseline revision '{rev}' not found in this repository; pass --baseline-rev REV")
+    source = _git("show", f"{rev}:{BASELINE_PATH}")
+    if source is None:
+        raise SystemExit(f"{BASELINE_PATH} does not exist at baseline revision '{rev}'")
+    module = types.ModuleType("pdf_generator_baseline")
+    module.__file__ = f"{rev}:{BASELINE_PATH}"
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+
+def bench_markdown(reports, repeat: int, min_kb: int, baseline_rev: str) -> None:
+    """clean_markdown vs. the implementation at baseline_rev (output must be identical)."""
+    legacy_clean_markdown = load_baseline(baseline_rev).clean_markdown
+
+    mismatches = 0
+    for name, body in reports:
+        if pg.clean_markdown(body) != legacy_clean_markdown(body):
+            mismatches += 1
+            print(f"  ❌ output differs: {name}")
+    print(f"identical output: {len(reports) - mismatches}/{len(reports)} reports")
+
+    # Large synthesis-sized document: corpus concatenated up to min_kb
+    corpus = "\n\n".join(body for _, body in reports)
+    big = corpus
+    while len(big.encode("utf-8")) < min_kb * 1024:
+        big += "\n\n" + corpus
+    assert pg.clean_markdown(big) == legacy_clean_markdown(big)
+    print(f"document: {len(big.encode('utf-8')) / 1024:.0f} KB")
+    _print_row(f"clean_markdown @ {baseline_rev}", _timed(lambda: legacy_clean_markdown(big), repeat))
+    _print_row("streaming clean_markdown", _timed(lambda: pg.clean_markdown(big), repeat))
+
+
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page[^s]")
+
+
+def _page_count(path: Path) -> int:
+    return len(_PDF_PAGE_RE.findall(path.read_bytes()))
+
+
+def _visual_diff(a: Path, b: Path, out: Path, dpi: int = 50) -> float | None:
+    """Rasterize page 1 of both PDFs (pdftoppm) and write a side-by-side + diff PNG.
+
+    Returns the share of differing pixels, or None when pdftoppm/Pillow are missing.
+    """
+    if not shutil.which("pdftoppm"):
+        return None
+    try:
+        from PIL import Image, ImageChops
+    except ImportError:
+        return None
+
+    images = []
+    for pdf in (a, b):
+        prefix = out.with_name(f"{pdf.stem}_p1")
+        subprocess.run(
+            ["pdftoppm", "-png", "-r", str(dpi), "-f", "1", "-l", "1", "-singlefile", str(pdf), str(prefix)],
+            check=True,
+        )
+        images.append(Image.open(f"{prefix}.png").convert("L"))
+
+    size = (max(i.width for i in images), max(i.height for i in images))
+    left, right = (Image.new("L", size, 255) for _ in images)
+    left.paste(images[0], (0, 0))
+    right.paste(images[1], (0, 0))
+    diff = ImageChops.difference(left, right)
+
+    sheet = Image.new("L", (size[0] * 3, size[1]), 255)
+    for i, img in enumerate((left, right, ImageChops.invert(diff))):
+        sheet.paste(img, (size[0] * i, 0))
+    sheet.save(out)
+
+    changed = sum(1 for v in diff.getdata() if v > 32)
+    return changed / (size[0] * size[1])
+
+
+def bench_backends(reports, repeat: int, out_dir: str) -> None:
+    """WeasyPrint vs. ReportLab on the same reports; PDFs (and diff sheets) go to out_dir."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    backends = {name: pg.get_pdf_backend(name) for name in ("weasyprint", "reportlab")}
+    pg.warm_up()
+
+    for name, body in reports:
+        stem = Path(name).stem
+        print(f"{name} ({len(body) / 1024:.0f} KB)")
+        paths = {}
+        for backend_name, backend in backends.items():
+            path = out / f"{stem}.{backend_name}.pdf"
+            paths[backend_name] = path
+            times = _timed(lambda: backend.render(body, "https://youtu.be/bench", "bench", str(path)), repeat)
+            _print_row(f"{backend_name} ({_page_count(path)} pages)", times)
+
+        share = _visual_diff(paths["weasyprint"], paths["reportlab"], out / f"{stem}.diff.png")
+        if share is None:
+            print("  visual diff: skipped (pdftoppm/Pillow not available)")
+        else:
+            print(f"  visual diff page 1: {share:.1%} pixels differ -> {stem}.diff.png")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF generation benchmarks")
+    parser.add_argument("bench", choices=["styles", "markdown", "backends"])
+    parser.add_argument("--reports", default=DEFAULT_REPORTS_GLOB)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-kb", type=int, default=200)
+    parser.add_argument("--out", default="bench_out")
+    parser.add_argument("--baseline-rev", help="git revision to compare clean_markdown against")
+    args = parser.parse_args()
+
+    reports = load_reports(args.reports, args.limit)
+    if not reports:
+        raise SystemExit(f"No reports matched {args.reports}")
+
+    if args.bench == "styles":
+        bench_styles(reports, args.repeat)
+    elif args.bench == "markdown":
+        bench_markdown(reports, args.repeat, args.min_kb, args.baseline_rev or default_baseline_rev())
+    elif args.bench == "backends":
+        bench_backends(reports, args.repeat, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
-from typing import List
+from typing import Dict, List
 
 load_dotenv()
 
@@ -29,6 +29,51 @@ class Config(BaseSettings):
     MONTHLY_RESET_DAYS: int = 30
     DEEPSEEK_API_KEY: str = ""
 
+    # Analysis job queue: bot only enqueues, worker.py processes run the pipeline
+    ANALYSIS_QUEUE_ENABLED: bool = False
+    ANALYSIS_WORKER_CONCURRENCY: int = 2
+
+    # Stage latency tracing (spans exported to a local SQLite file)
+    TRACING_ENABLED: bool = True
+    TRACE_DB_PATH: str = "traces/spans.sqlite"
+
+    # PDF rendering process pool (services/pdf_render_service.py)
+    PDF_RENDER_WORKERS: int = 0  # 0 -> min(4, CPU count)
+    PDF_RENDER_MAX_PENDING: int = 16
+    PDF_RENDER_TIMEOUT_SECONDS: float = 120
+    # Content-hash cache of rendered PDFs (0 disables)
+    PDF_CACHE_DIR: str = "cache/pdf"
+    PDF_CACHE_MAX_MB: int = 500
+    # Analysis types rendered by the lightweight backend instead of WeasyPrint
+    PDF_FAST_BACKEND: str = "reportlab"
+    PDF_FAST_BACKEND_TYPES: List[str] = ["simple", "shorts"]
+
+    # Admin dashboard stats cache (services/admin_stats_service.py): fresh for TTL,
+    # then served stale for up to STALE seconds while one refresh runs in background
+    ADMIN_STATS_TTL_SECONDS: int = 30
+    ADMIN_STATS_STALE_SECONDS: int = 600
+
+    # Report artefact storage (services/artifact_storage.py): local | s3 | memory
+    ARTIFACT_BACKEND: str = "local"
+    ARTIFACT_ROOT: str = "storage"
+    ARTIFACT_S3_BUCKET: str = ""
+    ARTIFACT_S3_ENDPOINT: str = ""  # e.g. MinIO URL; empty -> AWS
+    ARTIFACT_S3_PREFIX: str = ""
+    # Retention per artefact kind in days (0 / missing -> keep forever)
+    ARTIFACT_RETENTION_DAYS: Dict[str, int] = {
+        "report_pdf": 0,
+        "report_txt": 0,
+        "machine_json": 180,
+        "evolution_pdf": 0,
+        "evolution_txt": 0,
+        "ai_log": 30,
+        "comments": 14,
+        "comments_cache": 7,
+        "validation_log": 90,
+        "report_export": 3,
+        "materialized": 7,
+    }
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -45,3 +90,24 @@ class Config(BaseSettings):
 
 
 config = Config()
+
+# Admin lookup for every update (AdminMiddleware, PermissionService): built once,
+# replaced as a whole by reload_config() (SIGHUP, see main.py)
+_admin_ids: frozenset[int] = frozenset(config.ADMIN_IDS)
+
+
+def is_admin(user_id: int) -> bool:
+    return user_id in _admin_ids
+
+
+def reload_config() -> Config:
+    """Re-read env/.env into a new snapshot.
+
+    Only lookups that go through this module (is_admin, config.config) see it;
+    objects that already hold a Config instance keep theirs.
+    """
+    global config, _admin_ids
+    load_dotenv(override=True)
+    config = Config()
+    _admin_ids = frozenset(config.ADMIN_IDS)
+    return config
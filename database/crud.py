@@ -1,5 +1,17 @@
-from sqlalchemy import select, insert, update, delete, func, desc, cast, String
+import asyncio
+import base64
+import re
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import (
+    select, insert, update, delete, func, desc, cast, String, Text, DateTime, text,
+    literal_column, null, true, false, union_all, tuple_, event,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer, undefer_group
 from .models import (
     EvolutionAnalysis,
     User,
@@ -12,8 +24,15 @@ from .models import (
     VideoAnalysisSet,
     AnalysisQualityMarker,
     MultiAnalysisPrompt,
+    AdvancedAnalysisCheckpoint,
+    AnalysisJob,
+    TelegramFile,
+    ChannelMetadata,
+    StatsCounter,
+    UserVideoCount,
+    ChannelAnalysisCount,
 )
-from .engine import async_session
+from .engine import async_session, engine
 from datetime import datetime, timezone, timedelta
 
 
@@ -131,17 +150,125 @@ async def delete_video_by_id(video_id: int) -> None:
         await session.commit()
 
 
-async def _resolve_user(session: AsyncSession, user_identifier: int) -> User:
+# =========================
+# User cache and per-update identity
+# =========================
+
+# Postgres NOTIFY channel for user writes (payload: Telegram user_id or internal id)
+USERS_NOTIFY_CHANNEL = "users_changed"
+USER_CACHE_TTL_SECONDS = 30
+USER_CACHE_SIZE = 10_000
+
+# User of the update being handled (set by middlewares.user_context); inherited
+# by tasks the handler starts, e.g. the analysis pipeline
+_current_user: ContextVar[User | None] = ContextVar("current_user", default=None)
+
+
+class _UserCache:
+    """Detached User snapshots keyed by Telegram user_id, with a short TTL.
+
+    Writes call `notify_user_changed`, so a snapshot is never older than the last
+    write seen by this process (or the TTL, for writes made elsewhere).
+    """
+
+    def __init__(self):
+        self._users: OrderedDict[int, tuple[User, float]] = OrderedDict()
+        # internal users.id -> Telegram user_id
+        self._telegram_ids: dict[int, int] = {}
+        self.version = 0
+
+    def get(self, telegram_id: int) -> User | None:
+        entry = self._users.get(telegram_id)
+        if entry is None:
+            return None
+        user, loaded_at = entry
+        if time.monotonic() - loaded_at > USER_CACHE_TTL_SECONDS:
+            del self._users[telegram_id]
+            return None
+        self._users.move_to_end(telegram_id)
+        return user
+
+    def put(self, user: User, version: int) -> None:
+        # A write since the load started: the row we read may already be stale
+        if version != self.version:
+            return
+        self._users[user.user_id] = (user, time.monotonic())
+        self._users.move_to_end(user.user_id)
+        self._telegram_ids[user.id] = user.user_id
+        while len(self._users) > USER_CACHE_SIZE:
+            self._users.popitem(last=False)
+
+    def invalidate(self, identifier: int | None = None) -> None:
+        """Drop one user (Telegram or internal id) or, with None, everything."""
+        self.version += 1
+        if identifier is None:
+            self._users.clear()
+            return
+        self._users.pop(identifier, None)
+        telegram_id = self._telegram_ids.get(identifier)
+        if telegram_id is not None:
+            self._users.pop(telegram_id, None)
+
+
+_user_cache = _UserCache()
+
+
+@contextmanager
+def user_context(user: User | None):
+    """Make `user` the resolved identity for crud calls inside the block."""
+    token = _current_user.set(user)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+async def _notify(session: AsyncSession, channel: str, payload: str = "") -> None:
+    """pg_notify inside the caller's transaction (delivered at commit)."""
+    if engine.dialect.name == "postgresql":
+        await session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+
+async def notify_user_changed(session: AsyncSession, user_identifier: int) -> None:
+    """Call before commit of any write to `users`.
+
+    The cache is invalidated now (loads already in flight are not cached) and
+    again after the commit (a load between the two read the old row).
+    """
+    _user_cache.invalidate(user_identifier)
+    session.info.setdefault("changed_users", set()).add(user_identifier)
+    await _notify(session, USERS_NOTIFY_CHANNEL, str(user_identifier))
+
+
+def invalidate_user_cache(user_identifier: int | None = None) -> None:
+    _user_cache.invalidate(user_identifier)
+
+
+async def _resolve_user(session: AsyncSession, user_identifier: int | User) -> User:
     """
     Resolves a user by either Telegram user_id (User.user_id) or internal DB id (User.id).
     If not found, creates a minimal user record using the provided identifier as Telegram user_id.
     
     This helper is intentionally defensive because the codebase mixes identifiers.
+    An already resolved `User` (e.g. `db_user` from the middleware) is returned as is,
+    and so is the current update's user when the identifier matches it.
+    Callers only use the returned user's id.
     """
+    if isinstance(user_identifier, User):
+        return user_identifier
+    current = _current_user.get()
+    if current is not None and user_identifier in (current.user_id, current.id):
+        return current
+    cached = _user_cache.get(user_identifier)
+    if cached is not None:
+        return cached
+    version = _user_cache.version
+
     # 1) Try Telegram user id
     res = await session.execute(select(User).where(User.user_id == user_identifier))
     user = res.scalar_one_or_none()
     if user:
+        _user_cache.put(user, version)
         return user
 
     # 2) Try internal DB id
@@ -166,13 +293,23 @@ async def _resolve_user(session: AsyncSession, user_identifier: int) -> User:
     return user
 
 
+def _monthly_reset_due(user: User) -> bool:
+    return bool(user.last_reset_date) and (datetime.now(tz=timezone.utc) - user.last_reset_date).days >= 30
+
+
 async def get_user(user_id: int):
+    cached = _user_cache.get(user_id)
+    if cached is not None and not _monthly_reset_due(cached):
+        return cached
+
+    version = _user_cache.version
     async with async_session() as session:
         result = await session.execute(select(User).where(User.user_id == user_id))
         user = result.scalar_one_or_none()
 
         if user:
             await check_and_reset_monthly_limit(user, session)
+            _user_cache.put(user, version)
         
         return user
 
@@ -189,6 +326,7 @@ async def check_and_reset_monthly_limit(user: User, session: AsyncSession):
                 last_reset_date=now
             )
             await session.execute(stmt)
+            await notify_user_changed(session, user.user_id)
             await session.commit()
             user.analyses_used = 0
             user.last_reset_date = now
@@ -213,6 +351,7 @@ async def update_user_language(user_id: int, language: str):
     async with async_session() as session:
         stmt = update(User).where(User.user_id == user_id).values(language=language)
         await session.execute(stmt)
+        await notify_user_changed(session, user_id)
         await session.commit()
 
 
@@ -220,6 +359,7 @@ async def update_user_analyses(user_id: int, used: int):
     async with async_session() as session:
         stmt = update(User).where(User.user_id == user_id).values(analyses_used=used)
         await session.execute(stmt)
+        await notify_user_changed(session, user_id)
         await session.commit()
 
 
@@ -227,6 +367,7 @@ async def set_user_limit(user_id: int, new_limit: int):
     async with async_session() as session:
         stmt = update(User).where(User.user_id == user_id).values(analyses_limit=new_limit)
         await session.execute(stmt)
+        await notify_user_changed(session, user_id)
         await session.commit()
 
 
@@ -237,35 +378,149 @@ async def reset_user_analyses(user_id: int):
             last_reset_date=datetime.now(tz=timezone.utc)
         )
         await session.execute(stmt)
+        await notify_user_changed(session, user_id)
         await session.commit()
 
 
+# =========================
+# Prompt registry (process-wide, versioned)
+# =========================
+
+# Postgres NOTIFY channel fired on every prompt change (admin panel and bot)
+PROMPTS_NOTIFY_CHANNEL = "prompts_changed"
+# Safety net when a notification is missed (listener reconnecting, non-Postgres DB)
+PROMPT_REGISTRY_MAX_AGE_SECONDS = 300
+
+
+class _PromptRegistry:
+    """All prompts loaded once and indexed by (category, analysis_type).
+
+    `version` is bumped by invalidate(); the next lookup reloads the table
+    with one query. Lookups are dictionary reads.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._by_key: dict[tuple[str | None, str | None], list[Prompt]] = {}
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+    def _stale(self) -> bool:
+        return (
+            self._loaded_version != self.version
+            or time.monotonic() - self._loaded_at > PROMPT_REGISTRY_MAX_AGE_SECONDS
+        )
+
+    async def _load(self) -> None:
+        version = self.version
+        async with async_session() as db:
+            res = await db.execute(select(Prompt).order_by(Prompt.order.asc(), Prompt.id.desc()))
+            prompts = res.scalars().all()
+
+        by_key: dict[tuple[str | None, str | None], list[Prompt]] = {}
+        for p in prompts:
+            for key in {(None, None), (p.category, None), (None, p.analysis_type), (p.category, p.analysis_type)}:
+                by_key.setdefault(key, []).append(p)
+        self._by_key = by_key
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+
+    async def get(self, category: str | None, analysis_type: str | None) -> list[Prompt]:
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    await self._load()
+        return list(self._by_key.get((category or None, analysis_type or None), ()))
+
+
+_prompt_registry = _PromptRegistry()
+
+
+def invalidate_prompt_registry() -> None:
+    _prompt_registry.invalidate()
+
+
+async def _prompts_changed(session: AsyncSession) -> None:
+    """Call before commit: other processes reload on NOTIFY (delivered at commit).
+
+    Like notify_user_changed, invalidates again once the commit is done.
+    """
+    _prompt_registry.invalidate()
+    session.info["prompts_changed"] = True
+    await _notify(session, PROMPTS_NOTIFY_CHANNEL)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_identifier in session.info.pop("changed_users", ()):
+        _user_cache.invalidate(user_identifier)
+    if session.info.pop("prompts_changed", False):
+        _prompt_registry.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes_on_rollback(session: Session) -> None:
+    session.info.pop("changed_users", None)
+    session.info.pop("prompts_changed", None)
+
+
+def _on_users_changed(_conn, _pid, _channel, payload: str) -> None:
+    try:
+        _user_cache.invalidate(int(payload))
+    except ValueError:
+        _user_cache.invalidate()
+
+
+async def run_cache_invalidation_listener(retry_seconds: int = 30) -> None:
+    """LISTEN for prompt/user changes made by other processes (the admin panel)."""
+    if engine.dialect.name != "postgresql":
+        return
+    import asyncpg
+
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            await conn.add_listener(PROMPTS_NOTIFY_CHANNEL, lambda *_: _prompt_registry.invalidate())
+            await conn.add_listener(USERS_NOTIFY_CHANNEL, _on_users_changed)
+            # Changes made while we were not listening
+            _prompt_registry.invalidate()
+            _user_cache.invalidate()
+            while not conn.is_closed():
+                await asyncio.sleep(retry_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Cache invalidation listener xatosi: {e}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(retry_seconds)
+
+
 async def get_prompts(
     category: str | None = None,
     analysis_type: str | None = None,
 ):
     """
-    Получить промпты для бота. 
+    Получить промпты для бота (из реестра в памяти, см. _PromptRegistry).
     ВАЖНО: Возвращает промпты отсортированные по order (ASC), затем по id (DESC).
     Для simple/advanced анализа берется первый промпт - т.е. самый приоритетный.
     При одинаковом order - берется самый новый (id DESC).
     """
-    async with async_session() as db:
-        query = select(Prompt)
-        if category:
-            query = query.where(Prompt.category == category)
-        if analysis_type:
-            query = query.where(Prompt.analysis_type == analysis_type)
-
-        # Сортируем: сначала по order (для приоритета), затем по id DESC (самый новый)
-        res = await db.execute(query.order_by(Prompt.order.asc(), Prompt.id.desc()))
-        return res.scalars().all()
+    return await _prompt_registry.get(category, analysis_type)
 
 
 async def create_prompt(name: str, prompt_text: str, analysis_type: str = None, category: str = None):
     async with async_session() as session:
         stmt = insert(Prompt).values(name=name, prompt_text=prompt_text, analysis_type=analysis_type, category=category)
         await session.execute(stmt)
+        await _prompts_changed(session)
         await session.commit()
 
 
@@ -273,6 +528,7 @@ async def update_prompt(prompt_id: int, prompt_text: str):
     async with async_session() as session:
         stmt = update(Prompt).where(Prompt.id == prompt_id).values(prompt_text=prompt_text)
         await session.execute(stmt)
+        await _prompts_changed(session)
         await session.commit()
 
 
@@ -280,6 +536,7 @@ async def delete_prompt(prompt_id: int):
     async with async_session() as session:
         stmt = delete(Prompt).where(Prompt.id == prompt_id)
         await session.execute(stmt)
+        await _prompts_changed(session)
         await session.commit()
 
 
@@ -303,21 +560,45 @@ async def create_video(user_id: int, video_url: str, video_title: str):
         return result.inserted_primary_key[0]
 
 
-async def create_comments(video_id: int, comments: list):
-    async with async_session() as session:
-        for idx, comment in enumerate(comments):
-            timestamp_str = comment['time'].strip()
-            timestamp = datetime.fromisoformat(timestamp_str)
-            if timestamp.tzinfo is not None:
-                timestamp = timestamp.replace(tzinfo=None)
-            stmt = insert(Comment).values(
-                video_id=video_id,
-                raw_text=comment['text'],
-                timestamp=timestamp,
-                chunk_id=idx // 100
+# Comments per chunk_id (analysis works on chunks of this size)
+COMMENTS_CHUNK_SIZE = 100
+# Rows per multi-row INSERT when COPY is not available
+COMMENTS_INSERT_BATCH = 1000
+_COMMENT_COLUMNS = ("video_id", "raw_text", "timestamp", "chunk_id")
+
+
+def _naive_timestamp(value: str) -> datetime:
+    timestamp = datetime.fromisoformat(value.strip())
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.replace(tzinfo=None)
+    return timestamp
+
+
+async def create_comments(video_id: int, comments: list) -> int:
+    """Store a video's comments in bulk; returns the number of rows.
+
+    Postgres (asyncpg) gets a single COPY, other drivers multi-row INSERTs in
+    batches of COMMENTS_INSERT_BATCH, instead of one statement per comment.
+    """
+    if not comments:
+        return 0
+    records = [
+        (video_id, comment['text'], _naive_timestamp(comment['time']), idx // COMMENTS_CHUNK_SIZE)
+        for idx, comment in enumerate(comments)
+    ]
+    async with async_session() as session:
+        conn = await session.connection()
+        if conn.dialect.driver == "asyncpg":
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                Comment.__tablename__, records=records, columns=list(_COMMENT_COLUMNS)
             )
-            await session.execute(stmt)
+        else:
+            for start in range(0, len(records), COMMENTS_INSERT_BATCH):
+                batch = records[start:start + COMMENTS_INSERT_BATCH]
+                await session.execute(insert(Comment), [dict(zip(_COMMENT_COLUMNS, row)) for row in batch])
         await session.commit()
+    return len(records)
 
 
 async def get_comments(video_id: int):
@@ -419,15 +700,73 @@ async def get_ai_requests_today():
         return result.scalar() or 0
 
 
+async def get_dashboard_counts() -> dict:
+    """Dashboard totals and today's counts in one round trip.
+
+    Totals come from the stats rollups; "today" counts use the created_at /
+    processed_at indexes, so the cost does not grow with table size.
+    """
+    today_start = datetime.now(tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    stmt = select(
+        select(func.count(User.id)).scalar_subquery().label("total_users"),
+        select(func.coalesce(func.sum(UserVideoCount.video_count), 0)).scalar_subquery().label("total_videos"),
+        select(func.coalesce(func.sum(StatsCounter.value), 0))
+        .where(StatsCounter.name.startswith("analysis_type:"))
+        .scalar_subquery().label("total_requests"),
+        select(func.count(User.id)).where(User.created_at >= today_start).scalar_subquery().label("users_today"),
+        select(func.count(Video.id)).where(Video.processed_at >= today_start).scalar_subquery().label("videos_today"),
+        select(func.count(AIResponse.id)).where(AIResponse.created_at >= today_start)
+        .scalar_subquery().label("requests_today"),
+    )
+    async with async_session() as session:
+        row = (await session.execute(stmt)).one()
+        return {key: int(value or 0) for key, value in row._mapping.items()}
+
+
+async def get_daily_counts(days: int = 30) -> dict:
+    """Per-day new users, videos and AI requests for the last `days` days (UTC), zero-filled."""
+    today_start = datetime.now(tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    since = today_start - timedelta(days=days - 1)
+
+    def per_day(kind: str, column):
+        # Bucket by UTC wall time, not the session TimeZone; literals keep the
+        # GROUP BY expression identical to the selected one
+        day = func.date_trunc(literal_column("'day'"), func.timezone(literal_column("'UTC'"), column))
+        return (
+            select(literal_column(f"'{kind}'").label("kind"), day.label("day"), func.count().label("n"))
+            .where(column >= since)
+            .group_by(day)
+        )
+
+    stmt = union_all(
+        per_day("users", User.created_at),
+        per_day("videos", Video.processed_at),
+        per_day("requests", AIResponse.created_at),
+    )
+    async with async_session() as session:
+        rows = (await session.execute(stmt)).all()
+
+    dates = [(since + timedelta(days=i)).date() for i in range(days)]
+    series = {kind: dict.fromkeys(dates, 0) for kind in ("users", "videos", "requests")}
+    for kind, day, n in rows:
+        if day is not None and day.date() in series[kind]:
+            series[kind][day.date()] = int(n)
+    return {
+        "days": [d.isoformat() for d in dates],
+        **{kind: list(counts.values()) for kind, counts in series.items()},
+    }
+
+
 async def get_analysis_type_stats():
+    """analysis_type -> number of AI responses (stats_counters rollup)."""
+    prefix = "analysis_type:"
     async with async_session() as session:
         result = await session.execute(
-            select(
-                AIResponse.analysis_type,
-                func.count(AIResponse.id).label('count')
-            ).group_by(AIResponse.analysis_type)
+            select(StatsCounter.name, StatsCounter.value)
+            .where(StatsCounter.name.startswith(prefix))
+            .where(StatsCounter.value > 0)
         )
-        return dict(result.all())
+        return {name[len(prefix):] or None: value for name, value in result.all()}
 
 
 async def get_top_active_users(limit: int = 5):
@@ -436,11 +775,11 @@ async def get_top_active_users(limit: int = 5):
             select(
                 User.user_id,
                 User.username,
-                func.count(Video.id).label('video_count')
+                UserVideoCount.video_count,
             )
-            .join(Video, Video.user_id == User.id)
-            .group_by(User.id)
-            .order_by(desc('video_count'))
+            .join(UserVideoCount, UserVideoCount.user_id == User.id)
+            .where(UserVideoCount.video_count > 0)
+            .order_by(desc(UserVideoCount.video_count))
             .limit(limit)
         )
         return result.all()
@@ -458,21 +797,15 @@ async def get_recent_videos(limit: int = 5):
 
 
 async def get_average_comments_per_video():
+    """Average comments per video that has comments (stats_counters rollup)."""
     async with async_session() as session:
-        subquery = (
-            select(
-                Comment.video_id,
-                func.count(Comment.id).label('comment_count')
-            )
-            .group_by(Comment.video_id)
-            .subquery()
-        )
-        
         result = await session.execute(
-            select(func.avg(subquery.c.comment_count))
+            select(StatsCounter.name, StatsCounter.value)
+            .where(StatsCounter.name.in_(["comments", "videos_with_comments"]))
         )
-        avg = result.scalar()
-        return round(avg, 1) if avg else 0
+        counters = dict(result.all())
+        videos = counters.get("videos_with_comments") or 0
+        return round(counters.get("comments", 0) / videos, 1) if videos else 0
 
 
 async def get_prompts_count():
@@ -481,7 +814,57 @@ async def get_prompts_count():
         return result.scalar() or 0
 
 
-async def get_user_videos_history(user_id: int, limit: int = 10, offset: int = 0):
+# =========================
+# Keyset pagination
+# =========================
+# A cursor is the sort key of the row a page continues from (plus a little
+# page state), handed back to the client verbatim. Timestamps are packed as
+# epoch microseconds; the result stays short enough for Telegram's 64-byte
+# callback_data.
+
+_CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _encode_cursor(*values) -> str:
+    parts = []
+    for value in values:
+        if isinstance(value, datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            value = (value - _CURSOR_EPOCH) // timedelta(microseconds=1)
+        parts.append(format(int(value), "x"))
+    return base64.urlsafe_b64encode(".".join(parts).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, size: int) -> list[int]:
+    """Inverse of _encode_cursor; raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        values = [int(part, 16) for part in raw.split(".")]
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _cursor_time(value: int) -> datetime:
+    return _CURSOR_EPOCH + timedelta(microseconds=value)
+
+
+async def get_user_videos_history(user_id: int, limit: int = 10, cursor: str | None = None):
+    """One page of a user's (video, final report) rows, newest first.
+
+    Returns (rows, total_count, page, prev_cursor, next_cursor). Pass None
+    for the first page, then one of the returned cursors; they are keyset
+    positions on (processed_at, video id, report id) and carry the page
+    number for display. Raises ValueError for a malformed cursor.
+    """
+    backward, page, key = False, 1, None
+    if cursor:
+        backward, page, processed_us, video_id, response_id = _decode_cursor(cursor, 5)
+        key = tuple_(_cursor_time(processed_us), video_id, response_id)
+
     async with async_session() as session:
         user_result = await session.execute(
             select(User.id).where(User.user_id == user_id)
@@ -489,25 +872,50 @@ async def get_user_videos_history(user_id: int, limit: int = 10, offset: int = 0
         db_user_id = user_result.scalar_one_or_none()
         
         if not db_user_id:
-            return [], 0
+            return [], 0, 1, None, None
         
         count_result = await session.execute(
             select(func.count(Video.id)).where(Video.user_id == db_user_id)
         )
         total_count = count_result.scalar() or 0
         
-        result = await session.execute(
+        sort_key = tuple_(Video.processed_at, Video.id, AIResponse.id)
+        query = (
             select(Video, AIResponse)
             .outerjoin(AIResponse, AIResponse.video_id == Video.id)
             .where(Video.user_id == db_user_id)
             .where(AIResponse.chunk_id == 0)
-            .order_by(desc(Video.processed_at))
-            .limit(limit)
-            .offset(offset)
         )
-        
-        videos = result.all()
-        return videos, total_count
+        if backward:
+            # Previous page: walk up from its first row, then restore newest-first order
+            query = query.where(sort_key > key).order_by(
+                Video.processed_at, Video.id, AIResponse.id
+            ).limit(limit)
+        else:
+            if key is not None:
+                query = query.where(sort_key < key)
+            query = query.order_by(
+                desc(Video.processed_at), desc(Video.id), desc(AIResponse.id)
+            ).limit(limit + 1)
+
+        rows = list((await session.execute(query)).all())
+
+    if backward:
+        videos = rows[::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > limit
+        videos = rows[:limit]
+
+    prev_cursor = next_cursor = None
+    if videos:
+        first_video, first_response = videos[0]
+        last_video, last_response = videos[-1]
+        if page > 1:
+            prev_cursor = _encode_cursor(1, page - 1, first_video.processed_at, first_video.id, first_response.id)
+        if has_next:
+            next_cursor = _encode_cursor(0, page + 1, last_video.processed_at, last_video.id, last_response.id)
+    return videos, total_count, page, prev_cursor, next_cursor
 
 
 async def get_video_by_id(video_id: int):
@@ -531,6 +939,28 @@ async def get_ai_response_by_video(video_id: int, analysis_type: str = None):
         return result.scalar_one_or_none()
 
 
+async def get_ai_response_text(ai_response_id: int) -> str | None:
+    """The report body of one AIResponse (deferred on the ORM row)."""
+    async with async_session() as session:
+        res = await session.execute(
+            select(AIResponse.response_text).where(AIResponse.id == ai_response_id)
+        )
+        return res.scalar_one_or_none()
+
+
+async def _load_bodies(session: AsyncSession, responses) -> None:
+    """Fill the deferred body columns of already-loaded AIResponse rows in one query."""
+    ids = [r.id for r in responses]
+    if ids:
+        res = await session.execute(
+            select(AIResponse)
+            .where(AIResponse.id.in_(ids))
+            .options(undefer_group("body"))
+            .execution_options(populate_existing=True)
+        )
+        res.scalars().all()  # rows are populated as they are consumed
+
+
 async def get_user_by_id(user_id: int):
     async with async_session() as session:
         result = await session.execute(
@@ -566,6 +996,7 @@ async def update_user_verification(
             verification_date=datetime.now(tz=timezone.utc) if status == 'verified' else None
         )
         await session.execute(stmt)
+        await notify_user_changed(session, user_id)
         await session.commit()
 
 
@@ -854,6 +1285,7 @@ async def get_final_advanced_analyses_for_set(analysis_set_id: int) -> list[AIRe
             .where(AIResponse.chunk_id == 0)
             .where(AIResponse.analysis_type.in_(["advanced", "advanced_final"]))
             .order_by(AIResponse.created_at.asc())
+            .options(undefer(AIResponse.response_text))
         )
         results = list(res.scalars().all())
         print(f"🔍 [DEBUG] get_final_advanced_analyses_for_set(set_id={analysis_set_id}): найдено {len(results)} анализов")
@@ -955,88 +1387,119 @@ async def update_video_channel_id(video_id: int, channel_id: str):
         await session.commit()
 
 
+_VERIFIED_CHANNEL_RE = re.compile(r'channel/([^/?]+)|@([^/?]+)')
+
+
 async def get_user_verified_channels_with_names(user_id: int):
+    """Channels for the evolution picker: analysed channels plus verified ones.
+
+    One query (videos grouped by channel UNION ALL verified attempts, with
+    cached titles joined from channel_metadata); missing or stale titles are
+    then fetched in batches by services.channel_metadata, outside the session.
+    """
+    user = await get_user(user_id)
+    if not user:
+        return []
 
     async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.user_id == user_id)
+        analysed = (
+            select(
+                Video.channel_id.label("channel_id"),
+                func.count(Video.id).label("video_count"),
+                ChannelMetadata.title.label("title"),
+                ChannelMetadata.fetched_at.label("fetched_at"),
+                false().label("from_attempt"),
+            )
+            .outerjoin(ChannelMetadata, ChannelMetadata.channel_id == Video.channel_id)
+            .where(Video.user_id == user.id, Video.channel_id.isnot(None))
+            .group_by(Video.channel_id, ChannelMetadata.title, ChannelMetadata.fetched_at)
         )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            return []
-        
-        stmt = select(Video.channel_id, func.count(Video.id).label('video_count')).where(
-            Video.user_id == user.id,
-            Video.channel_id.isnot(None)
-        ).group_by(Video.channel_id)
-        
-        result = await session.execute(stmt)
-        channels = result.all()
-        
-        verified_attempts = await session.execute(
-            select(VerificationAttempt.channel_url).where(
+        verified = (
+            select(
+                VerificationAttempt.channel_url,
+                literal_column("0"),
+                cast(null(), String),
+                cast(null(), DateTime(timezone=True)),
+                true(),
+            )
+            .where(
                 VerificationAttempt.user_id == user.id,
-                VerificationAttempt.status == 'verified'
+                VerificationAttempt.status == 'verified',
             )
         )
-        
-        import re
-        verified_channel_ids = set()
-        for (channel_url,) in verified_attempts.all():
-            match = re.search(r'channel/([^/?]+)', channel_url)
-            if match:
-                verified_channel_ids.add(match.group(1))
-            match = re.search(r'@([^/?]+)', channel_url)
-            if match:
-                verified_channel_ids.add(match.group(1))
-        
-        channels_with_names = []
-        processed_ids = set()
-        
-        for channel_id, video_count in channels:
-            if channel_id not in processed_ids:
-                processed_ids.add(channel_id)
-                
-                try:
-                    from services.youtube_service import get_channel_info_by_id
-                    channel_info = await get_channel_info_by_id(channel_id)
-                    channel_title = channel_info.get('title', channel_id[:20])
-                except Exception:
-                    channel_title = channel_id[:20] + "..."
-                
-                channels_with_names.append({
-                    'channel_id': channel_id,
-                    'channel_title': channel_title,
-                    'video_count': video_count
-                })
-        
-        for channel_id in verified_channel_ids:
-            if channel_id not in processed_ids:
-                processed_ids.add(channel_id)
-                
-                count_result = await session.execute(
-                    select(func.count(Video.id)).where(
-                        Video.user_id == user.id,
-                        Video.channel_id == channel_id
-                    )
-                )
-                video_count = count_result.scalar() or 0
-                
-                try:
-                    from services.youtube_service import get_channel_info_by_id
-                    channel_info = await get_channel_info_by_id(channel_id)
-                    channel_title = channel_info.get('title', channel_id[:20])
-                except Exception:
-                    channel_title = channel_id[:20] + "..."
-                
-                channels_with_names.append({
-                    'channel_id': channel_id,
-                    'channel_title': channel_title,
-                    'video_count': video_count
-                })
-        
-        return channels_with_names
+        rows = (await session.execute(union_all(analysed, verified))).all()
+
+    channels: dict[str, dict] = {}
+    verified_ids: list[str] = []
+    for channel_id, video_count, title, fetched_at, from_attempt in rows:
+        if not from_attempt:
+            channels[channel_id] = {
+                'channel_id': channel_id,
+                'channel_title': title,
+                'video_count': video_count,
+                'fetched_at': fetched_at,
+            }
+            continue
+        for match in _VERIFIED_CHANNEL_RE.finditer(channel_id or ""):
+            verified_ids.append(match.group(1) or match.group(2))
+
+    # Verified channels without analysed videos (count is 0 by construction)
+    for channel_id in verified_ids:
+        channels.setdefault(channel_id, {
+            'channel_id': channel_id,
+            'channel_title': None,
+            'video_count': 0,
+            'fetched_at': None,
+        })
+
+    from services.channel_metadata import is_fresh, get_channels_metadata
+
+    stale = [c['channel_id'] for c in channels.values() if not c['channel_title'] or not is_fresh(c['fetched_at'])]
+    if stale:
+        fetched = await get_channels_metadata(stale)
+        for channel_id in stale:
+            info = fetched.get(channel_id)
+            if info and info.get('title'):
+                channels[channel_id]['channel_title'] = info['title']
+
+    result = []
+    for c in channels.values():
+        c.pop('fetched_at')
+        if not c['channel_title']:
+            c['channel_title'] = c['channel_id'][:20] + "..."
+        result.append(c)
+    return result
+
+
+async def get_channel_metadata(channel_ids: list[str]) -> dict[str, ChannelMetadata]:
+    if not channel_ids:
+        return {}
+    async with async_session() as session:
+        res = await session.execute(
+            select(ChannelMetadata).where(ChannelMetadata.channel_id.in_(channel_ids))
+        )
+        return {row.channel_id: row for row in res.scalars().all()}
+
+
+async def save_channel_metadata(items: list[dict]) -> None:
+    """Insert or refresh channel_metadata rows (dicts with ChannelMetadata column names)."""
+    if not items:
+        return
+    now = datetime.now(tz=timezone.utc)
+    async with async_session() as session:
+        res = await session.execute(
+            select(ChannelMetadata).where(ChannelMetadata.channel_id.in_([i['channel_id'] for i in items]))
+        )
+        existing = {row.channel_id: row for row in res.scalars().all()}
+        for item in items:
+            row = existing.get(item['channel_id'])
+            if row is None:
+                row = ChannelMetadata(channel_id=item['channel_id'])
+                session.add(row)
+            for key, value in item.items():
+                setattr(row, key, value)
+            row.fetched_at = now
+        await session.commit()
 
 
 async def get_channel_analysis_history(user_id: int, channel_id: str, limit: int = 10):
@@ -1206,8 +1669,14 @@ async def get_balanced_evolution_analyses(
     user_id: int, 
     channel_id: str, 
     min_advanced: int = 5, 
-    total_limit: int = 10
+    total_limit: int = 10,
+    with_bodies: bool = False,
 ):
+    """(Video, AIResponse) pairs for evolution analysis, oldest first.
+
+    Report bodies (response_text / machine_data) are loaded only for the
+    selected rows and only with `with_bodies=True`.
+    """
 
     async with async_session() as session:
 
@@ -1225,7 +1694,7 @@ async def get_balanced_evolution_analyses(
             AIResponse.chunk_id == 0,
             AIResponse.analysis_type.in_(['advanced', 'advanced_final']),
             Video.processed_at.isnot(None)  
-        ).order_by(Video.processed_at.asc())
+        ).order_by(Video.processed_at.asc()).limit(max(min_advanced, total_limit))
 
         advanced_result = await session.execute(advanced_stmt)
         advanced_analyses = advanced_result.all()
@@ -1234,7 +1703,10 @@ async def get_balanced_evolution_analyses(
             return []
         
         if len(advanced_analyses) >= total_limit:
-            return list(advanced_analyses[:total_limit])
+            selected = list(advanced_analyses[:total_limit])
+            if with_bodies:
+                await _load_bodies(session, [ai_response for _, ai_response in selected])
+            return selected
 
         simple_limit = total_limit - len(advanced_analyses)
         
@@ -1260,45 +1732,31 @@ async def get_balanced_evolution_analyses(
 
         all_analyses.sort(key=lambda x: x[0].processed_at)
 
+        if with_bodies:
+            await _load_bodies(session, [ai_response for _, ai_response in all_analyses])
         return all_analyses
 
 
 async def get_channel_analysis_stats(user_id: int, channel_id: str) -> dict:
-
+    """Final reports (with TXT) on a user's videos of one channel (channel_analysis_counts rollup)."""
     async with async_session() as session:
         user = await _resolve_user(session, user_id)
         
         if not user:
             return {'total': 0, 'advanced': 0, 'simple': 0}
         
-        advanced_stmt = select(func.count(Video.id)).join(
-            AIResponse, Video.id == AIResponse.video_id
-        ).where(
-            Video.user_id == user.id,
-            Video.channel_id == channel_id,
-            AIResponse.analysis_type.in_(['advanced', 'advanced_final']),
-            AIResponse.chunk_id == 0,
-            AIResponse.txt_file_path.isnot(None)
-        )
-        advanced_result = await session.execute(advanced_stmt)
-        advanced = advanced_result.scalar() or 0
-
-        simple_stmt = select(func.count(Video.id)).join(
-            AIResponse, Video.id == AIResponse.video_id
-        ).where(
-            Video.user_id == user.id,
-            Video.channel_id == channel_id,
-            AIResponse.analysis_type == 'simple',
-            AIResponse.chunk_id == 0,
-            AIResponse.txt_file_path.isnot(None)
+        result = await session.execute(
+            select(ChannelAnalysisCount.kind, ChannelAnalysisCount.n).where(
+                ChannelAnalysisCount.user_id == user.id,
+                ChannelAnalysisCount.channel_id == channel_id,
+            )
         )
-        simple_result = await session.execute(simple_stmt)
-        simple = simple_result.scalar() or 0
-        
-        total = advanced + simple
+        counts = dict(result.all())
+        advanced = max(counts.get('advanced', 0), 0)
+        simple = max(counts.get('simple', 0), 0)
         
         return {
-            'total': total,
+            'total': advanced + simple,
             'advanced': advanced,
             'simple': simple
         }
@@ -1391,9 +1849,10 @@ async def get_user_analysis_history(user_id: int) -> list[str]:
     async with async_session() as session:
         user = await _resolve_user(session, user_id)
 
-        # TZ-2: prefer "best" advanced analyses selected by MultiAnalysisOptimizer
+        # TZ-2: prefer "best" advanced analyses selected by MultiAnalysisOptimizer.
+        # Pick ids first; only the (up to) 10 chosen bodies go over the wire.
         best_q = await session.execute(
-            select(AIResponse.response_text)
+            select(AIResponse.id)
             .where(AIResponse.user_id == user.id)
             .where(AIResponse.chunk_id == 0)
             .where(AIResponse.analysis_type == "advanced")
@@ -1401,26 +1860,32 @@ async def get_user_analysis_history(user_id: int) -> list[str]:
             .order_by(AIResponse.created_at.desc())
             .limit(10)
         )
-        best = [r[0] for r in best_q.all()]
-        if len(best) >= 10:
-            return best
+        ids = list(best_q.scalars().all())
 
         # Fallback: latest completed advanced final reports
-        fallback_q = await session.execute(
-            select(AIResponse.response_text)
-            .where(AIResponse.user_id == user.id)
-            .where(AIResponse.chunk_id == 0)
-            .where(AIResponse.analysis_type.in_(["advanced", "advanced_final"]))
-            .order_by(AIResponse.created_at.desc())
-            .limit(10)
+        if len(ids) < 10:
+            fallback_q = await session.execute(
+                select(AIResponse.id)
+                .where(AIResponse.user_id == user.id)
+                .where(AIResponse.chunk_id == 0)
+                .where(AIResponse.analysis_type.in_(["advanced", "advanced_final"]))
+                .order_by(AIResponse.created_at.desc())
+                .limit(10)
+            )
+            ids = list(dict.fromkeys(ids + list(fallback_q.scalars().all())))
+
+        if not ids:
+            return []
+        texts_q = await session.execute(
+            select(AIResponse.id, AIResponse.response_text).where(AIResponse.id.in_(ids))
         )
-        fallback = [r[0] for r in fallback_q.all()]
+        texts = dict(texts_q.all())
 
         # Merge preserving order (best first)
         out: list[str] = []
         seen = set()
-        for item in best + fallback:
-            if item in seen:
+        for item in (texts.get(i) for i in ids):
+            if item is None or item in seen:
                 continue
             seen.add(item)
             out.append(item)
@@ -1558,33 +2023,347 @@ async def get_advanced_with_synthesis(category: str, db: AsyncSession):
         "advanced": advanced,
         "synthesis": synthesis
     }
+# =========================
+# Advanced analysis checkpoints (resumable runs)
+# =========================
+
+
+async def get_advanced_checkpoint(
+    *,
+    user_identifier: int,
+    youtube_video_id: str,
+    prompt_set_version: str,
+) -> AdvancedAnalysisCheckpoint | None:
+    async with async_session() as session:
+        user = await _resolve_user(session, user_identifier)
+        res = await session.execute(
+            select(AdvancedAnalysisCheckpoint)
+            .where(AdvancedAnalysisCheckpoint.user_id == user.id)
+            .where(AdvancedAnalysisCheckpoint.youtube_video_id == youtube_video_id)
+            .where(AdvancedAnalysisCheckpoint.prompt_set_version == prompt_set_version)
+            .limit(1)
+        )
+        checkpoint = res.scalar_one_or_none()
+        await session.commit()
+        return checkpoint
+
+
+async def save_advanced_checkpoint(
+    *,
+    user_identifier: int,
+    youtube_video_id: str,
+    prompt_set_version: str,
+    modules: dict | None = None,
+    synthesis_attempts: list | None = None,
+    status: str | None = None,
+) -> int:
+    """Upsert checkpoint state for a run. Only the passed fields are overwritten."""
+    now = datetime.now(tz=timezone.utc)
+    async with async_session() as session:
+        user = await _resolve_user(session, user_identifier)
+        res = await session.execute(
+            select(AdvancedAnalysisCheckpoint)
+            .where(AdvancedAnalysisCheckpoint.user_id == user.id)
+            .where(AdvancedAnalysisCheckpoint.youtube_video_id == youtube_video_id)
+            .where(AdvancedAnalysisCheckpoint.prompt_set_version == prompt_set_version)
+            .limit(1)
+        )
+        checkpoint = res.scalar_one_or_none()
+
+        if not checkpoint:
+            checkpoint = AdvancedAnalysisCheckpoint(
+                user_id=user.id,
+                youtube_video_id=youtube_video_id,
+                prompt_set_version=prompt_set_version,
+                modules={},
+                synthesis_attempts=[],
+                status="running",
+                created_at=now,
+            )
+            session.add(checkpoint)
+
+        if modules is not None:
+            checkpoint.modules = modules
+        if synthesis_attempts is not None:
+            checkpoint.synthesis_attempts = synthesis_attempts
+        if status is not None:
+            checkpoint.status = status
+        checkpoint.updated_at = now
+
+        await session.commit()
+        return checkpoint.id
+
+
+async def delete_advanced_checkpoint(checkpoint_id: int) -> None:
+    async with async_session() as session:
+        await session.execute(delete(AdvancedAnalysisCheckpoint).where(AdvancedAnalysisCheckpoint.id == checkpoint_id))
+        await session.commit()
+
+
+# =========================
+# Analysis job queue (bot -> worker processes)
+# =========================
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+
+async def enqueue_analysis_job(
+    *,
+    user_id: int,
+    chat_id: int,
+    kind: str,
+    url: str,
+    payload: dict | None = None,
+) -> int:
+    async with async_session() as session:
+        job = AnalysisJob(
+            user_id=user_id,
+            chat_id=chat_id,
+            kind=kind,
+            url=url,
+            payload=payload or {},
+            status="queued",
+            cancel_requested=False,
+            attempts=0,
+            created_at=datetime.now(tz=timezone.utc),
+        )
+        session.add(job)
+        await session.commit()
+        return job.id
+
+
+async def get_active_analysis_job(user_id: int) -> AnalysisJob | None:
+    """Queued or running job of a Telegram user (at most one is allowed)."""
+    async with async_session() as session:
+        res = await session.execute(
+            select(AnalysisJob)
+            .where(AnalysisJob.user_id == user_id)
+            .where(AnalysisJob.status.in_(ACTIVE_JOB_STATUSES))
+            .order_by(AnalysisJob.id.desc())
+            .limit(1)
+        )
+        return res.scalar_one_or_none()
+
+
+async def get_latest_analysis_job(user_id: int) -> AnalysisJob | None:
+    async with async_session() as session:
+        res = await session.execute(
+            select(AnalysisJob)
+            .where(AnalysisJob.user_id == user_id)
+            .order_by(AnalysisJob.id.desc())
+            .limit(1)
+        )
+        return res.scalar_one_or_none()
+
+
+async def claim_next_analysis_job(worker_id: str, max_attempts: int = 3) -> AnalysisJob | None:
+    """Atomically move the oldest queued job to `running` for this worker.
+
+    `FOR UPDATE SKIP LOCKED` lets any number of workers poll the same table
+    without handing one job to two of them.
+    """
+    now = datetime.now(tz=timezone.utc)
+    async with async_session() as session:
+        res = await session.execute(
+            select(AnalysisJob)
+            .where(AnalysisJob.status == "queued")
+            .where(AnalysisJob.attempts < max_attempts)
+            .order_by(AnalysisJob.id.asc())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = res.scalar_one_or_none()
+        if not job:
+            await session.commit()
+            return None
+
+        job.status = "running"
+        job.worker_id = worker_id
+        job.attempts = int(job.attempts or 0) + 1
+        job.started_at = now
+        job.heartbeat_at = now
+        await session.commit()
+        return job
+
+
+async def touch_analysis_job(job_id: int) -> bool:
+    """Heartbeat. Returns True when the user asked to cancel the job."""
+    async with async_session() as session:
+        job = await session.get(AnalysisJob, job_id)
+        if not job:
+            return True
+        job.heartbeat_at = datetime.now(tz=timezone.utc)
+        cancel_requested = bool(job.cancel_requested)
+        await session.commit()
+        return cancel_requested
+
+
+async def update_analysis_job_payload(job_id: int, **values) -> None:
+    """Merge pipeline progress (created video id, charged flag) into the job payload."""
+    async with async_session() as session:
+        job = await session.get(AnalysisJob, job_id, with_for_update=True)
+        if not job:
+            return
+        # New dict: in-place changes of a JSON column are not tracked
+        job.payload = {**(job.payload or {}), **values}
+        await session.commit()
+
+
+async def finish_analysis_job(job_id: int, status: str, error: str | None = None) -> None:
+    async with async_session() as session:
+        await session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id)
+            .values(status=status, error=error, finished_at=datetime.now(tz=timezone.utc))
+        )
+        await session.commit()
+
+
+async def request_analysis_job_cancel(user_id: int) -> AnalysisJob | None:
+    """Flag the user's active job for cancellation.
+
+    A queued job is cancelled right away; a running one is stopped by its worker.
+    """
+    async with async_session() as session:
+        res = await session.execute(
+            select(AnalysisJob)
+            .where(AnalysisJob.user_id == user_id)
+            .where(AnalysisJob.status.in_(ACTIVE_JOB_STATUSES))
+            .order_by(AnalysisJob.id.desc())
+            .limit(1)
+            .with_for_update()
+        )
+        job = res.scalar_one_or_none()
+        if not job:
+            await session.commit()
+            return None
+
+        job.cancel_requested = True
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = datetime.now(tz=timezone.utc)
+        await session.commit()
+        return job
+
+
+async def requeue_stale_analysis_jobs(stale_after_seconds: int, max_attempts: int = 3) -> int:
+    """Return `running` jobs with an expired heartbeat to the queue.
+
+    Covers workers killed by a deploy/crash. Advanced analyses then resume from
+    their checkpoint instead of starting over. Jobs that already used all
+    attempts are marked `failed`.
+    """
+    now = datetime.now(tz=timezone.utc)
+    threshold = now - timedelta(seconds=stale_after_seconds)
+    async with async_session() as session:
+        stale = (
+            (AnalysisJob.status == "running")
+            & (AnalysisJob.heartbeat_at < threshold)
+        )
+        await session.execute(
+            update(AnalysisJob)
+            .where(stale)
+            .where(AnalysisJob.attempts >= max_attempts)
+            .values(status="failed", error="worker lost", finished_at=now)
+        )
+        res = await session.execute(
+            update(AnalysisJob)
+            .where(stale)
+            .values(status="queued", worker_id=None)
+        )
+        await session.commit()
+        return int(res.rowcount or 0)
+
+
+# =========================
+# Telegram file_id cache (services/document_delivery.py)
+# =========================
+
+async def get_telegram_file_id(content_hash: str) -> str | None:
+    async with async_session() as session:
+        res = await session.execute(
+            select(TelegramFile.file_id).where(TelegramFile.content_hash == content_hash).limit(1)
+        )
+        return res.scalar_one_or_none()
+
+
+async def save_telegram_file_id(
+    content_hash: str,
+    file_id: str,
+    *,
+    file_unique_id: str | None = None,
+    file_name: str | None = None,
+    file_size: int | None = None,
+) -> None:
+    async with async_session() as session:
+        res = await session.execute(
+            select(TelegramFile).where(TelegramFile.content_hash == content_hash).limit(1)
+        )
+        row = res.scalar_one_or_none()
+        if row is None:
+            session.add(TelegramFile(
+                content_hash=content_hash,
+                file_id=file_id,
+                file_unique_id=file_unique_id,
+                file_name=file_name,
+                file_size=file_size,
+            ))
+        else:
+            row.file_id = file_id
+            row.file_unique_id = file_unique_id
+            row.file_name = file_name
+            row.file_size = file_size
+        await session.commit()
+
+
+async def delete_telegram_file_id(content_hash: str) -> None:
+    async with async_session() as session:
+        await session.execute(delete(TelegramFile).where(TelegramFile.content_hash == content_hash))
+        await session.commit()
+
+
 # =========================
 # Web Admin CRUD helpers
 # =========================
 
-async def admin_list_users(search: str = "", page: int = 1, limit: int = 20) -> list[User]:
-    """List users for Web Admin.
+async def admin_list_users(
+    search: str = "", cursor: str | None = None, limit: int = 20
+) -> tuple[list[User], str | None]:
+    """List users for Web Admin, newest first, one keyset page at a time.
+
+    Returns (users, next_cursor); next_cursor is None on the last page.
+    `search` is a substring match on username / Telegram id, served by the
+    pg_trgm GIN indexes. Raises ValueError for a malformed cursor.
 
     NOTE: `user_id` here is Telegram user_id (User.user_id).
     """
-    if page < 1:
-        page = 1
     if limit < 1:
         limit = 20
     if limit > 200:
         limit = 200
 
+    q = select(User)
+    if search:
+        like = f"%{search.lower()}%"
+        # Same expressions as idx_users_username_trgm / idx_users_user_id_trgm
+        q = q.where(
+            (User.username.ilike(like))
+            | (cast(User.user_id, Text).ilike(like))
+        )
+    if cursor:
+        created_us, last_id = _decode_cursor(cursor, 2)
+        q = q.where(tuple_(User.created_at, User.id) < tuple_(_cursor_time(created_us), last_id))
+    q = q.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1)
+
     async with async_session() as session:
-        q = select(User)
-        if search:
-            like = f"%{search.lower()}%"
-            q = q.where(
-                (User.username.ilike(like))
-                | (cast(User.user_id, String).ilike(like))
-            )
-        q = q.order_by(User.created_at.desc()).offset((page - 1) * limit).limit(limit)
         res = await session.execute(q)
-        return list(res.scalars().all())
+        users = list(res.scalars().all())
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = _encode_cursor(users[-1].created_at, users[-1].id)
+    return users, next_cursor
 
 
 async def admin_get_user(user_id: int) -> User | None:
@@ -1597,6 +2376,7 @@ async def admin_set_user_tariff(user_id: int, tariff: str) -> bool:
     async with async_session() as session:
         stmt = update(User).where(User.user_id == user_id).values(tariff_plan=tariff)
         res = await session.execute(stmt)
+        await notify_user_changed(session, user_id)
         await session.commit()
         return (res.rowcount or 0) > 0
 
@@ -1680,6 +2460,7 @@ async def admin_create_prompt(
             order=next_order,
         )
         session.add(p)
+        await _prompts_changed(session)
         await session.commit()
         await session.refresh(p)
         return p
@@ -1711,6 +2492,7 @@ async def admin_update_prompt(
         p.module_id = module_id
         if p.order is None:
             p.order = 0
+        await _prompts_changed(session)
         await session.commit()
         await session.refresh(p)
         
@@ -1730,6 +2512,7 @@ async def admin_delete_prompt(prompt_id: int) -> bool:
         print(f"[ADMIN] Deleting prompt ID={prompt_id}, name='{p.name}', category='{p.category}', analysis_type='{p.analysis_type}'")
         
         await session.delete(p)
+        await _prompts_changed(session)
         await session.commit()
         
         print(f"[ADMIN] Prompt ID={prompt_id} successfully deleted from database")
@@ -1754,9 +2537,53 @@ async def admin_reorder_prompts(orders: list[dict]) -> None:
             ordv = int(item["order"])
             items[pid].order = ordv
 
+        await _prompts_changed(session)
         await session.commit()
 
 
+async def admin_list_reports_for_export(
+    *,
+    user_ids: list[int] | None = None,
+    channel_ids: list[str] | None = None,
+    analysis_types: list[str] | None = None,
+    limit: int = 500,
+) -> list[dict]:
+    """Final report rows (chunk_id 0) for a bulk export, oldest first.
+
+    `user_ids` are Telegram user_ids. Only light columns are loaded; the report
+    text is fetched per entry when its PDF has to be rendered.
+    """
+    stmt = (
+        select(
+            AIResponse.id,
+            AIResponse.analysis_type,
+            AIResponse.pdf_file_path,
+            AIResponse.created_at,
+            Video.video_url,
+            Video.channel_id,
+            User.user_id,
+        )
+        .join(Video, AIResponse.video_id == Video.id)
+        .join(User, AIResponse.user_id == User.id)
+        .where(AIResponse.chunk_id == 0)
+    )
+    if user_ids:
+        stmt = stmt.where(User.user_id.in_(user_ids))
+    if channel_ids:
+        stmt = stmt.where(Video.channel_id.in_(channel_ids))
+    if analysis_types:
+        stmt = stmt.where(AIResponse.analysis_type.in_(analysis_types))
+    stmt = stmt.order_by(AIResponse.id).limit(limit)
+
+    async with async_session() as session:
+        res = await session.execute(stmt)
+        return [dict(row._mapping) for row in res.all()]
+
+
+async def admin_get_ai_response_text(ai_response_id: int) -> str | None:
+    return await get_ai_response_text(ai_response_id)
+
+
 # ---------- TZ-2: Multi-analysis evaluator prompts (ADVANCED ONLY) ----------
 
 async def admin_list_multi_analysis_prompts() -> list[MultiAnalysisPrompt]:
@@ -32,6 +32,8 @@ async def create_db():
     async with engine.begin() as conn:
         # UUID extension
         await conn.execute(text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";'))
+        # Trigram indexes for substring search (admin user list)
+        await conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm;'))
         
         # Barcha tablelarni yaratish
         await conn.run_sync(Base.metadata.create_all)
@@ -63,6 +65,19 @@ async def _apply_schema_patches(conn):
         ALTER TABLE ai_responses
             ADD COLUMN IF NOT EXISTS is_for_strategic_hub BOOLEAN DEFAULT FALSE;
     """))
+    # Report bodies: lz4 TOAST compression for new values (PG14+ built with
+    # lz4; otherwise the default pglz stays)
+    await conn.execute(text("""
+    DO $$
+    BEGIN
+        IF current_setting('server_version_num')::int >= 140000 THEN
+            ALTER TABLE ai_responses ALTER COLUMN response_text SET COMPRESSION lz4;
+            ALTER TABLE ai_responses ALTER COLUMN machine_data SET COMPRESSION lz4;
+        END IF;
+    EXCEPTION WHEN feature_not_supported OR invalid_parameter_value THEN
+        NULL;
+    END $$;
+    """))
 
     # FK (best-effort; do not fail if already exists)
     await conn.execute(text("""
@@ -80,10 +95,6 @@ async def _apply_schema_patches(conn):
     """))
 
     # Indexes
-    await conn.execute(text("""
-        CREATE INDEX IF NOT EXISTS idx_ai_responses_analysis_set_id
-        ON ai_responses (analysis_set_id);
-    """))
     await conn.execute(text("""
         CREATE INDEX IF NOT EXISTS idx_ai_responses_is_for_strategic_hub
         ON ai_responses (is_for_strategic_hub);
@@ -105,6 +116,268 @@ async def _apply_schema_patches(conn):
         ON analysis_quality_markers (is_best);
     """))
 
+    # --- Composite indexes for the hot query shapes (checked by tests/test_query_plans.py) ---
+    # Strategic Hub history: user_id + chunk_id + analysis_type, newest first
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_ai_responses_user_chunk_type_created
+        ON ai_responses (user_id, chunk_id, analysis_type, created_at DESC);
+    """))
+    # Video -> final report joins (history, evolution, channel stats)
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_ai_responses_video_chunk_type
+        ON ai_responses (video_id, chunk_id, analysis_type);
+    """))
+    # Final analyses of a multi-analysis set; supersedes the single-column index
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_ai_responses_set_chunk_created
+        ON ai_responses (analysis_set_id, chunk_id, created_at);
+    """))
+    await conn.execute(text("""
+        DROP INDEX IF EXISTS idx_ai_responses_analysis_set_id;
+    """))
+    # Evolution / channel stats: a user's videos of one channel in processing order
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_videos_user_channel_processed
+        ON videos (user_id, channel_id, processed_at);
+    """))
+    # "My videos" history page: keyset on (processed_at, id), newest first
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_videos_user_processed_id
+        ON videos (user_id, processed_at DESC, id DESC);
+    """))
+    await conn.execute(text("""
+        DROP INDEX IF EXISTS idx_videos_user_processed;
+    """))
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_comments_video_id
+        ON comments (video_id);
+    """))
+    # Admin dashboard "today" counters / per-day series and the admin user
+    # list keyset on (created_at, id)
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users (created_at, id);
+    """))
+    await conn.execute(text("""
+        DROP INDEX IF EXISTS idx_users_created_at;
+    """))
+    # Admin user search: ILIKE '%term%' on username / Telegram id
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+        ON users USING gin (username gin_trgm_ops);
+    """))
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_users_user_id_trgm
+        ON users USING gin ((user_id::text) gin_trgm_ops);
+    """))
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_videos_processed_at ON videos (processed_at);
+    """))
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_ai_responses_created_at ON ai_responses (created_at);
+    """))
+    # Verification stats: a user's attempts by status
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_verification_attempts_user_status
+        ON verification_attempts (user_id, status);
+    """))
+
+    # --- sample_reports: pre-rendered demo PDFs + indexed random pick ---
+    await conn.execute(text("""
+        ALTER TABLE sample_reports
+            ADD COLUMN IF NOT EXISTS pdf_path VARCHAR(500),
+            ADD COLUMN IF NOT EXISTS telegram_file_id VARCHAR(255),
+            ADD COLUMN IF NOT EXISTS random_key DOUBLE PRECISION;
+    """))
+    await conn.execute(text("""
+        UPDATE sample_reports SET random_key = random() WHERE random_key IS NULL;
+    """))
+    await conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_sample_reports_pick
+        ON sample_reports (video_type, is_active, random_key);
+    """))
+
+    # --- Statistics rollups (models.StatsCounter & co.), kept by triggers ---
+    await _install_stats_rollups(conn)
+
+
+# Final reports counted per channel (get_channel_analysis_stats)
+_FINAL_REPORT_FILTER = """
+    r.chunk_id = 0 AND r.txt_file_path IS NOT NULL AND v.channel_id IS NOT NULL
+    AND r.analysis_type IN ('simple', 'advanced', 'advanced_final')
+"""
+_REPORT_KIND = "CASE WHEN r.analysis_type = 'simple' THEN 'simple' ELSE 'advanced' END"
+
+
+def _ai_responses_delta(rows: str, sign: str) -> str:
+    """Apply `rows` (a transition table or subquery of ai_responses) to the rollups."""
+    return f"""
+        INSERT INTO stats_counters (name, value)
+        SELECT 'analysis_type:' || COALESCE(r.analysis_type, ''), {sign}count(*) FROM {rows} r GROUP BY 1
+        ON CONFLICT (name) DO UPDATE SET value = stats_counters.value + EXCLUDED.value;
+
+        INSERT INTO channel_analysis_counts (user_id, channel_id, kind, n)
+        SELECT v.user_id, v.channel_id, {_REPORT_KIND}, {sign}count(*)
+        FROM {rows} r JOIN videos v ON v.id = r.video_id
+        WHERE {_FINAL_REPORT_FILTER}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, channel_id, kind) DO UPDATE SET n = channel_analysis_counts.n + EXCLUDED.n;
+    """
+
+
+def _videos_delta(rows: str, sign: str, *, with_reports: bool) -> str:
+    sql = f"""
+        INSERT INTO user_video_counts (user_id, video_count)
+        SELECT v.user_id, {sign}count(*) FROM {rows} v GROUP BY 1
+        ON CONFLICT (user_id) DO UPDATE SET video_count = user_video_counts.video_count + EXCLUDED.video_count;
+    """
+    if with_reports:
+        # A video moved to another owner/channel takes its reports along
+        sql += f"""
+        INSERT INTO channel_analysis_counts (user_id, channel_id, kind, n)
+        SELECT v.user_id, v.channel_id, {_REPORT_KIND}, {sign}count(*)
+        FROM {rows} v JOIN ai_responses r ON r.video_id = v.id
+        WHERE {_FINAL_REPORT_FILTER}
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, channel_id, kind) DO UPDATE SET n = channel_analysis_counts.n + EXCLUDED.n;
+        """
+    return sql
+
+
+def _comments_delta(rows: str, sign: str) -> str:
+    # videos_with_comments changes when a video's count leaves / reaches zero
+    became = "up.comment_count = c.n" if sign == "" else "up.comment_count = 0"
+    return f"""
+        WITH c AS (
+            SELECT t.video_id, count(*) AS n FROM {rows} t GROUP BY t.video_id
+        ), up AS (
+            INSERT INTO video_comment_counts (video_id, comment_count)
+            SELECT video_id, {sign}n FROM c
+            ON CONFLICT (video_id) DO UPDATE
+                SET comment_count = video_comment_counts.comment_count + EXCLUDED.comment_count
+            RETURNING video_id, comment_count
+        )
+        SELECT COALESCE(sum(c.n), 0), count(*) FILTER (WHERE {became})
+        INTO v_comments, v_videos
+        FROM c JOIN up USING (video_id);
+
+        PERFORM stats_counter_add('comments', {sign}v_comments);
+        PERFORM stats_counter_add('videos_with_comments', {sign}v_videos);
+        DELETE FROM video_comment_counts
+        WHERE comment_count <= 0 AND video_id IN (SELECT t.video_id FROM {rows} t);
+    """
+
+
+def _trigger_function(name: str, body_by_op: dict[str, str], declare: str = "") -> str:
+    branches = "\n".join(
+        f"    {'IF' if i == 0 else 'ELSIF'} TG_OP = '{op}' THEN\n{body}"
+        for i, (op, body) in enumerate(body_by_op.items())
+    )
+    return f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+        {('DECLARE ' + declare) if declare else ''}
+        BEGIN
+        {branches}
+            END IF;
+            RETURN NULL;
+        END $$;
+    """
+
+
+async def _install_stats_rollups(conn):
+    """Statement-level triggers with transition tables: one rollup update per
+    statement (a COPY of 10k comments is one trigger call), in the writer's transaction.
+    """
+    await conn.execute(text("""
+        CREATE OR REPLACE FUNCTION stats_counter_add(counter TEXT, delta BIGINT) RETURNS void
+        LANGUAGE sql AS $$
+            INSERT INTO stats_counters (name, value) SELECT counter, delta WHERE delta <> 0
+            ON CONFLICT (name) DO UPDATE SET value = stats_counters.value + EXCLUDED.value
+        $$;
+    """))
+
+    changed_reports = """(
+        SELECT {side}.* FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE (o.analysis_type, o.chunk_id, o.txt_file_path IS NULL, o.video_id)
+              IS DISTINCT FROM (n.analysis_type, n.chunk_id, n.txt_file_path IS NULL, n.video_id)
+    )"""
+    await conn.execute(text(_trigger_function("stats_ai_responses_trg", {
+        "INSERT": _ai_responses_delta("new_rows", ""),
+        "DELETE": _ai_responses_delta("old_rows", "-"),
+        "UPDATE": _ai_responses_delta(changed_reports.format(side="o"), "-")
+                  + _ai_responses_delta(changed_reports.format(side="n"), ""),
+    })))
+
+    moved_videos = """(
+        SELECT {side}.* FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE (o.user_id, o.channel_id) IS DISTINCT FROM (n.user_id, n.channel_id)
+    )"""
+    await conn.execute(text(_trigger_function("stats_videos_trg", {
+        "INSERT": _videos_delta("new_rows", "", with_reports=False),
+        # Reports of a video are deleted before it (FK), their trigger already counted them
+        "DELETE": _videos_delta("old_rows", "-", with_reports=False),
+        "UPDATE": _videos_delta(moved_videos.format(side="o"), "-", with_reports=True)
+                  + _videos_delta(moved_videos.format(side="n"), "", with_reports=True),
+    })))
+
+    moved_comments = """(
+        SELECT {side}.* FROM old_rows o JOIN new_rows n ON n.id = o.id
+        WHERE o.video_id IS DISTINCT FROM n.video_id
+    )"""
+    await conn.execute(text(_trigger_function("stats_comments_trg", {
+        "INSERT": _comments_delta("new_rows", ""),
+        "DELETE": _comments_delta("old_rows", "-"),
+        "UPDATE": _comments_delta(moved_comments.format(side="o"), "-")
+                  + _comments_delta(moved_comments.format(side="n"), ""),
+    }, declare="v_comments BIGINT; v_videos BIGINT;")))
+
+    for table in ("ai_responses", "videos", "comments"):
+        for op, referencing in (
+            ("INSERT", "NEW TABLE AS new_rows"),
+            ("DELETE", "OLD TABLE AS old_rows"),
+            ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ):
+            trigger = f"stats_{table}_{op.lower()}"
+            await conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger} ON {table};"))
+            await conn.execute(text(f"""
+                CREATE TRIGGER {trigger} AFTER {op} ON {table}
+                REFERENCING {referencing}
+                FOR EACH STATEMENT EXECUTE FUNCTION stats_{table}_trg();
+            """))
+
+    # Full recount; run once on install (and by hand: SELECT stats_rollups_rebuild();)
+    await conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION stats_rollups_rebuild() RETURNS void LANGUAGE plpgsql AS $$
+        BEGIN
+            LOCK TABLE ai_responses, videos, comments IN SHARE MODE;
+            TRUNCATE stats_counters, user_video_counts, video_comment_counts, channel_analysis_counts;
+
+            INSERT INTO stats_counters (name, value)
+            SELECT 'analysis_type:' || COALESCE(analysis_type, ''), count(*) FROM ai_responses GROUP BY 1;
+            INSERT INTO user_video_counts (user_id, video_count)
+            SELECT user_id, count(*) FROM videos GROUP BY user_id;
+            INSERT INTO video_comment_counts (video_id, comment_count)
+            SELECT video_id, count(*) FROM comments GROUP BY video_id;
+            INSERT INTO stats_counters (name, value) VALUES
+                ('comments', (SELECT count(*) FROM comments)),
+                ('videos_with_comments', (SELECT count(*) FROM video_comment_counts));
+            INSERT INTO channel_analysis_counts (user_id, channel_id, kind, n)
+            SELECT v.user_id, v.channel_id, {_REPORT_KIND}, count(*)
+            FROM ai_responses r JOIN videos v ON v.id = r.video_id
+            WHERE {_FINAL_REPORT_FILTER}
+            GROUP BY 1, 2, 3;
+
+            INSERT INTO stats_counters (name, value) VALUES ('rollups_version', 1);
+        END $$;
+    """))
+    await conn.execute(text("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM stats_counters WHERE name = 'rollups_version') THEN
+                PERFORM stats_rollups_rebuild();
+            END IF;
+        END $$;
+    """))
+
 
 async def _seed_default_multi_analysis_prompt(conn):
     """Insert the default evaluator prompt if table is empty.
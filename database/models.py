@@ -1,5 +1,5 @@
-from sqlalchemy import JSON, BigInteger, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import JSON, BigInteger, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Float, UniqueConstraint
+from sqlalchemy.orm import deferred, relationship
 from .engine import Base
 from datetime import datetime, timezone
 
@@ -65,6 +65,11 @@ class SampleReport(Base):
     analysis_data = Column(Text, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+    # Ready-to-send demo: PDF rendered/saved once at upload, Telegram file_id after the first send
+    pdf_path = Column(String(500), nullable=True)
+    telegram_file_id = Column(String(255), nullable=True)
+    # Uniform random value for an indexed random pick (see idx_sample_reports_pick)
+    random_key = Column(Float, nullable=True)
 
 
 class Video(Base):
@@ -135,8 +140,12 @@ class AIResponse(Base):
     video_id = Column(Integer, ForeignKey("videos.id"), nullable=False)
     chunk_id = Column(Integer, default=0)
     analysis_type = Column(String(50), nullable=True)
-    response_text = Column(Text, nullable=False)
-    machine_data = Column(JSON, nullable=True)  
+    # Report bodies (often hundreds of KB) are not loaded with the row: listing
+    # queries read only the small columns. Load them explicitly with
+    # undefer_group("body") / crud.get_ai_response_text; touching an unloaded
+    # body raises instead of issuing a hidden query.
+    response_text = deferred(Column(Text, nullable=False), group="body", raiseload=True)
+    machine_data = deferred(Column(JSON, nullable=True), group="body", raiseload=True)
     txt_file_path = Column(String(500), nullable=True)
     # TZ-2: multi-analysis optimizer
     pdf_file_path = Column(String(500), nullable=True)
@@ -248,4 +257,133 @@ class MultiAnalysisPrompt(Base):
     description = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
-    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+
+class AdvancedAnalysisCheckpoint(Base):
+    """Persisted pipeline state of an advanced analysis run.
+
+    One row per (user, YouTube video, prompt set version). Completed module
+    outputs survive bot restarts and user cancellation, so a repeated run can
+    resume from the last valid module (see services/analysis_checkpoint.py).
+    """
+
+    __tablename__ = "advanced_analysis_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("user_id", "youtube_video_id", "prompt_set_version", name="uq_advanced_checkpoint_run"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    youtube_video_id = Column(String(50), nullable=False, index=True)
+    prompt_set_version = Column(String(64), nullable=False)
+
+    # {"10-1": {"response": str, "status": "valid"|"partial", "attempts": int, "validation": {...}}, ...}
+    modules = Column(JSON, nullable=True)
+    synthesis_attempts = Column(JSON, nullable=True)
+    status = Column(String(20), default="running")  # running/completed
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+
+
+class AnalysisJob(Base):
+    """Durable queue entry for a video/shorts analysis.
+
+    The bot only enqueues; worker processes (worker.py) claim rows with
+    SELECT ... FOR UPDATE SKIP LOCKED and run the pipeline. Cancellation is a
+    flag on the row, polled by the worker that owns the job.
+    """
+
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, nullable=False, index=True)  # Telegram user_id
+    chat_id = Column(BigInteger, nullable=False)
+    kind = Column(String(20), nullable=False)  # video/shorts
+    url = Column(Text, nullable=False)
+    payload = Column(JSON, nullable=True)  # category, analysis_type, level_mode, ...
+
+    status = Column(String(20), default="queued", index=True)  # queued/running/done/failed/cancelled
+    cancel_requested = Column(Boolean, default=False)
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String(100), nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class TelegramFile(Base):
+    """file_id Telegram returned for an uploaded document, keyed by content hash.
+
+    Re-sending the same bytes (to any chat of this bot) reuses the file_id
+    instead of uploading the file again.
+    """
+
+    __tablename__ = "telegram_files"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_hash = Column(String(64), nullable=False, unique=True)  # sha256 hex
+    file_id = Column(String(255), nullable=False)
+    file_unique_id = Column(String(64), nullable=True)
+    file_name = Column(String(255), nullable=True)
+    file_size = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+
+
+class ChannelMetadata(Base):
+    """YouTube channel title/statistics, refreshed by services/channel_metadata.py after a TTL.
+
+    `channel_id` is the id as the bot stores it (UC... or an @handle).
+    """
+
+    __tablename__ = "channel_metadata"
+
+    channel_id = Column(String(100), primary_key=True)
+    youtube_channel_id = Column(String(100), nullable=True)  # resolved UC... id
+    title = Column(String(255), nullable=True)
+    description = Column(Text, nullable=True)
+    subscriber_count = Column(BigInteger, nullable=True)
+    video_count = Column(Integer, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(tz=timezone.utc))
+
+
+# --- Statistics rollups -------------------------------------------------------
+# Maintained by statement-level triggers on ai_responses / videos / comments
+# (installed in engine._apply_schema_patches), i.e. in the same transaction as
+# the write. Readers in crud get dashboard numbers without scanning history.
+
+class StatsCounter(Base):
+    """Global counters: 'analysis_type:<type>', 'comments', 'videos_with_comments'."""
+
+    __tablename__ = "stats_counters"
+
+    name = Column(String(100), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class UserVideoCount(Base):
+    __tablename__ = "user_video_counts"
+
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    video_count = Column(BigInteger, nullable=False, default=0, index=True)
+
+
+class VideoCommentCount(Base):
+    __tablename__ = "video_comment_counts"
+
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    comment_count = Column(BigInteger, nullable=False, default=0)
+
+
+class ChannelAnalysisCount(Base):
+    """Final reports (chunk_id=0, with a TXT file) per video owner/channel; kind: advanced | simple."""
+
+    __tablename__ = "channel_analysis_counts"
+
+    user_id = Column(BigInteger, primary_key=True)
+    channel_id = Column(String(100), primary_key=True)
+    kind = Column(String(20), primary_key=True)
+    n = Column(BigInteger, nullable=False, default=0)
@@ -1,13 +1,14 @@
 import io
 import json
 from aiogram import Bot, Router, F
-from aiogram.types import Message, CallbackQuery, Document, FSInputFile
+from aiogram.types import Message, CallbackQuery, Document
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from callbacks.admin import AdminCallback
 from services.sample_report_service import SampleReportsService
 from services.youtube_service import extract_video_id
+from services.document_delivery import send_document
 from services.pdf_generator import generate_pdf
 from states.admin import AdminFSM
 from keyboards.admin import (
@@ -621,7 +622,9 @@ async def process_sample_data(message: Message, state: FSMContext, bot: Bot):
         report_id = await SampleReportsService.add_sample_report(
             report_name=sample_name,
             video_url=sample_url,
-            analysis_data=analysis_data
+            analysis_data=analysis_data,
+            # Already on Telegram servers: demos are sent by file_id, no re-upload
+            telegram_file_id=message.document.file_id,
         )
         
         await progress_msg.delete()
@@ -752,8 +755,9 @@ async def download_sample_handler(query: CallbackQuery, callback_data: AdminCall
             await query.answer("❌ PDF файл не найден", show_alert=True)
             return
         
-        await query.message.answer_document(
-            FSInputFile(pdf_path),
+        await send_document(
+            query.message,
+            pdf_path,
             caption=f"📄 <b>{report['report_name']}</b>\n\n"
                     f"🆔 ID: <code>{report_id}</code>\n"
                     f"🔗 <code>{report['video_url']}</code>",
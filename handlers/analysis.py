@@ -1,6 +1,6 @@
 from typing import Optional
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from callbacks.menu import MenuCallback
@@ -22,23 +22,28 @@ from services.active_analysis import (
     get_active,
     cleanup_cancelled_analysis,
 )
+from services.analysis_queue import queue_enabled, enqueue_analysis, has_active_job, cancel_user_job, record_job_progress
 from services.comments_cache import get_video_comments_with_metrics_cached
+from services.tracing import trace_span, traced
 from services.youtube_service import (
     extract_video_id,
     format_timestamps_for_analysis, 
     get_video_comments, 
     get_video_comments_count,
     get_video_timestamps, 
-    save_comments_to_file, 
+    format_comments_text, 
     get_comments_file_path,
     get_video_channel_info,
     get_video_comments_with_metrics
 )
 from services.ai_service import analyze_comments_with_prompt, save_ai_interaction
-from services.pdf_generator import generate_pdf
+from services.pdf_render_service import render_pdf
+from services.document_delivery import send_document
+from services.artifact_store import ArtifactStore
 from services.verifiaction_service import VerificationService
 from services.sample_report_service import SampleReportsService
 from database.crud import get_user, update_user_analyses, create_video, get_prompts, create_ai_response
+from database.models import User
 from utils.texts import ENTER_VIDEO_URL, INVALID_URL, LIMIT_EXCEEDED, ANALYSIS_STARTED, ANALYSIS_DONE
 from utils.progress import ProgressTracker
 import os
@@ -63,6 +68,28 @@ async def stop_running_analysis(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     active = get_active(user_id)
 
+    if (not active or not active.task or active.task.done()) and queue_enabled():
+        # Analysis runs in a worker process: the owning worker stops it
+        job = await cancel_user_job(user_id)
+        if not job:
+            await callback.answer("Нет активного анализа.", show_alert=True)
+            return
+        try:
+            await state.clear()
+        except Exception:
+            pass
+        try:
+            await callback.message.edit_text(
+                "⛔ Останавливаю анализ и очищаю данные..."
+                if job.status == "running"
+                else "⛔ Анализ удален из очереди.",
+                reply_markup=get_back_to_menu_keyboard(),
+            )
+        except Exception:
+            pass
+        await callback.answer("Остановка запрошена")
+        return
+
     if not active or not active.task or active.task.done():
         await callback.answer("Нет активного анализа.", show_alert=True)
         return
@@ -110,8 +137,8 @@ async def analysis_my_video_handler(query: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(MenuCallback.filter(F.action == "analysis_competitor"))
-async def analysis_competitor_handler(query: CallbackQuery, state: FSMContext):
-    user = await get_user(query.from_user.id)
+async def analysis_competitor_handler(query: CallbackQuery, state: FSMContext, db_user: Optional[User]):
+    user = db_user
     
     if user.tariff_plan not in ['pro', 'business', 'enterprise'] and query.from_user.id not in ADMIN_IDS:
         await query.answer("❌ Эта функция доступна только для пользователей Premium тарифа.", show_alert=True)
@@ -125,8 +152,8 @@ async def analysis_competitor_handler(query: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(AnalysisFSM.choose_type, AnalysisCallback.filter(F.type == "simple"))
-async def choose_simple_analysis(query: CallbackQuery, callback_data: AnalysisCallback, state: FSMContext):
-    user = await get_user(query.from_user.id)
+async def choose_simple_analysis(query: CallbackQuery, callback_data: AnalysisCallback, state: FSMContext, db_user: Optional[User]):
+    user = db_user
     
     if user.analyses_used >= user.analyses_limit and query.from_user.id not in ADMIN_IDS:
         await query.answer("❌ Достигнут лимит анализов.", show_alert=True)
@@ -145,8 +172,8 @@ async def choose_simple_analysis(query: CallbackQuery, callback_data: AnalysisCa
 
 
 @router.callback_query(AnalysisFSM.choose_type, AnalysisCallback.filter(F.type == "advanced"))
-async def choose_advanced_analysis(query: CallbackQuery, callback_data: AnalysisCallback, state: FSMContext):
-    user = await get_user(query.from_user.id)
+async def choose_advanced_analysis(query: CallbackQuery, callback_data: AnalysisCallback, state: FSMContext, db_user: Optional[User]):
+    user = db_user
     
     if user.tariff_plan not in ['pro', 'business', 'enterprise'] and query.from_user.id not in ADMIN_IDS:
         await query.answer("❌ Эта функция доступна только для пользователей Premium тарифа.", show_alert=True)
@@ -214,29 +241,27 @@ async def send_sample_report_and_ask(message: Message, user_id: int, video_type:
             parse_mode="HTML"
         )
         
-        analysis_data = sample_report['analysis_data'] 
-        pdf_path = analysis_data.get('pdf_path')
-        
-        if not pdf_path or not os.path.exists(pdf_path):
-            await message.answer(
-                "❌ PDF файл не найден в системе.",
-                reply_markup=get_main_menu_keyboard()
-            )
-            return
-        
         progress_msg = await message.answer("📄 Загрузка демо-отчета...")
         
         video_type_emoji = "⚡" if video_type == 'shorts' else "🎬"
         
-        await message.answer_document(
-            FSInputFile(pdf_path),
+        sent = await SampleReportsService.send_sample_report(
+            message,
+            sample_report,
             caption=f"📊 <b>ДЕМО Анализ готов!</b>\n\n"
                     f"{video_type_emoji} Тип: <b>{video_type_ru.capitalize()}</b>\n"
                     f"📝 Название: <i>{sample_report['report_name']}</i>\n\n"
                     f"<i>Это образец анализа для ознакомления.</i>",
-            parse_mode="HTML"
         )
         
+        if not sent:
+            await progress_msg.delete()
+            await message.answer(
+                "❌ PDF файл не найден в системе.",
+                reply_markup=get_main_menu_keyboard()
+            )
+            return
+        
         await progress_msg.delete()
 
         await message.answer(
@@ -285,6 +310,7 @@ async def check_video_ownership(user_id: int, video_url: str, is_admin: bool = F
         return False, f"Ошибка: {str(e)}", None
 
 
+@traced("analysis.run")
 async def run_analysis_task(
     user_id: int,
     message: Message,
@@ -294,6 +320,7 @@ async def run_analysis_task(
     runtime: ActiveAnalysis,
 ):
     progress_msg = None
+    artifacts = ArtifactStore()
     try:
 
         async def _raise_if_cancelled():
@@ -382,16 +409,17 @@ async def run_analysis_task(
             f"✅ Загружено {comments_len} комментариев\n🔄 Получение timestamps..."
         )
         
-        timestamps_info = await get_video_timestamps(url)
+        async with trace_span("analysis.timestamps"):
+            timestamps_info = await get_video_timestamps(url)
         timestamps_text = format_timestamps_for_analysis(timestamps_info['timestamps'])
 
         await _raise_if_cancelled()
         
-        save_comments_to_file(comments_data, comments_file)
-        
+        # AI context is built in memory; the file is only an artefact copy
+        full_context = format_comments_text(comments_data)
         if timestamps_info['has_timestamps']:
-            with open(comments_file, "a", encoding="utf-8") as f:
-                f.write(timestamps_text)
+            full_context += timestamps_text
+        await artifacts.write_text(comments_file, full_context, kind="comments")
         
         await update_progress_message(
             progress_msg, 
@@ -400,13 +428,15 @@ async def run_analysis_task(
         
         await _raise_if_cancelled()
 
-        db_video_id = await create_video(
-            user.id, 
-            url, 
-            f"Comments: {comments_file}"
-        )
+        async with trace_span("analysis.db_insert"):
+            db_video_id = await create_video(
+                user.id, 
+                url, 
+                f"Comments: {comments_file}"
+            )
 
         runtime.db_video_id = db_video_id
+        await record_job_progress(runtime, video_id=db_video_id)
         
         try:
             channel_info = await get_video_channel_info(url)
@@ -428,9 +458,6 @@ async def run_analysis_task(
                 channel_title=channel_title or channel_id[:30]
             )
         
-        with open(comments_file, "r", encoding="utf-8") as f:
-            full_context = f.read()
-        
         ai_response_id_for_files = None
 
         if analysis_type == "simple":
@@ -454,14 +481,17 @@ async def run_analysis_task(
 
             await _raise_if_cancelled()
             
-            ai_response = await analyze_comments_with_prompt(full_context, prompt_text)
+            async with trace_span("ai.simple"):
+                ai_response = await analyze_comments_with_prompt(full_context, prompt_text)
 
             await _raise_if_cancelled()
             
             # ВАЖНО: Log должен содержать PROMPT + COMMENTS для отладки
             request_context = f"PROMPT:\n{prompt_text}\n\n{'='*80}\n\nCOMMENTS:\n{full_context}"
             
-            ai_logs = save_ai_interaction(
+            ai_logs = await artifacts.run(
+                "ai_logs",
+                save_ai_interaction,
                 user_id=user.user_id,
                 video_id=video_id,
                 stage="simple",
@@ -496,16 +526,18 @@ async def run_analysis_task(
                     parse_mode="HTML"
                 )
 
-                await message.answer_document(
-                    FSInputFile(ai_logs['request_path']),
+                await send_document(
+                    message,
+                    ai_logs['request_path'],
                     caption=f"📥 <b>AI REQUEST</b>\n\n"
                             f"🎯 Simple Analysis\n"
                             f"📏 {ai_logs['request_size']} KB",
                     parse_mode="HTML"
                 )
                 
-                await message.answer_document(
-                    FSInputFile(ai_logs['response_path']),
+                await send_document(
+                    message,
+                    ai_logs['response_path'],
                     caption=f"📤 <b>AI RESPONSE</b>\n\n"
                             f"🎯 Simple Analysis\n"
                             f"📏 {ai_logs['response_size']} KB",
@@ -569,15 +601,17 @@ async def run_analysis_task(
                 for idx, log in enumerate(ai_logs_only):
                     stage_name = "СИНТЕЗ" if idx == len(ai_logs_only) - 1 else f"ЭТАП {idx+1}"
                     
-                    await message.answer_document(
-                        FSInputFile(log['request_path']),
+                    await send_document(
+                        message,
+                        log['request_path'],
                         caption=f"📥 <b>{stage_name} - REQUEST</b>\n\n"
                                 f"📏 {log['request_size']} KB",
                         parse_mode="HTML"
                     )
                     
-                    await message.answer_document(
-                        FSInputFile(log['response_path']),
+                    await send_document(
+                        message,
+                        log['response_path'],
                         caption=f"📤 <b>{stage_name} - RESPONSE</b>\n\n"
                                 f"📏 {log['response_size']} KB",
                         parse_mode="HTML"
@@ -589,13 +623,10 @@ async def run_analysis_task(
             # ===== MACHINE DATA FILE (optional, for debugging / admin) =====
             if machine_data_json and final_ai_response_id:
                 try:
-                    reports_dir = Path(f"reports/{user.user_id}")
-                    reports_dir.mkdir(parents=True, exist_ok=True)
-
-                    machine_json_path = reports_dir / f"{video_id}_machine_{final_ai_response_id}.json"
-                    with open(machine_json_path, "w", encoding="utf-8") as f:
-                        f.write(machine_data_json)
-                    runtime.add_file(machine_json_path)
+                    machine_json_handle = await artifacts.store_text(
+                        "machine_json", machine_data_json, f"{video_id}_machine_{final_ai_response_id}.json"
+                    )
+                    runtime.add_file(machine_json_handle)
                 except Exception as e:
                     print(f"⚠️ Machine data file saqlashda xato: {e}")
 
@@ -609,64 +640,66 @@ async def run_analysis_task(
 
         await _raise_if_cancelled()
 
-        pdf_file = generate_pdf(final_ai_response, url, video_id)
+        pdf_file = await render_pdf(final_ai_response, url, video_id, analysis_type)
         
-        reports_dir = Path(f"reports/{user.user_id}")
-        reports_dir.mkdir(parents=True, exist_ok=True)
         file_suffix = ai_response_id_for_files or int(datetime.now().timestamp())
-        saved_pdf_path = reports_dir / f"{video_id}_{analysis_type}_{file_suffix}.pdf"
-        os.rename(pdf_file, str(saved_pdf_path))
-        pdf_file = str(saved_pdf_path)
+        pdf_handle = await artifacts.store_file(
+            "report_pdf", pdf_file, filename=f"{video_id}_{analysis_type}_{file_suffix}.pdf", remove=True
+        )
+        runtime.add_file(pdf_handle)
+        pdf_file = str(await artifacts.materialize(pdf_handle))
         runtime.add_file(pdf_file)
 
-        txt_file_path = reports_dir / f"{video_id}_{analysis_type}_{file_suffix}.txt"
-        with open(txt_file_path, "w", encoding="utf-8") as txt_file:
-            txt_file.write(f"=== ANALIZ NATIJALARI ===\n\n")
-            txt_file.write(f"Video ID: {video_id}\n")
-            txt_file.write(f"Video URL: {url}\n")
-            txt_file.write(f"Kanal: {channel_title or 'Unknown'}\n")
-            txt_file.write(f"Kanal ID: {channel_id or 'Unknown'}\n")
-            txt_file.write(f"Tahlil turi: {'Oddiy' if analysis_type == 'simple' else 'Chuqur'}\n")
-            txt_file.write(f"Kommentlar soni: {comments_len}\n")
-            txt_file.write(f"Timestamps soni: {timestamps_info['timestamps_count']}\n")
-            txt_file.write(f"Sana: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
-            
-            # 🆕 ENGAGEMENT METRICS
-            txt_file.write(f"\n=== ENGAGEMENT METRICS ===\n")
-            txt_file.write(f"Total Comments: {engagement_metrics['total_comments']}\n")
-            txt_file.write(f"Total Replies: {engagement_metrics['total_replies']}\n")
-            txt_file.write(f"Engagement Rate: {engagement_metrics['engagement_rate']}%\n")
-            txt_file.write(f"Like Ratio: {engagement_metrics['like_ratio']}%\n")
-            txt_file.write(f"Comment Velocity: {engagement_metrics['comment_velocity']} comments/hour\n")
-            
-            # 🆕 TIME DISTRIBUTION
-            txt_file.write(f"\n=== TIME DISTRIBUTION ===\n")
-            for period, count in engagement_metrics['time_distribution'].items():
-                txt_file.write(f"{period}: {count} comments\n")
-            
-            # 🆕 ENGAGEMENT PHASES
-            txt_file.write(f"\n=== ENGAGEMENT PHASES ===\n")
-            for phase, stats in engagement_phases.items():
-                txt_file.write(f"{phase}: {stats['comments']} comments, {stats['replies']} replies\n")
-            
-            # 🆕 TOP AUTHORS
-            txt_file.write(f"\n=== TOP 10 AUTHORS ===\n")
-            for idx, author in enumerate(top_authors[:10], 1):
-                txt_file.write(
-                    f"{idx}. {author['author']}: "
-                    f"{author['comments']} comments, "
-                    f"{author['replies']} replies, "
-                    f"{author['total_likes']} likes\n"
-                )
-            
-            if is_admin:
-                txt_file.write(f"\nAdmin tomonidan tahlil qilindi\n")
-            
-            txt_file.write(f"\n{'='*50}\n\n")
-            txt_file.write("=== AI TAHLIL NATIJALARI ===\n\n")
-            txt_file.write(final_ai_response)
-
-        runtime.add_file(txt_file_path)
+        report_lines = []
+        report_lines.append(f"=== ANALIZ NATIJALARI ===\n\n")
+        report_lines.append(f"Video ID: {video_id}\n")
+        report_lines.append(f"Video URL: {url}\n")
+        report_lines.append(f"Kanal: {channel_title or 'Unknown'}\n")
+        report_lines.append(f"Kanal ID: {channel_id or 'Unknown'}\n")
+        report_lines.append(f"Tahlil turi: {'Oddiy' if analysis_type == 'simple' else 'Chuqur'}\n")
+        report_lines.append(f"Kommentlar soni: {comments_len}\n")
+        report_lines.append(f"Timestamps soni: {timestamps_info['timestamps_count']}\n")
+        report_lines.append(f"Sana: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
+        
+        # 🆕 ENGAGEMENT METRICS
+        report_lines.append(f"\n=== ENGAGEMENT METRICS ===\n")
+        report_lines.append(f"Total Comments: {engagement_metrics['total_comments']}\n")
+        report_lines.append(f"Total Replies: {engagement_metrics['total_replies']}\n")
+        report_lines.append(f"Engagement Rate: {engagement_metrics['engagement_rate']}%\n")
+        report_lines.append(f"Like Ratio: {engagement_metrics['like_ratio']}%\n")
+        report_lines.append(f"Comment Velocity: {engagement_metrics['comment_velocity']} comments/hour\n")
+        
+        # 🆕 TIME DISTRIBUTION
+        report_lines.append(f"\n=== TIME DISTRIBUTION ===\n")
+        for period, count in engagement_metrics['time_distribution'].items():
+            report_lines.append(f"{period}: {count} comments\n")
+        
+        # 🆕 ENGAGEMENT PHASES
+        report_lines.append(f"\n=== ENGAGEMENT PHASES ===\n")
+        for phase, stats in engagement_phases.items():
+            report_lines.append(f"{phase}: {stats['comments']} comments, {stats['replies']} replies\n")
+        
+        # 🆕 TOP AUTHORS
+        report_lines.append(f"\n=== TOP 10 AUTHORS ===\n")
+        for idx, author in enumerate(top_authors[:10], 1):
+            report_lines.append(
+                f"{idx}. {author['author']}: "
+                f"{author['comments']} comments, "
+                f"{author['replies']} replies, "
+                f"{author['total_likes']} likes\n"
+            )
+        
+        if is_admin:
+            report_lines.append(f"\nAdmin tomonidan tahlil qilindi\n")
+        
+        report_lines.append(f"\n{'='*50}\n\n")
+        report_lines.append("=== AI TAHLIL NATIJALARI ===\n\n")
+        report_lines.append(final_ai_response)
+        txt_handle = await artifacts.store_text(
+            "report_txt", "".join(report_lines), f"{video_id}_{analysis_type}_{file_suffix}.txt"
+        )
+        runtime.add_file(txt_handle)
+        print(f"[ARTIFACTS] {video_id}: {artifacts.summary()}")
 
         # Save file paths for this exact analysis row
         try:
@@ -675,8 +708,8 @@ async def run_analysis_task(
             if ai_response_id_for_files:
                 await update_ai_response_files_by_id(
                     int(ai_response_id_for_files),
-                    txt_path=str(txt_file_path),
-                    pdf_path=str(saved_pdf_path),
+                    txt_path=txt_handle,
+                    pdf_path=pdf_handle,
                 )
 
                 # TZ-2: advanced analyses are grouped into sets for later evaluation
@@ -694,8 +727,9 @@ async def run_analysis_task(
             await progress_msg.delete()
             progress_msg = None
 
-        await message.answer_document(
-            FSInputFile(pdf_file),
+        await send_document(
+            message,
+            pdf_file,
             caption=f"📊 <b>Анализ готов!</b>\n\n"
                     f"📹 Видео: <code>{video_id}</code>\n"
                     f"📺 Канал: {channel_title or 'Unknown'}\n"
@@ -723,6 +757,8 @@ async def run_analysis_task(
                 reply_markup=get_after_analysis_keyboard()
             )
         if not is_admin:
+            # Flag first: a crash in between must not make a retry charge again
+            await record_job_progress(runtime, charged=True)
             await update_user_analyses(user.id, user.analyses_used + 1)
         
     except asyncio.CancelledError:
@@ -751,6 +787,7 @@ async def run_analysis_task(
         return
 
     except ValueError as e:
+        runtime.error = str(e)
         if progress_msg:
             await update_progress_message(progress_msg, f"❌ Ошибка: {str(e)}")
         await message.answer(
@@ -758,6 +795,7 @@ async def run_analysis_task(
             reply_markup=get_main_menu_keyboard()
         )
     except FileNotFoundError as e:
+        runtime.error = str(e)
         if progress_msg:
             await update_progress_message(progress_msg, "❌ Файл не найден")
         await message.answer(
@@ -765,6 +803,7 @@ async def run_analysis_task(
             reply_markup=get_main_menu_keyboard()
         )
     except OSError as e:
+        runtime.error = str(e)
         if progress_msg:
             await update_progress_message(progress_msg, "❌ Ошибка файловой системы")
         await message.answer(
@@ -772,6 +811,7 @@ async def run_analysis_task(
             reply_markup=get_main_menu_keyboard()
         )
     except Exception as e:
+        runtime.error = str(e)
         if progress_msg:
             await update_progress_message(progress_msg, "❌ Неожиданная ошибка")
         await message.answer(
@@ -826,6 +866,28 @@ async def process_video_url(message: Message, state: FSMContext):
     # We don't need FSM state after task start
     await state.clear()
 
+    if queue_enabled():
+        if await has_active_job(user_id):
+            await message.answer(
+                "⏳ У вас уже идет анализ. Дождитесь завершения текущего.\n\n"
+                "Вы можете продолжить использовать бот:",
+                reply_markup=get_main_menu_keyboard(),
+            )
+            return
+
+        await enqueue_analysis(
+            user_id=user_id,
+            chat_id=message.chat.id,
+            kind="video",
+            url=url,
+            payload={"category": category, "analysis_type": analysis_type},
+        )
+        await message.answer(
+            "📥 Анализ поставлен в очередь. Прогресс появится здесь.",
+            reply_markup=get_stop_analysis_keyboard(),
+        )
+        return
+
     runtime = ActiveAnalysis(
         user_id=user_id,
         chat_id=message.chat.id,
@@ -1,11 +1,13 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from callbacks.menu import MenuCallback
 from keyboards.client import get_cabinet_keyboard, get_history_keyboard, get_back_to_cabinet_keyboard, get_main_menu_keyboard
-from database.crud import get_user, get_user_videos_history, get_video_by_id, get_ai_response_by_video, update_user_language
-from services.pdf_generator import generate_pdf
+from database.crud import get_user_videos_history, get_video_by_id, get_ai_response_by_video, get_ai_response_text, update_user_language
+from database.models import User
+from services.pdf_render_service import render_pdf
+from services.document_delivery import send_document
 from utils.helpers import safe_edit_text
 from pathlib import Path
 import os
@@ -14,9 +16,9 @@ router = Router()
 
 
 @router.callback_query(F.data == "personal_cabinet")
-async def personal_cabinet_handler(query: CallbackQuery):
+async def personal_cabinet_handler(query: CallbackQuery, db_user: User | None):
     
-    user = await get_user(query.from_user.id)
+    user = db_user
     
     if not user:
         await query.answer("❌ Пользователь не найден", show_alert=True)
@@ -40,34 +42,43 @@ async def personal_cabinet_handler(query: CallbackQuery):
 
 
 @router.callback_query(F.data == "cabinet:history")
-async def history_handler(query: CallbackQuery, state: FSMContext):
+async def history_handler(query: CallbackQuery, state: FSMContext, db_user: User | None):
     
-    await show_history_page(query, page=1)
+    await show_history_page(query, db_user)
 
 
-@router.callback_query(F.data.startswith("history:page:"))
-async def history_page_handler(query: CallbackQuery):
+@router.callback_query(F.data.startswith("history:c:"))
+async def history_page_handler(query: CallbackQuery, db_user: User | None):
     
-    page = int(query.data.split(":")[-1])
-    await show_history_page(query, page)
+    await show_history_page(query, db_user, cursor=query.data[len("history:c:"):])
 
 
-async def show_history_page(query: CallbackQuery, page: int = 1):
-    
-    user = await get_user(query.from_user.id)
+@router.callback_query(F.data.startswith("history:page:"))
+async def legacy_history_page_handler(query: CallbackQuery, db_user: User | None):
+    # Buttons sent before cursor pagination: start over from the first page
+    await show_history_page(query, db_user)
+
+
+async def show_history_page(query: CallbackQuery, user: User | None, cursor: str | None = None):
     
     if not user:
         await query.answer("❌ Пользователь не найден", show_alert=True)
         return
     
     limit = 5
-    offset = (page - 1) * limit
     
-    videos, total_count = await get_user_videos_history(
-        query.from_user.id,
-        limit=limit,
-        offset=offset
-    )
+    try:
+        videos, total_count, page, prev_cursor, next_cursor = await get_user_videos_history(
+            query.from_user.id,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError:
+        videos, total_count, page, prev_cursor, next_cursor = await get_user_videos_history(
+            query.from_user.id,
+            limit=limit
+        )
+    offset = (page - 1) * limit
     
     if not videos:
         await safe_edit_text(
@@ -81,9 +92,10 @@ async def show_history_page(query: CallbackQuery, page: int = 1):
         return
     
    
+    total_pages = max(page, (total_count + limit - 1) // limit)
     history_text = f"📋 <b>История отчетов</b>\n\n"
     history_text += f"Всего отчетов: {total_count}\n"
-    history_text += f"Страница {page} из {(total_count + limit - 1) // limit}\n\n"
+    history_text += f"Страница {page} из {total_pages}\n\n"
     
     for idx, (video, ai_response) in enumerate(videos, start=1):
         video_id = video.video_url.split('v=')[-1] if 'v=' in video.video_url else video.video_url.split('/')[-1]
@@ -96,12 +108,10 @@ async def show_history_page(query: CallbackQuery, page: int = 1):
             f"   🎯 Тип: {analysis_type_ru}\n\n"
         )
     
-    total_pages = (total_count + limit - 1) // limit
-    
     await safe_edit_text(
         query,
         history_text,
-        reply_markup=get_history_keyboard(page, total_pages, videos),
+        reply_markup=get_history_keyboard(videos, prev_cursor, next_cursor),
         parse_mode="HTML"
     )
 
@@ -113,7 +123,7 @@ async def back_from_analysis_type(query: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("download:"))
-async def download_report_handler(query: CallbackQuery):
+async def download_report_handler(query: CallbackQuery, db_user: User | None):
     
     video_db_id = int(query.data.split(":")[-1])
     
@@ -129,19 +139,21 @@ async def download_report_handler(query: CallbackQuery):
     
     
     video_id = video.video_url.split('v=')[-1] if 'v=' in video.video_url else video.video_url.split('/')[-1]
-    user = await get_user(query.from_user.id)
+    user = db_user
     
     pdf_path = Path(f"reports/{user.user_id}/{video_id}_{ai_response.analysis_type}.pdf")
     
     if not pdf_path.exists():
         await query.answer("⏳ Генерация PDF...", show_alert=True)
-        pdf_file = generate_pdf(ai_response.response_text, video.video_url, video_id)
+        response_text = await get_ai_response_text(ai_response.id)
+        pdf_file = await render_pdf(response_text, video.video_url, video_id, ai_response.analysis_type)
         pdf_path.parent.mkdir(parents=True, exist_ok=True)
         os.rename(pdf_file, str(pdf_path))
     
     try:
-        await query.message.answer_document(
-            FSInputFile(pdf_path),
+        await send_document(
+            query.message,
+            pdf_path,
             caption=f"📊 Отчет для видео: <code>{video_id}</code>\n"
                     f"📅 Дата: {video.processed_at.strftime('%d.%m.%Y %H:%M')}",
             parse_mode="HTML"
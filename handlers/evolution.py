@@ -1,5 +1,5 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from callbacks.menu import MenuCallback
@@ -7,20 +7,21 @@ from handlers.analysis import ADMIN_IDS
 from keyboards.client import get_main_menu_keyboard
 from database.crud import (
     create_evolution_analysis,
-    get_user,
     get_balanced_evolution_analyses,
     get_channel_analysis_stats,
     get_evolution_prompts,
     update_evolution_step1,
     update_evolution_step2  
 )
+from database.models import User
 from services.ai_service import analyze_comments_with_prompt
-from services.youtube_service import get_channel_info_by_id
-from services.pdf_generator import generate_pdf
+from services.channel_metadata import get_channel_info
+from services.pdf_render_service import render_pdf
+from services.document_delivery import send_document
+from services.artifact_storage import get_artifact_storage
 from states.evolution import EvolutionFSM
-import os
+import asyncio
 import json
-from pathlib import Path
 from datetime import datetime
 from utils.helpers import clean_html_for_telegram, safe_edit_text
 from utils.texts import FEATURE_IN_DEVELOPMENT
@@ -57,9 +58,9 @@ def get_channels_keyboard(channels: list):
 
 
 @router.callback_query(MenuCallback.filter(F.action == "content_evolution"))
-async def content_evolution_handler(query: CallbackQuery, state: FSMContext):
+async def content_evolution_handler(query: CallbackQuery, state: FSMContext, db_user: User | None):
     """Обработчик эволюции контента с проверкой требований"""
-    user = await get_user(query.from_user.id)
+    user = db_user
     
     if not user:
         await query.answer("❌ Пользователь не найден", show_alert=True)
@@ -116,8 +117,7 @@ def extract_machine_data_from_file(txt_path: str) -> dict:
     TXT fayldan machine_data JSON ni extract qiladi
     """
     try:
-        with open(txt_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = get_artifact_storage().read_text(txt_path)
         
         # JSON bloklarni qidirish
         if '```json' in content:
@@ -141,7 +141,7 @@ def extract_machine_data_from_file(txt_path: str) -> dict:
 
 
 @router.callback_query(F.data.startswith("evolution:select:"))
-async def select_channel_handler(query: CallbackQuery, state: FSMContext):
+async def select_channel_handler(query: CallbackQuery, state: FSMContext, db_user: User | None):
     channel_id = query.data.split(":", 2)[2]
     await state.update_data(selected_channel_id=channel_id)
     
@@ -149,7 +149,7 @@ async def select_channel_handler(query: CallbackQuery, state: FSMContext):
     admin_badge = "👑 " if is_admin else ""
 
     try:
-        channel_info = await get_channel_info_by_id(channel_id)
+        channel_info = await get_channel_info(channel_id)
         channel_title = channel_info['title']
     except Exception:
         channel_title = channel_id[:30] + "..."
@@ -159,7 +159,8 @@ async def select_channel_handler(query: CallbackQuery, state: FSMContext):
         user_id=query.from_user.id,
         channel_id=channel_id,
         min_advanced=5,
-        total_limit=10
+        total_limit=10,
+        with_bodies=True
     )
 
     if not balanced_analyses:
@@ -238,7 +239,7 @@ async def select_channel_handler(query: CallbackQuery, state: FSMContext):
                         pass
             
             # Fallback: TXT fayldan o'qish (eski versiya uchun)
-            if not machine_data and ai_response.txt_file_path and os.path.exists(ai_response.txt_file_path):
+            if not machine_data and get_artifact_storage().exists(ai_response.txt_file_path):
                 machine_data = extract_machine_data_from_file(ai_response.txt_file_path)
             
             # Agar machine_data topilmasa, response_text ishlatamiz
@@ -273,7 +274,7 @@ async def select_channel_handler(query: CallbackQuery, state: FSMContext):
             await state.clear()
             return
 
-        user = await get_user(query.from_user.id)
+        user = db_user
         
         evolution = await create_evolution_analysis(
             user_id=user.user_id,
@@ -347,44 +348,44 @@ async def select_channel_handler(query: CallbackQuery, state: FSMContext):
             parse_mode="HTML"
         )
         
-        evolution_dir = Path(f"reports/{user.user_id}/evolution")
-        evolution_dir.mkdir(parents=True, exist_ok=True)
-        
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        storage = get_artifact_storage()
         
-        txt_filename = f"evolution_{channel_id}_{timestamp}.txt"
-        txt_path = evolution_dir / txt_filename
-        
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write("=" * 80 + "\n")
-            f.write("ЭВОЛЮЦИЯ КОНТЕНТА КАНАЛА\n")
-            f.write("=" * 80 + "\n\n")
-            f.write(f"Канал: {channel_title}\n")
-            f.write(f"Канал ID: {channel_id}\n")
-            f.write(f"Анализов: {len(all_analyses)} ({advanced_count} углубл. + {simple_count} прост.)\n")
-            if date_range:
-                f.write(f"Период: {earliest_date} — {latest_date}\n")
-            f.write(f"Дата отчета: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
-            f.write("\n" + "=" * 80 + "\n\n")
-            f.write(final_response)
+        report_lines = [
+            "=" * 80 + "\n",
+            "ЭВОЛЮЦИЯ КОНТЕНТА КАНАЛА\n",
+            "=" * 80 + "\n\n",
+            f"Канал: {channel_title}\n",
+            f"Канал ID: {channel_id}\n",
+            f"Анализов: {len(all_analyses)} ({advanced_count} углубл. + {simple_count} прост.)\n",
+        ]
+        if date_range:
+            report_lines.append(f"Период: {earliest_date} — {latest_date}\n")
+        report_lines.append(f"Дата отчета: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n")
+        report_lines.append("\n" + "=" * 80 + "\n\n")
+        report_lines.append(final_response)
+        txt_handle = await asyncio.to_thread(
+            storage.put_text, "evolution_txt", "".join(report_lines), f"evolution_{channel_id}_{timestamp}.txt"
+        )
 
         fake_video_url = f"https://www.youtube.com/channel/{channel_id}"
-        pdf_file = generate_pdf(
+        pdf_file = await render_pdf(
             final_response, 
             fake_video_url, 
             f"evolution_{channel_id}"
         )
         
-        pdf_filename = f"evolution_{channel_id}_{timestamp}.pdf"
-        pdf_path = evolution_dir / pdf_filename
-        os.rename(pdf_file, str(pdf_path))
+        pdf_handle = await asyncio.to_thread(
+            storage.put_file, "evolution_pdf", pdf_file, filename=f"evolution_{channel_id}_{timestamp}.pdf", remove=True
+        )
+        pdf_path = await asyncio.to_thread(storage.materialize, pdf_handle)
 
         analysis_period = f"{earliest_date} — {latest_date}" if dates else "неизвестный период"
         await update_evolution_step2(
             evolution.id,
             final_response,
-            pdf_path=str(pdf_path),
-            txt_path=str(txt_path),
+            pdf_path=pdf_handle,
+            txt_path=txt_handle,
             analysis_period=analysis_period
         )
 
@@ -397,8 +398,9 @@ async def select_channel_handler(query: CallbackQuery, state: FSMContext):
         
         await query.message.edit_text(safe_summary, parse_mode="HTML")
         
-        await query.message.answer_document(
-            FSInputFile(pdf_path),
+        await send_document(
+            query.message,
+            pdf_path,
             caption=f"📊 <b>{admin_badge}Эволюция контента</b>\n\n"
                     f"📺 {channel_title}\n"
                     f"📈 Анализов: {len(all_analyses)}\n"
@@ -1,5 +1,5 @@
 from aiogram import Router, F, Bot
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from callbacks.menu import MenuCallback
@@ -11,7 +11,8 @@ from services.sample_report_service import SampleReportsService
 from services.youtube_service import extract_video_id, is_shorts_url, get_video_comments_adaptive
 from services.shorts_preprocessor import RawDataShortsPreprocessor
 from services.ai_service import analyze_comments_with_prompt
-from services.pdf_generator import generate_pdf
+from services.pdf_render_service import render_pdf
+from services.document_delivery import send_document
 from states.analysis import AnalysisFSM
 from states.admin import AdminFSM
 from datetime import datetime
@@ -27,6 +28,7 @@ from services.active_analysis import (
     get_active,
     cleanup_cancelled_analysis,
 )
+from services.analysis_queue import queue_enabled, enqueue_analysis, has_active_job, record_job_progress
 
 router = Router()
 
@@ -147,6 +149,7 @@ async def _run_shorts_analysis_task(
         # Persist in DB
         db_video_id = await create_video(user.id, url, f"Shorts: {video_id}")
         runtime.db_video_id = int(db_video_id)
+        await record_job_progress(runtime, video_id=int(db_video_id))
 
         # Store AIResponse id for cleanup
         ai_id = await create_ai_response(
@@ -162,7 +165,7 @@ async def _run_shorts_analysis_task(
             pass
 
         await progress_msg.edit_text("📄 Генерация PDF...", reply_markup=get_stop_analysis_keyboard())
-        pdf_file = generate_pdf(analysis_result, url, video_id)
+        pdf_file = await render_pdf(analysis_result, url, video_id, analysis_type)
         runtime.add_file(pdf_file)
 
         reports_dir = Path(f"reports/{user.user_id}/shorts")
@@ -175,8 +178,9 @@ async def _run_shorts_analysis_task(
 
         await progress_msg.delete()
 
-        await message.answer_document(
-            FSInputFile(str(saved_pdf_path)),
+        await send_document(
+            message,
+            str(saved_pdf_path),
             caption=(
                 f"📊 <b>Анализ Shorts готов!</b>\n\n"
                 f"🎬 Видео: <code>{video_id}</code>\n"
@@ -189,6 +193,8 @@ async def _run_shorts_analysis_task(
         )
 
         if not is_admin:
+            # Flag first: a crash in between must not make a retry charge again
+            await record_job_progress(runtime, charged=True)
             await update_user_analyses(user.user_id, user.analyses_used + 1)
             remaining = user.analyses_limit - (user.analyses_used + 1)
             await message.answer(
@@ -231,6 +237,7 @@ async def _run_shorts_analysis_task(
         import traceback
 
         traceback.print_exc()
+        runtime.error = str(e)
         try:
             await progress_msg.edit_text(
                 f"❌ <b>ОШИБКА</b>\n\n<code>{str(e)}</code>",
@@ -436,6 +443,27 @@ async def process_shorts_url(message: Message, state: FSMContext):
     # Start background task; FSM state no longer needed.
     await state.clear()
 
+    if queue_enabled():
+        if await has_active_job(user_id):
+            await message.answer(
+                "⏳ У вас уже идет анализ. Дождитесь завершения текущего.\n\nВыберите действие:",
+                reply_markup=get_main_menu_keyboard(),
+            )
+            return
+
+        await enqueue_analysis(
+            user_id=user_id,
+            chat_id=message.chat.id,
+            kind="shorts",
+            url=url,
+            payload={"level_mode": level_mode, "manual_level": manual_level, "is_admin": is_admin},
+        )
+        await message.answer(
+            "📥 Анализ Shorts поставлен в очередь. Прогресс появится здесь.",
+            reply_markup=get_stop_analysis_keyboard(),
+        )
+        return
+
     runtime = ActiveAnalysis(
         user_id=user_id,
         chat_id=message.chat.id,
@@ -486,16 +514,12 @@ async def send_shorts_demo_report(message: Message, user_id: int):
         parse_mode="HTML"
     )
     
-    analysis_data = sample_report['analysis_data']
-    pdf_path = analysis_data.get('pdf_path')
-    
-    if pdf_path and os.path.exists(pdf_path):
-        await message.answer_document(
-            FSInputFile(pdf_path),
-            caption="📊 <b>ДЕМО Shorts готов!</b>\n\n"
-                    "<i>Подтвердите канал для реальных анализов!</i>",
-            parse_mode="HTML"
-        )
+    await SampleReportsService.send_sample_report(
+        message,
+        sample_report,
+        caption="📊 <b>ДЕМО Shorts готов!</b>\n\n"
+                "<i>Подтвердите канал для реальных анализов!</i>",
+    )
 
 
 
@@ -30,6 +30,19 @@ async def start_verification_from_analysis_short(query: CallbackQuery, state: FS
     user_id = query.from_user.id
     
     channel_url = pending_verification_channels.get(user_id)
+
+    if not channel_url:
+        # Queue mode: the ownership check ran in a worker process, so the
+        # channel is resolved again from the user's last queued analysis.
+        from services.analysis_queue import queue_enabled
+        if queue_enabled():
+            from database.crud import get_latest_analysis_job
+            from services.youtube_service import get_video_channel_info
+
+            job = await get_latest_analysis_job(user_id)
+            channel_info = await get_video_channel_info(job.url) if job else None
+            if channel_info:
+                channel_url = channel_info['channel_url']
     
     if not channel_url:
         await query.answer("❌ Ошибка: канал не найден. Попробуйте снова.", show_alert=True)
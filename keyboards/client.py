@@ -116,7 +116,7 @@ def get_cabinet_keyboard():
     return builder.as_markup()
 
 
-def get_history_keyboard(current_page: int, total_pages: int, videos: list):
+def get_history_keyboard(videos: list, prev_cursor: str | None = None, next_cursor: str | None = None):
     builder = InlineKeyboardBuilder()
 
     for video, ai_response in videos:
@@ -129,14 +129,14 @@ def get_history_keyboard(current_page: int, total_pages: int, videos: list):
     builder.adjust(2)
 
     nav_buttons = []
-    if current_page > 1:
+    if prev_cursor:
         nav_buttons.append(
-            InlineKeyboardButton(text="◀️ Назад", callback_data=f"history:page:{current_page-1}")
+            InlineKeyboardButton(text="◀️ Назад", callback_data=f"history:c:{prev_cursor}")
         )
 
-    if current_page < total_pages:
+    if next_cursor:
         nav_buttons.append(
-            InlineKeyboardButton(text="Вперед ▶️", callback_data=f"history:page:{current_page+1}")
+            InlineKeyboardButton(text="Вперед ▶️", callback_data=f"history:c:{next_cursor}")
         )
 
     if nav_buttons:
@@ -1,15 +1,20 @@
 import asyncio
 import logging
+import signal
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
-from config import Config
+from config import Config, reload_config
 from database.engine import create_db
 from handlers import start_router, menu_router, analysis_router, cabinet_router, admin_router, verification_router, evolution_router, shorts_router
 from middlewares.admin_check import AdminMiddleware
+from middlewares.user_context import UserContextMiddleware
 from handlers.strategic_hub import router as strategic_router
 from services.multi_analysis_optimizer import run_multi_analysis_optimizer_scheduler
+from services.pdf_render_service import get_pdf_render_service
+from services.artifact_storage import run_artifact_retention_scheduler
+from database.crud import run_cache_invalidation_listener
 
 logging.basicConfig(level=logging.INFO)
 
@@ -30,6 +35,8 @@ async def main():
 
     dp.message.middleware(AdminMiddleware())
     dp.callback_query.middleware(AdminMiddleware())
+    dp.message.middleware(UserContextMiddleware())
+    dp.callback_query.middleware(UserContextMiddleware())
     
 
     dp.include_router(start_router)
@@ -44,8 +51,25 @@ async def main():
 
     await create_db()
 
+    # Warm PDF render workers (WeasyPrint runs off the event loop)
+    get_pdf_render_service().start()
+
     # TZ-2: background optimizer (Advanced-only), runs every 30 minutes
     asyncio.create_task(run_multi_analysis_optimizer_scheduler(interval_seconds=1800))
+
+    # Artefact retention (storage/ blobs + legacy ai_logs/results/cache dirs)
+    asyncio.create_task(run_artifact_retention_scheduler())
+
+    # `kill -HUP <pid>`: re-read .env (admin list etc.) without a restart
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP, lambda: (reload_config(), logging.info("🔄 Config qayta yuklandi"))
+        )
+    except (NotImplementedError, AttributeError):
+        pass  # Windows
+
+    # Prompt/user edits in the admin panel invalidate the in-memory prompt registry and user cache
+    asyncio.create_task(run_cache_invalidation_listener())
     
     logging.info("🚀 Bot ishga tushdi...")
     
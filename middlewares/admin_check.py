@@ -1,6 +1,6 @@
 from aiogram import BaseMiddleware
 from aiogram.types import Message
-from config import Config
+from config import is_admin
 from typing import Callable, Dict, Any, Awaitable
 
 class AdminMiddleware(BaseMiddleware):
@@ -10,10 +10,6 @@ class AdminMiddleware(BaseMiddleware):
         event: Message,
         data: Dict[str, Any]
     ) -> Any:
-        config = Config()
-        if event.from_user.id in config.ADMIN_IDS:
-            data['is_admin'] = True
-            print(f"Admin access granted to user ID: {event.from_user.id}")
-        else:
-            data['is_admin'] = False
-        return await handler(event, data)
\ No newline at end of file
+        # Settings snapshot from startup (config.reload_config on SIGHUP), not Config() per update
+        data['is_admin'] = is_admin(event.from_user.id)
+        return await handler(event, data)
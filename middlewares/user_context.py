@@ -0,0 +1,29 @@
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from typing import Callable, Dict, Any, Awaitable
+
+from database.crud import get_user, user_context
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """Resolves the sender's User once per update.
+
+    Handlers can take it as `db_user` (None for users not registered yet);
+    crud helpers called for this user, including from tasks the handler
+    starts, reuse it instead of looking the user up again.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = getattr(event, "from_user", None)
+        if from_user is None:
+            return await handler(event, data)
+
+        user = await get_user(from_user.id)
+        data['db_user'] = user
+        with user_context(user):
+            return await handler(event, data)
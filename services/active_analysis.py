@@ -8,6 +8,8 @@ from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Optional, Set, List
 
+from services.artifact_storage import get_artifact_storage, is_handle
+
 
 @dataclass
 class ActiveAnalysis:
@@ -29,8 +31,13 @@ class ActiveAnalysis:
     ai_response_ids: List[int] = field(default_factory=list)
     file_paths: Set[str] = field(default_factory=set)
 
+    # Queue job running this analysis (None for in-process runs)
+    job_id: Optional[int] = None
+
     cancel_event: asyncio.Event = field(default_factory=asyncio.Event)
     task: Optional[asyncio.Task] = None
+    # Set by the pipeline when it failed (already reported to the user)
+    error: Optional[str] = None
 
     def add_file(self, path: str | os.PathLike) -> None:
         if not path:
@@ -68,6 +75,8 @@ async def cleanup_cancelled_analysis(a: ActiveAnalysis) -> None:
     - Remove partially created DB rows so downstream features (history, Strategic Hub, TZ-2
       multi-analysis sets) do not see "broken" analyses.
     - Remove generated artifacts (reports, logs, temp files) for the cancelled run.
+    - Keep advanced-analysis checkpoints: they let the next run of the same video resume
+      from the last finished module (see services/analysis_checkpoint.py).
 
     Cleanup must be idempotent and must never raise.
     """
@@ -137,6 +146,10 @@ async def cleanup_cancelled_analysis(a: ActiveAnalysis) -> None:
         try:
             if not p:
                 continue
+            if is_handle(p):
+                # Releases this run's reference; a blob shared with other rows stays
+                get_artifact_storage().delete(p)
+                continue
             if os.path.isdir(p):
                 shutil.rmtree(p, ignore_errors=True)
             elif os.path.exists(p):
@@ -0,0 +1,87 @@
+"""Cached admin dashboard statistics (stale-while-revalidate).
+
+Each cached value is served as-is while younger than ADMIN_STATS_TTL_SECONDS.
+After that, and for up to ADMIN_STATS_STALE_SECONDS, the stale value is still
+returned immediately while one background refresh runs per key, so a burst of
+dashboard loads never turns into a burst of identical aggregate queries.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from config import Config
+from database.crud import get_analysis_type_stats, get_daily_counts, get_dashboard_counts
+
+SERIES_MAX_DAYS = 365
+
+config = Config()
+
+
+class _SWRCache:
+    def __init__(self):
+        self._values: Dict[Hashable, Tuple[float, Any]] = {}
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: float, max_stale: float) -> Any:
+        cached = self._values.get(key)
+        if cached is not None:
+            age = time.monotonic() - cached[0]
+            if age < ttl:
+                return cached[1]
+            if age < ttl + max_stale:
+                self._refresh(key, loader)
+                return cached[1]
+        # Nothing usable: wait for the (shared) refresh; shield so one
+        # cancelled request does not cancel it for the others
+        return await asyncio.shield(self._refresh(key, loader))
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda _t: self._refreshing.pop(key, None))
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        except Exception as e:
+            print(f"⚠️ Admin statistikasini yangilashda xato ({key}): {e}")
+            cached = self._values.get(key)
+            if cached is not None:
+                return cached[1]
+            raise
+        self._values[key] = (time.monotonic(), value)
+        return value
+
+    def clear(self):
+        self._values.clear()
+
+
+_cache = _SWRCache()
+
+
+async def _load_dashboard() -> dict:
+    counts, analysis_types = await asyncio.gather(get_dashboard_counts(), get_analysis_type_stats())
+    return {**counts, "analysis_types": analysis_types}
+
+
+async def get_dashboard_stats() -> dict:
+    """Totals, today's counts and per-analysis-type counts for /admin/stats."""
+    return await _cache.get(
+        "dashboard", _load_dashboard,
+        ttl=config.ADMIN_STATS_TTL_SECONDS, max_stale=config.ADMIN_STATS_STALE_SECONDS,
+    )
+
+
+async def get_daily_series(days: int = 30) -> dict:
+    """Per-day users/videos/requests for the dashboard chart."""
+    days = max(1, min(int(days), SERIES_MAX_DAYS))
+    return await _cache.get(
+        ("series", days), lambda: get_daily_counts(days),
+        ttl=config.ADMIN_STATS_TTL_SECONDS, max_stale=config.ADMIN_STATS_STALE_SECONDS,
+    )
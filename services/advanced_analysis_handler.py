@@ -7,10 +7,14 @@ from html import escape
 from services.ai_service import analyze_comments_with_prompt, save_ai_interaction
 from database.crud import get_prompts, create_ai_response
 from services.advanced_validator import AdvancedModuleValidator, ValidationLogger
-from validators import FinalSynthesisValidator
+from services.retry_policy import get_retry_policy
+from services.analysis_checkpoint import AnalysisCheckpoint, compute_prompt_set_version
+from services.tracing import trace_span, traced
+from validators import FinalSynthesisValidator, build_fixed_indices_prompt, precompute_synthesis_indices
 from validators.logger import FinalSynthesisValidationLogger
 
 
+@traced("analysis.advanced")
 async def run_advanced_analysis_with_validation(
     user_id: int,
     video_id: str,
@@ -26,14 +30,28 @@ async def run_advanced_analysis_with_validation(
 ) -> Tuple[str, List[Dict], str | None, int]:
     """
     Запуск углубленного анализа с пошаговой валидацией
+
+    Прогресс (выходы модулей, валидация, попытки синтеза) сохраняется в
+    checkpoint по ключу (user, video, версия набора промптов): повторный запуск
+    после рестарта/остановки продолжает с последнего готового модуля.
     """
     
     # Инициализируем валидатор с 4 максимальными попытками
-    validator = AdvancedModuleValidator(max_retries=4)
+    validator = AdvancedModuleValidator(max_retries=4, retry_policy=await get_retry_policy())
     
     advanced_prompts = await get_prompts(category=category, analysis_type="advanced")
     if not advanced_prompts:
         raise ValueError("Нет advanced промптов в базе")
+
+    synthesis_prompts = await get_prompts(category=category, analysis_type="synthesis")
+    if not synthesis_prompts:
+        raise ValueError("Должен быть synthesis промпт")
+
+    checkpoint = await AnalysisCheckpoint.load(
+        user_id=user_id,
+        youtube_video_id=video_id,
+        prompt_set_version=compute_prompt_set_version(advanced_prompts, synthesis_prompts),
+    )
     
     module_mapping = {
         0: "10-1",
@@ -56,6 +74,32 @@ async def run_advanced_analysis_with_validation(
         
         config = validator.modules_config[module_id]
         module_name = config['name']
+
+        # Модуль уже прошёл валидацию в прерванном запуске — берём сохранённый результат
+        # (partial-модули выполняются заново)
+        saved_module = checkpoint.module_output(module_id)
+        if saved_module:
+            try:
+                await create_ai_response(
+                    user_id,
+                    db_video_id,
+                    idx + 1,
+                    f"advanced_{module_id}",
+                    saved_module["response"],
+                )
+            except Exception as e:
+                print(f"⚠️ Ошибка сохранения в БД: {e}")
+
+            partial_responses.append(saved_module["response"])
+            try:
+                await message.answer(
+                    f"♻️ <b>Модуль {module_id}: {escape(module_name)}</b>\n"
+                    f"Восстановлен из сохранённого прогресса",
+                    parse_mode="HTML"
+                )
+            except Exception as e:
+                print(f"⚠️ Ошибка отправки сообщения: {e}")
+            continue
         
         attempt = 1
         validation_success = False
@@ -97,10 +141,11 @@ async def run_advanced_analysis_with_validation(
             
             # Запрос к AI
             try:
-                partial_response = await analyze_comments_with_prompt(
-                    ai_input_context, 
-                    prompt_text
-                )
+                async with trace_span("ai.module", module=module_id, attempt=attempt):
+                    partial_response = await analyze_comments_with_prompt(
+                        ai_input_context, 
+                        prompt_text
+                    )
             except Exception as e:
                 print(f"❌ Ошибка AI запроса для модуля {module_id}: {e}")
                 if attempt >= validator.max_retries + 1:
@@ -119,11 +164,14 @@ async def run_advanced_analysis_with_validation(
             )
             
             # ВАЛИДАЦИЯ РЕЗУЛЬТАТА
-            validation_result = validator.validate_module(
-                module_id, 
-                partial_response,
-                attempt
-            )
+            with trace_span("validation.module", module=module_id, attempt=attempt) as span:
+                validation_result = validator.validate_module(
+                    module_id, 
+                    partial_response,
+                    attempt
+                )
+                if span:
+                    span.set_attribute("quality_score", validation_result.quality_score)
 
             if cancel_event is not None and cancel_event.is_set():
                 raise asyncio.CancelledError()
@@ -199,6 +247,14 @@ async def run_advanced_analysis_with_validation(
                 
                 partial_responses.append(partial_response)
                 all_partial_logs.append(partial_log)
+
+                await checkpoint.save_module(
+                    module_id,
+                    response=partial_response,
+                    status="valid",
+                    attempts=attempt,
+                    validation_result=validation_result,
+                )
                 
                 break  # Выходим из цикла retry
             
@@ -228,6 +284,14 @@ async def run_advanced_analysis_with_validation(
                 
                 partial_responses.append(partial_response)
                 all_partial_logs.append(partial_log)
+
+                await checkpoint.save_module(
+                    module_id,
+                    response=partial_response,
+                    status="partial",
+                    attempts=attempt,
+                    validation_result=validation_result,
+                )
                 
                 # Предупреждение пользователю
                 try:
@@ -255,10 +319,6 @@ async def run_advanced_analysis_with_validation(
         f"🔄 Финальный синтез...\n{'▓' * 9}░ 90%"
     )
     
-    synthesis_prompts = await get_prompts(category=category, analysis_type="synthesis")
-    if not synthesis_prompts:
-        raise ValueError("Должен быть synthesis промпт")
-    
     synthesis_prompt_text = synthesis_prompts[0].prompt_text
     
     combined_partials = "\n\n".join([
@@ -270,6 +330,12 @@ async def run_advanced_analysis_with_validation(
     fs_validator = FinalSynthesisValidator()
     partial_by_module = {module_mapping[i]: resp for i, resp in enumerate(partial_responses) if i in module_mapping}
 
+    # Pre-synthesis stage: indices are calculated locally from module tables
+    # and passed to the model as fixed values (no arithmetic on the AI side).
+    precomputed_indices = precompute_synthesis_indices(partial_by_module)
+    fixed_indices_prompt = build_fixed_indices_prompt(precomputed_indices)
+    print(f"📐 Pre-synthesis indices: {precomputed_indices}")
+
     # Normalize meta keys
     normalized_video_meta = dict(video_meta_full or {})
     normalized_video_meta.setdefault("id", video_id)
@@ -283,11 +349,12 @@ async def run_advanced_analysis_with_validation(
     last_retry_prompt = ""
 
     for attempt in range(1, max_attempts + 1):
-        attempt_prompt = synthesis_prompt_text
+        attempt_prompt = synthesis_prompt_text + "\n\n" + fixed_indices_prompt
         if attempt > 1 and last_retry_prompt:
-            attempt_prompt = synthesis_prompt_text + "\n\n" + last_retry_prompt
+            attempt_prompt = attempt_prompt + "\n\n" + last_retry_prompt
 
-        final_ai_response = await analyze_comments_with_prompt(combined_partials, attempt_prompt)
+        async with trace_span("ai.synthesis", attempt=attempt):
+            final_ai_response = await analyze_comments_with_prompt(combined_partials, attempt_prompt)
 
         synthesis_log = save_ai_interaction(
             user_id=user_id,
@@ -298,11 +365,15 @@ async def run_advanced_analysis_with_validation(
         )
 
         # Validate
-        validation_result = fs_validator.validate(
-            raw_report=final_ai_response,
-            video_meta=normalized_video_meta,
-            partial_responses=partial_by_module,
-        )
+        with trace_span("validation.synthesis", attempt=attempt) as span:
+            validation_result = fs_validator.validate(
+                raw_report=final_ai_response,
+                video_meta=normalized_video_meta,
+                partial_responses=partial_by_module,
+                precomputed_indices=precomputed_indices,
+            )
+            if span:
+                span.set_attribute("score", validation_result.score)
 
         # Persist validation result
         try:
@@ -338,6 +409,16 @@ async def run_advanced_analysis_with_validation(
             "created_at": datetime.now().isoformat(),
         })
 
+        await checkpoint.save_synthesis_attempt({
+            "attempt": attempt,
+            "status": validation_result.status,
+            "score": validation_result.score,
+            "retry_needed": validation_result.retry_needed,
+            "issues": [i.type for i in validation_result.issues],
+            "response_path": synthesis_log.get("response_path"),
+            "created_at": datetime.now().isoformat(),
+        })
+
         # Decide whether to retry synthesis
         if validation_result.retry_needed and validation_result.retry_prompt and attempt < max_attempts:
             last_retry_prompt = validation_result.retry_prompt
@@ -372,7 +453,11 @@ async def run_advanced_analysis_with_validation(
                 "user_id": user_id,
                 "comment_count": len(full_context.split('\n')),
                 "analysis_timestamp": datetime.now().isoformat()
-            }
+            },
+            fixed_indices={
+                "content_health_index": precomputed_indices.chi_for_mode(validation_result.mode),
+                "strategic_stability_index": precomputed_indices.strategic_stability_index,
+            },
         )
         
         # Machine data ni qaytaramiz
@@ -406,19 +491,26 @@ async def run_advanced_analysis_with_validation(
     except Exception as e:
         print(f"⚠️ Ошибка сохранения финального результата в БД: {e}")
 
+    await checkpoint.complete()
+
     return final_ai_response, all_partial_logs, machine_data if 'machine_data' in locals() else None, final_ai_response_id
 
 
 # ===== YANGI FUNKSIYA: Machine-readable data yaratish =====
 
+@traced("analysis.machine_format")
 async def create_machine_readable_data(
     user_id: int,
     video_id: str,
     partial_responses: List[str],
-    video_meta: Dict
+    video_meta: Dict,
+    fixed_indices: Dict | None = None,
 ) -> str:
     """
     Partial responses dan machine-readable JSON yaratish
+
+    fixed_indices: sintezdan oldin hisoblangan indekslar (CHI/SSI) — hisobot
+    bilan bir xil qiymatlar bo'lishi uchun IndexCalculator natijasini almashtiradi.
     """
     try:
         from analysis_modules import MachineReadableFormatter, IndexCalculator
@@ -443,6 +535,9 @@ async def create_machine_readable_data(
         # Strategic indekslarni hisoblash
         calculator = IndexCalculator()
         strategic_indices = calculator.calculate_all_indices(modules_data)
+        for key, value in (fixed_indices or {}).items():
+            if value is not None:
+                strategic_indices[key] = value
         
         print(f"  📈 Strategic indekslar hisoblandi:")
         print(f"     - Content Health Index: {strategic_indices.get('content_health_index', 'N/A')}")
@@ -15,12 +15,14 @@ class ValidationResult:
 class AdvancedModuleValidator:
     """Улучшенный валидатор с более гибкими критериями"""
     
-    def __init__(self, max_retries: int = 2):
+    def __init__(self, max_retries: int = 2, retry_policy=None):
         """
         Инициализация валидатора
         
         Args:
             max_retries: Максимальное количество попыток переделки (по умолчанию 2)
+            retry_policy: RetryPolicy (services/retry_policy.py) — отключает повторы,
+                которые по истории валидаций почти никогда не помогают
         """
         self.modules_config = {
             "10-1": {
@@ -64,6 +66,7 @@ class AdvancedModuleValidator:
         }
         
         self.max_retries = max_retries
+        self.retry_policy = retry_policy
 
     def validate_module(self, module_id: str, content: str, attempt: int = 1) -> ValidationResult:
         """Улучшенная валидация с более мягкими критериями"""
@@ -138,6 +141,9 @@ class AdvancedModuleValidator:
 
         # Определяем нужен ли retry
         retry_needed = quality_points < config["min_quality_score"] and attempt < self.max_retries
+        if retry_needed and self.retry_policy is not None and not self.retry_policy.should_retry(module_id, attempt):
+            retry_needed = False
+            metrics["retry_skipped_by_policy"] = True
         
         return ValidationResult(
             is_valid=quality_points >= config["min_quality_score"],
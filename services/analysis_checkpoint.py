@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+from database.crud import get_advanced_checkpoint, save_advanced_checkpoint
+
+# Module outputs older than this are not reused (comments may have changed)
+DEFAULT_TTL_HOURS = 24
+
+
+def compute_prompt_set_version(advanced_prompts: List[Any], synthesis_prompts: List[Any]) -> str:
+    """Stable hash of the prompts used by a run.
+
+    Editing any advanced/synthesis prompt in the admin panel changes the version,
+    so old checkpoints are never mixed with new prompts.
+    """
+    h = hashlib.sha256()
+    for p in list(advanced_prompts or []) + list(synthesis_prompts or [])[:1]:
+        h.update(f"{p.id}:{p.analysis_type}:".encode("utf-8"))
+        h.update((p.prompt_text or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+@dataclass
+class AnalysisCheckpoint:
+    """Runtime view of a persisted advanced-analysis checkpoint.
+
+    Persistence is best-effort: a failing DB write is logged and never breaks
+    the analysis itself.
+    """
+
+    user_id: int
+    youtube_video_id: str
+    prompt_set_version: str
+    modules: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    synthesis_attempts: List[Dict[str, Any]] = field(default_factory=list)
+    resumed: bool = False
+
+    @classmethod
+    async def load(
+        cls,
+        *,
+        user_id: int,
+        youtube_video_id: str,
+        prompt_set_version: str,
+        ttl_hours: int = DEFAULT_TTL_HOURS,
+    ) -> "AnalysisCheckpoint":
+        checkpoint = cls(user_id=user_id, youtube_video_id=youtube_video_id, prompt_set_version=prompt_set_version)
+        try:
+            row = await get_advanced_checkpoint(
+                user_identifier=user_id,
+                youtube_video_id=youtube_video_id,
+                prompt_set_version=prompt_set_version,
+            )
+        except Exception as e:
+            print(f"⚠️ Checkpoint yuklashda xato: {e}")
+            return checkpoint
+
+        if not row or row.status == "completed" or not row.updated_at:
+            return checkpoint
+        if datetime.now(tz=timezone.utc) - row.updated_at > timedelta(hours=ttl_hours):
+            return checkpoint
+
+        checkpoint.modules = dict(row.modules or {})
+        checkpoint.synthesis_attempts = list(row.synthesis_attempts or [])
+        checkpoint.resumed = bool(checkpoint.modules)
+        return checkpoint
+
+    def module_output(self, module_id: str) -> Optional[Dict[str, Any]]:
+        """Saved output of a module that passed validation.
+
+        Modules saved as "partial" (validation attempts exhausted) are not
+        restored: a resumed run gives them another full set of attempts.
+        """
+        saved = self.modules.get(module_id)
+        if saved and saved.get("response") and saved.get("status", "valid") == "valid":
+            return saved
+        return None
+
+    async def _persist(self, status: str = "running") -> None:
+        try:
+            await save_advanced_checkpoint(
+                user_identifier=self.user_id,
+                youtube_video_id=self.youtube_video_id,
+                prompt_set_version=self.prompt_set_version,
+                modules=self.modules,
+                synthesis_attempts=self.synthesis_attempts,
+                status=status,
+            )
+        except Exception as e:
+            print(f"⚠️ Checkpoint saqlashda xato: {e}")
+
+    async def save_module(
+        self,
+        module_id: str,
+        *,
+        response: str,
+        status: str,
+        attempts: int,
+        validation_result: Any,
+    ) -> None:
+        try:
+            validation = asdict(validation_result)
+        except Exception:
+            validation = None
+        self.modules[module_id] = {
+            "response": response,
+            "status": status,  # valid/partial
+            "attempts": attempts,
+            "validation": validation,
+            "saved_at": datetime.now(tz=timezone.utc).isoformat(),
+        }
+        await self._persist()
+
+    async def save_synthesis_attempt(self, entry: Dict[str, Any]) -> None:
+        self.synthesis_attempts.append(entry)
+        await self._persist()
+
+    async def complete(self) -> None:
+        await self._persist(status="completed")
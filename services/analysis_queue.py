@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+from typing import Any, Dict, Optional
+
+from aiogram import Bot
+
+import config
+from database.crud import (
+    claim_next_analysis_job,
+    delete_video_by_id,
+    enqueue_analysis_job,
+    finish_analysis_job,
+    get_active_analysis_job,
+    request_analysis_job_cancel,
+    requeue_stale_analysis_jobs,
+    touch_analysis_job,
+    update_analysis_job_payload,
+)
+from database.models import AnalysisJob
+from services.active_analysis import ActiveAnalysis, register_active, unregister_active
+
+# Worker heartbeat / cancel polling period
+HEARTBEAT_INTERVAL_SECONDS = 5
+# A running job without heartbeat for this long is considered lost (worker killed)
+STALE_AFTER_SECONDS = 120
+MAX_JOB_ATTEMPTS = 3
+
+
+def queue_enabled() -> bool:
+    """Analyses go through the DB queue instead of in-process tasks."""
+    # Module snapshot (re-read on SIGHUP), not a fresh Config() per message
+    return bool(config.config.ANALYSIS_QUEUE_ENABLED)
+
+
+async def enqueue_analysis(
+    *,
+    user_id: int,
+    chat_id: int,
+    kind: str,
+    url: str,
+    payload: Optional[Dict[str, Any]] = None,
+) -> int:
+    return await enqueue_analysis_job(
+        user_id=user_id,
+        chat_id=chat_id,
+        kind=kind,
+        url=url,
+        payload=payload,
+    )
+
+
+async def has_active_job(user_id: int) -> bool:
+    return await get_active_analysis_job(user_id) is not None
+
+
+async def cancel_user_job(user_id: int) -> Optional[AnalysisJob]:
+    """Cancellation goes through the queue: the owning worker stops the run."""
+    return await request_analysis_job_cancel(user_id)
+
+
+async def record_job_progress(runtime: Optional[ActiveAnalysis], **progress: Any) -> None:
+    """Persist pipeline progress on the queue job, so a retry after a worker
+    crash knows what the lost attempt already did. No-op outside the queue."""
+    if runtime is None or runtime.job_id is None:
+        return
+    try:
+        await update_analysis_job_payload(runtime.job_id, **progress)
+    except Exception as e:
+        print(f"⚠️ Job #{runtime.job_id} holatini saqlashda xato: {e}")
+
+
+async def _prepare_retry(job: AnalysisJob) -> bool:
+    """Undo what a lost attempt left behind. False when the job needs no rerun."""
+    payload = job.payload or {}
+    if payload.get("charged"):
+        # Charging is the pipeline's last step: the report was already delivered
+        await finish_analysis_job(job.id, "done")
+        return False
+    video_id = payload.get("video_id")
+    if video_id:
+        # The rerun creates its own Video/Comment/AIResponse rows; advanced
+        # checkpoints are keyed by the YouTube video and survive this
+        await delete_video_by_id(int(video_id))
+        await update_analysis_job_payload(job.id, video_id=None)
+    return True
+
+
+async def _start_pipeline(bot: Bot, job: AnalysisJob, runtime: ActiveAnalysis) -> asyncio.Task:
+    # Imported lazily: handlers import this module
+    from handlers.analysis import run_analysis_task
+    from handlers.shorts_handler import _run_shorts_analysis_task
+    from keyboards.client import get_stop_analysis_keyboard
+    from services.youtube_service import extract_video_id
+
+    payload = job.payload or {}
+
+    if job.kind == "shorts":
+        # Bound Message: .answer/.edit_text/.delete work as in the handler
+        progress_msg = await bot.send_message(
+            job.chat_id,
+            "⏳ Запускаем анализ Shorts...",
+            reply_markup=get_stop_analysis_keyboard(),
+        )
+        return asyncio.create_task(
+            _run_shorts_analysis_task(
+                user_id=job.user_id,
+                message=progress_msg,
+                url=job.url,
+                runtime=runtime,
+                progress_msg=progress_msg,
+                level_mode=payload.get("level_mode", "auto"),
+                manual_level=payload.get("manual_level"),
+                is_admin=bool(payload.get("is_admin")),
+            )
+        )
+
+    runtime.youtube_video_id = extract_video_id(job.url)
+    message = await bot.send_message(job.chat_id, "🚀 Анализ взят в работу...")
+    return asyncio.create_task(
+        run_analysis_task(
+            job.user_id,
+            message,
+            job.url,
+            payload.get("category"),
+            payload.get("analysis_type"),
+            runtime,
+        )
+    )
+
+
+async def _run_job(bot: Bot, job: AnalysisJob) -> None:
+    if int(job.attempts or 0) > 1:
+        try:
+            if not await _prepare_retry(job):
+                return
+        except Exception as e:
+            print(f"⚠️ Job #{job.id} oldingi urinishini tozalashda xato: {e}")
+
+    runtime = ActiveAnalysis(
+        user_id=job.user_id,
+        chat_id=job.chat_id,
+        kind=job.kind,
+        url=job.url,
+        job_id=job.id,
+    )
+
+    try:
+        task = await _start_pipeline(bot, job, runtime)
+    except Exception as e:
+        print(f"❌ Job #{job.id} ishga tushmadi: {e}")
+        await finish_analysis_job(job.id, "failed", error=str(e))
+        return
+
+    runtime.task = task
+    register_active(runtime)
+
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=HEARTBEAT_INTERVAL_SECONDS)
+            if task.done():
+                break
+            try:
+                cancel_requested = await touch_analysis_job(job.id)
+            except Exception as e:
+                print(f"⚠️ Job #{job.id} heartbeat xatosi: {e}")
+                continue
+            if cancel_requested and not runtime.cancel_event.is_set():
+                runtime.cancel_event.set()
+                task.cancel()
+
+        # Pipeline handles its own errors/cancellation and reports to the user;
+        # a handled failure is left on runtime.error
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            await finish_analysis_job(job.id, "failed", error=str(e))
+            return
+
+        if runtime.cancel_event.is_set():
+            await finish_analysis_job(job.id, "cancelled")
+        elif runtime.error:
+            await finish_analysis_job(job.id, "failed", error=runtime.error)
+        else:
+            await finish_analysis_job(job.id, "done")
+    finally:
+        unregister_active(job.user_id)
+
+
+async def run_analysis_worker(
+    bot: Bot,
+    *,
+    worker_id: Optional[str] = None,
+    concurrency: int = 1,
+    poll_interval: float = 2.0,
+):
+    """Claim and run queued analyses forever.
+
+    Several workers (processes/hosts) can run side by side: claiming uses
+    SKIP LOCKED, so each job is picked up exactly once.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    slots = asyncio.Semaphore(max(1, int(concurrency)))
+    running: set[asyncio.Task] = set()
+    loop = asyncio.get_running_loop()
+    last_requeue = 0.0
+
+    while True:
+        if loop.time() - last_requeue > STALE_AFTER_SECONDS / 2:
+            last_requeue = loop.time()
+            try:
+                requeued = await requeue_stale_analysis_jobs(STALE_AFTER_SECONDS, max_attempts=MAX_JOB_ATTEMPTS)
+                if requeued:
+                    print(f"♻️ {requeued} ta job qayta navbatga qo'yildi")
+            except Exception as e:
+                print(f"⚠️ Stale job tekshiruvida xato: {e}")
+
+        await slots.acquire()
+        try:
+            job = await claim_next_analysis_job(worker_id, max_attempts=MAX_JOB_ATTEMPTS)
+        except Exception as e:
+            print(f"⚠️ Job olishda xato: {e}")
+            job = None
+
+        if not job:
+            slots.release()
+            await asyncio.sleep(poll_interval)
+            continue
+
+        t = asyncio.create_task(_run_job(bot, job))
+        running.add(t)
+
+        def _done(_t: asyncio.Task):
+            running.discard(_t)
+            slots.release()
+
+        t.add_done_callback(_done)
@@ -0,0 +1,456 @@
+"""Content-addressed storage for report artefacts.
+
+Artefacts (report PDF/TXT, machine JSON, evolution reports) are stored once per
+content hash under `<kind>/<sha[:2]>/<sha><ext>` in a pluggable backend and
+referred to by handles:
+
+    artifact://report_txt/<sha256>/<file name>
+
+Text kinds are compressed (zstd when `zstandard` is installed, gzip
+otherwise); PDFs are stored as is. Every put adds a reference object next
+to the blob (`<sha>.refs/<token>`) and `delete` drops one, removing the blob
+with the last reference, so equal content written by several owners is safe
+to delete from any of them. Consumers that need a real file (Telegram
+upload, legacy readers) call `materialize`. Retention is per kind and also
+covers the legacy per-file directories (ai_logs, results, cache/comments,
+validation_logs), see `apply_retention`.
+
+DB columns written before the store existed hold plain paths; every reader
+goes through `read_text`/`materialize`/`delete`, which accept both.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from config import Config
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+HANDLE_PREFIX = "artifact://"
+
+# Kinds whose blobs are compressed (PDF is already compressed)
+TEXT_KINDS = {"report_txt", "machine_json", "evolution_txt", "comments"}
+
+# Legacy directories (one plain file per artefact) swept by retention: dir -> kind
+LEGACY_DIRS = {
+    "ai_logs": "ai_log",
+    "results": "comments",
+    "cache/comments": "comments_cache",
+    "validation_logs": "validation_log",
+    "exports": "report_export",
+}
+
+_RAW_EXT = ""
+_REFS_SUFFIX = ".refs"
+_ZSTD_EXT = ".zst"
+_GZIP_EXT = ".gz"
+_EXTENSIONS = (_ZSTD_EXT, _GZIP_EXT, _RAW_EXT)
+
+
+def is_handle(value: Optional[str]) -> bool:
+    return bool(value) and str(value).startswith(HANDLE_PREFIX)
+
+
+def parse_handle(handle: str) -> Tuple[str, str, str]:
+    """artifact://kind/sha/name -> (kind, sha, name)"""
+    kind, sha, name = handle[len(HANDLE_PREFIX):].split("/", 2)
+    return kind, sha, name
+
+
+def _blob_ext(key: str) -> str:
+    for ext in (_ZSTD_EXT, _GZIP_EXT):
+        if key.endswith(ext):
+            return ext
+    return _RAW_EXT
+
+
+def _compress(data: bytes) -> Tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), _ZSTD_EXT
+    return gzip.compress(data, compresslevel=6), _GZIP_EXT
+
+
+def _decompress(data: bytes, ext: str) -> bytes:
+    if ext == _ZSTD_EXT:
+        if zstandard is None:
+            raise RuntimeError("zstd artefakt o'qish uchun 'zstandard' paketi kerak")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if ext == _GZIP_EXT:
+        return gzip.decompress(data)
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BlobInfo:
+    key: str
+    size: int
+    modified: float  # unix time of the last put/touch
+
+
+class StorageBackend(ABC):
+    """Flat key -> bytes store. Keys use '/' separators."""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """Raise KeyError when missing."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def touch(self, key: str) -> None:
+        """Refresh the modification time (dedup hit keeps a blob alive)."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        ...
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Real file behind a key, if the backend has one."""
+        return None
+
+
+class LocalFSBackend(StorageBackend):
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def touch(self, key: str) -> None:
+        os.utime(self._path(key))
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        base = self._path(prefix) if prefix else self.root
+        if not base.exists():
+            return
+        for path in base.rglob("*"):
+            if not path.is_file() or path.name.endswith(".tmp"):
+                continue
+            st = path.stat()
+            yield BlobInfo(path.relative_to(self.root).as_posix(), st.st_size, st.st_mtime)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+
+class MemoryBackend(StorageBackend):
+    """S3-like in-memory stand-in (flat keys, no real files) for tests and local runs."""
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, float]] = {}
+
+    def put(self, key: str, data: bytes) -> None:
+        self._objects[key] = (bytes(data), time.time())
+
+    def get(self, key: str) -> bytes:
+        return self._objects[key][0]
+
+    def exists(self, key: str) -> bool:
+        return key in self._objects
+
+    def touch(self, key: str) -> None:
+        data, _ = self._objects[key]
+        self._objects[key] = (data, time.time())
+
+    def delete(self, key: str) -> None:
+        self._objects.pop(key, None)
+
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        for key, (data, modified) in list(self._objects.items()):
+            if key.startswith(prefix):
+                yield BlobInfo(key, len(data), modified)
+
+
+class S3Backend(StorageBackend):
+    """S3-compatible object storage (AWS, MinIO, ...); needs `boto3`."""
+
+    def __init__(self, bucket: str, endpoint_url: str = "", prefix: str = ""):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("ARTIFACT_BACKEND=s3 uchun 'boto3' paketi o'rnatilmagan")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            raise KeyError(key)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception:
+            return False
+
+    def touch(self, key: str) -> None:
+        # S3 has no utime: copying the object onto itself refreshes LastModified
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._key(key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+            MetadataDirective="REPLACE",
+        )
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix: str = "") -> Iterator[BlobInfo]:
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield BlobInfo(obj["Key"][strip:], obj["Size"], obj["LastModified"].timestamp())
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+class ArtifactStorage:
+    def __init__(self, backend: StorageBackend, materialize_dir: str):
+        self.backend = backend
+        self.materialize_dir = Path(materialize_dir)
+
+    @staticmethod
+    def _blob_prefix(kind: str, sha: str) -> str:
+        return f"{kind}/{sha[:2]}/{sha}"
+
+    def _refs_prefix(self, kind: str, sha: str) -> str:
+        return f"{self._blob_prefix(kind, sha)}{_REFS_SUFFIX}/"
+
+    def _find_blob(self, kind: str, sha: str) -> Optional[str]:
+        prefix = self._blob_prefix(kind, sha)
+        for ext in _EXTENSIONS:
+            if self.backend.exists(prefix + ext):
+                return prefix + ext
+        return None
+
+    def put_bytes(self, kind: str, data: bytes, filename: str) -> str:
+        """Store `data` (deduplicated by sha256) and return its handle.
+
+        Each call adds one reference to the blob; release it with `delete`.
+        """
+        sha = hashlib.sha256(data).hexdigest()
+        # Reference first: a concurrent delete() of the last other owner then keeps the blob
+        self.backend.put(self._refs_prefix(kind, sha) + uuid.uuid4().hex, b"")
+        key = self._find_blob(kind, sha)
+        if key:
+            self.backend.touch(key)
+        else:
+            payload, ext = _compress(data) if kind in TEXT_KINDS else (data, _RAW_EXT)
+            self.backend.put(self._blob_prefix(kind, sha) + ext, payload)
+        return f"{HANDLE_PREFIX}{kind}/{sha}/{Path(filename).name}"
+
+    def put_text(self, kind: str, text: str, filename: str) -> str:
+        return self.put_bytes(kind, text.encode("utf-8"), filename)
+
+    def put_file(self, kind: str, path: str | Path, *, filename: Optional[str] = None, remove: bool = False) -> str:
+        path = Path(path)
+        handle = self.put_bytes(kind, path.read_bytes(), filename or path.name)
+        if remove:
+            path.unlink(missing_ok=True)
+        return handle
+
+    def read_bytes(self, handle_or_path: str) -> bytes:
+        if not is_handle(handle_or_path):
+            return Path(handle_or_path).read_bytes()
+        kind, sha, _ = parse_handle(handle_or_path)
+        key = self._find_blob(kind, sha)
+        if key is None:
+            raise FileNotFoundError(handle_or_path)
+        return _decompress(self.backend.get(key), _blob_ext(key))
+
+    def read_text(self, handle_or_path: str) -> str:
+        return self.read_bytes(handle_or_path).decode("utf-8")
+
+    def exists(self, handle_or_path: Optional[str]) -> bool:
+        if not handle_or_path:
+            return False
+        if not is_handle(handle_or_path):
+            return Path(handle_or_path).exists()
+        kind, sha, _ = parse_handle(handle_or_path)
+        return self._find_blob(kind, sha) is not None
+
+    def materialize(self, handle_or_path: str) -> Path:
+        """Real file with the artefact's original name (plain paths are returned as is).
+
+        Raw local blobs are hard-linked; everything else is decoded once into
+        `materialize_dir`, which retention sweeps like any other cache.
+        """
+        if not is_handle(handle_or_path):
+            return Path(handle_or_path)
+        kind, sha, name = parse_handle(handle_or_path)
+        target = self.materialize_dir / sha[:16] / name
+        if target.exists():
+            os.utime(target)
+            return target
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        key = self._find_blob(kind, sha)
+        if key is None:
+            raise FileNotFoundError(handle_or_path)
+        local = self.backend.local_path(key)
+        if local is not None and _blob_ext(key) == _RAW_EXT:
+            try:
+                os.link(local, target)
+                return target
+            except OSError:
+                pass  # other filesystem: fall back to a copy
+        tmp = target.with_name(f"{name}.{os.getpid()}.tmp")
+        tmp.write_bytes(self.read_bytes(handle_or_path))
+        os.replace(tmp, target)
+        return target
+
+    def delete(self, handle_or_path: Optional[str]) -> bool:
+        """Release an artefact: one reference of its blob (call once per put).
+
+        The blob itself is removed with its last reference. Blobs written
+        before reference counting have no references and may be shared, so
+        they are left to retention (returns False).
+        """
+        if not handle_or_path:
+            return False
+        if not is_handle(handle_or_path):
+            path = Path(handle_or_path)
+            if path.is_file():
+                path.unlink()
+                return True
+            return False
+        kind, sha, _ = parse_handle(handle_or_path)
+        refs_prefix = self._refs_prefix(kind, sha)
+        ref = next(iter(self.backend.list(refs_prefix)), None)
+        if ref is None:
+            return False
+        self.backend.delete(ref.key)
+        if next(iter(self.backend.list(refs_prefix)), None) is None:
+            key = self._find_blob(kind, sha)
+            if key is not None:
+                self.backend.delete(key)
+        return True
+
+    def apply_retention(self, retention_days: Dict[str, int], now: Optional[float] = None) -> Dict[str, int]:
+        """Delete blobs/legacy files older than their kind's retention (0 = keep forever).
+
+        Returns the number of removed entries per kind.
+        """
+        now = now or time.time()
+        removed: Dict[str, int] = {}
+
+        def expired(kind: str, modified: float) -> bool:
+            days = retention_days.get(kind, 0)
+            return days > 0 and now - modified > days * 86400
+
+        for kind in retention_days:
+            for blob in list(self.backend.list(f"{kind}/")):
+                if not expired(kind, blob.modified):
+                    continue
+                self.backend.delete(blob.key)
+                if f"{_REFS_SUFFIX}/" in blob.key:
+                    continue  # stale reference (its blob is older still, or gone)
+                removed[kind] = removed.get(kind, 0) + 1
+                blob_prefix = blob.key[:len(blob.key) - len(_blob_ext(blob.key))]
+                for ref in list(self.backend.list(blob_prefix + _REFS_SUFFIX + "/")):
+                    self.backend.delete(ref.key)
+
+        sweeps = dict(LEGACY_DIRS)
+        sweeps[str(self.materialize_dir)] = "materialized"
+        for directory, kind in sweeps.items():
+            base = Path(directory)
+            if not base.exists():
+                continue
+            for path in base.rglob("*"):
+                try:
+                    if path.is_file() and expired(kind, path.stat().st_mtime):
+                        path.unlink()
+                        removed[kind] = removed.get(kind, 0) + 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+
+_storage: Optional[ArtifactStorage] = None
+
+
+def get_artifact_storage() -> ArtifactStorage:
+    global _storage
+    if _storage is None:
+        config = Config()
+        if config.ARTIFACT_BACKEND == "s3":
+            backend: StorageBackend = S3Backend(
+                config.ARTIFACT_S3_BUCKET, config.ARTIFACT_S3_ENDPOINT, config.ARTIFACT_S3_PREFIX
+            )
+        elif config.ARTIFACT_BACKEND == "memory":
+            backend = MemoryBackend()
+        else:
+            backend = LocalFSBackend(config.ARTIFACT_ROOT)
+        _storage = ArtifactStorage(backend, os.path.join(config.ARTIFACT_ROOT, ".materialized"))
+    return _storage
+
+
+async def run_artifact_retention_scheduler(interval_seconds: int = 6 * 3600):
+    """Background task: apply ARTIFACT_RETENTION_DAYS periodically."""
+    retention_days = Config().ARTIFACT_RETENTION_DAYS
+    while True:
+        try:
+            removed = await asyncio.to_thread(get_artifact_storage().apply_retention, retention_days)
+            if removed:
+                print(f"🧹 Artefakt retention: {removed}")
+        except Exception as e:
+            print(f"⚠️ Artefakt retention xatosi: {e}")
+        await asyncio.sleep(interval_seconds)
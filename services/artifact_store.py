@@ -0,0 +1,64 @@
+"""Async writes of per-analysis artefacts (comments context, TXT/JSON reports, PDFs).
+
+The pipeline keeps artefact contents in memory and hands them to an
+`ArtifactStore`, which writes through aiofiles or puts them into the
+content-addressed `services.artifact_storage` (file operations run in a
+thread, never on the event loop). Every write is a `artifact.<kind>` span, so
+stage timings show up in /admin/stats/latency next to the other stages, and
+`timings` holds this run's numbers for the log line.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, TypeVar
+
+import aiofiles
+
+from services.artifact_storage import get_artifact_storage
+from services.tracing import trace_span
+
+T = TypeVar("T")
+
+
+class ArtifactStore:
+    def __init__(self):
+        # kind -> total milliseconds spent writing artefacts of that kind
+        self.timings: Dict[str, float] = {}
+
+    def _record(self, kind: str, started: float) -> None:
+        self.timings[kind] = self.timings.get(kind, 0.0) + (time.perf_counter() - started) * 1000
+
+    async def write_text(self, path: str | Path, text: str, *, kind: str) -> Path:
+        path = Path(path)
+        started = time.perf_counter()
+        async with trace_span(f"artifact.{kind}", bytes=len(text)):
+            await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+            async with aiofiles.open(path, "w", encoding="utf-8") as f:
+                await f.write(text)
+        self._record(kind, started)
+        return path
+
+    async def run(self, kind: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run an existing blocking writer (e.g. save_ai_interaction) in a thread."""
+        started = time.perf_counter()
+        async with trace_span(f"artifact.{kind}"):
+            result = await asyncio.to_thread(fn, *args, **kwargs)
+        self._record(kind, started)
+        return result
+
+    async def store_text(self, kind: str, text: str, filename: str) -> str:
+        """Put text into artefact storage (deduplicated, compressed); returns the handle."""
+        return await self.run(kind, get_artifact_storage().put_text, kind, text, filename)
+
+    async def store_file(self, kind: str, path: str | Path, *, filename: str | None = None, remove: bool = False) -> str:
+        return await self.run(kind, get_artifact_storage().put_file, kind, path, filename=filename, remove=remove)
+
+    async def materialize(self, handle: str) -> Path:
+        """Local file for a handle (Telegram upload etc.)."""
+        return await self.run("materialize", get_artifact_storage().materialize, handle)
+
+    def summary(self) -> str:
+        return ", ".join(f"{kind}={ms:.1f}ms" for kind, ms in self.timings.items())
@@ -0,0 +1,125 @@
+"""Channel titles/statistics with a persistent cache (channel_metadata table).
+
+Missing or stale channels are fetched with batched `channels.list` calls (up
+to 50 ids per request) in a worker thread, with one API client per batch run
+and no DB session held while waiting for YouTube.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from googleapiclient.discovery import build
+
+from config import Config
+from database.crud import get_channel_metadata, save_channel_metadata
+from services.tracing import trace_span
+from services.youtube_service import get_channel_id_by_handle
+
+CHANNEL_METADATA_TTL = timedelta(hours=24)
+# channels.list accepts at most 50 ids per request
+CHANNELS_LIST_BATCH = 50
+
+config = Config()
+
+
+def is_fresh(fetched_at: Optional[datetime]) -> bool:
+    if fetched_at is None:
+        return False
+    if fetched_at.tzinfo is None:
+        fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+    return datetime.now(tz=timezone.utc) - fetched_at < CHANNEL_METADATA_TTL
+
+
+def _info(channel_id: str, title: Optional[str], description: Optional[str],
+          subscriber_count: Optional[int], video_count: Optional[int]) -> dict:
+    # Same shape as youtube_service.get_channel_info_by_id
+    return {
+        'id': channel_id,
+        'title': title or channel_id[:30],
+        'description': description or '',
+        'subscriber_count': int(subscriber_count or 0),
+        'video_count': int(video_count or 0),
+    }
+
+
+def _fetch_batches(youtube_ids: List[str]) -> Dict[str, dict]:
+    """Blocking: youtube id -> channel_metadata columns."""
+    client = build('youtube', 'v3', developerKey=config.YOUTUBE_API_KEY, cache_discovery=False)
+    fetched: Dict[str, dict] = {}
+    for start in range(0, len(youtube_ids), CHANNELS_LIST_BATCH):
+        batch = youtube_ids[start:start + CHANNELS_LIST_BATCH]
+        response = client.channels().list(
+            part='snippet,statistics',
+            id=','.join(batch),
+            maxResults=CHANNELS_LIST_BATCH,
+        ).execute()
+        for item in response.get('items', []):
+            snippet = item.get('snippet', {})
+            statistics = item.get('statistics', {})
+            fetched[item['id']] = {
+                'title': snippet.get('title'),
+                'description': snippet.get('description', ''),
+                'subscriber_count': int(statistics.get('subscriberCount', 0)),
+                'video_count': int(statistics.get('videoCount', 0)),
+            }
+    return fetched
+
+
+async def get_channels_metadata(channel_ids: Iterable[str], *, refresh: bool = False) -> Dict[str, dict]:
+    """channel_id -> info dict for every channel we know something about.
+
+    Fresh rows come from the table; the rest is fetched from YouTube in
+    batches and stored. If YouTube fails, stale rows are still returned.
+    """
+    ids = list(dict.fromkeys(c for c in channel_ids if c))
+    if not ids:
+        return {}
+
+    rows = await get_channel_metadata(ids)
+    result = {
+        cid: _info(cid, row.title, row.description, row.subscriber_count, row.video_count)
+        for cid, row in rows.items()
+    }
+    todo = [cid for cid in ids if refresh or cid not in rows or not is_fresh(rows[cid].fetched_at)]
+    if not todo:
+        return result
+
+    async with trace_span("youtube.channels_list", channels=len(todo)):
+        # @handles need their UC... id first; the row remembers it
+        youtube_ids: Dict[str, str] = {}
+        for cid in todo:
+            if not cid.startswith('@'):
+                youtube_ids[cid] = cid
+                continue
+            known = rows.get(cid)
+            resolved = known.youtube_channel_id if known and known.youtube_channel_id else await get_channel_id_by_handle(cid)
+            if resolved:
+                youtube_ids[cid] = resolved
+
+        try:
+            fetched = await asyncio.to_thread(_fetch_batches, sorted(set(youtube_ids.values())))
+        except Exception as e:
+            print(f"⚠️ Kanal ma'lumotlarini olishda xatolik: {e}")
+            return result
+
+    items = []
+    for cid, youtube_id in youtube_ids.items():
+        data = fetched.get(youtube_id)
+        if not data:
+            continue
+        items.append({'channel_id': cid, 'youtube_channel_id': youtube_id, **data})
+        result[cid] = _info(youtube_id, **data)
+    try:
+        await save_channel_metadata(items)
+    except Exception as e:
+        print(f"⚠️ channel_metadata saqlashda xato: {e}")
+    return result
+
+
+async def get_channel_info(channel_id: str) -> dict:
+    """Cached drop-in for youtube_service.get_channel_info_by_id."""
+    info = (await get_channels_metadata([channel_id])).get(channel_id)
+    return info or _info(channel_id, None, None, 0, 0)
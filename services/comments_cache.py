@@ -10,6 +10,7 @@ from sqlalchemy import select
 
 from database.engine import async_session
 from database.models import VideoCommentsCache
+from services.tracing import trace_span
 
 # Where cached payloads are stored (persistent)
 CACHE_DIR = Path("cache") / "comments"
@@ -92,27 +93,33 @@ async def get_video_comments_with_metrics_cached(
     now = datetime.now(tz=timezone.utc)
 
     # 1) Try cache
-    row = await _get_cache_row(video_id)
-    if row and row.fetched_at:
-        age = now - row.fetched_at
-        if age <= timedelta(hours=ttl_hours):
-            payload = _safe_read_json(row.file_path)
-            if payload:
-                payload.setdefault("_cache", {})
-                payload["_cache"].update(
-                    {
-                        "hit": True,
-                        "fetched_at": row.fetched_at.isoformat(),
-                        "age_hours": round(age.total_seconds() / 3600, 2),
-                    }
-                )
-                return payload
+    async with trace_span("comments.cache_lookup") as span:
+        row = await _get_cache_row(video_id)
+        payload = None
+        if row and row.fetched_at:
+            age = now - row.fetched_at
+            if age <= timedelta(hours=ttl_hours):
+                payload = _safe_read_json(row.file_path)
+        if span:
+            span.set_attribute("hit", bool(payload))
+
+    if payload:
+        payload.setdefault("_cache", {})
+        payload["_cache"].update(
+            {
+                "hit": True,
+                "fetched_at": row.fetched_at.isoformat(),
+                "age_hours": round(age.total_seconds() / 3600, 2),
+            }
+        )
+        return payload
 
     # 2) Cache miss / stale -> fetch
     from services.youtube_service import get_video_comments_with_metrics
 
     # googleapiclient is sync; run it in a thread so we don't block the event loop
-    payload = await asyncio.to_thread(get_video_comments_with_metrics, video_id)
+    async with trace_span("youtube.fetch_comments"):
+        payload = await asyncio.to_thread(get_video_comments_with_metrics, video_id)
 
     # Persist
     file_path = _cache_file_path(video_id)
@@ -0,0 +1,107 @@
+"""Document delivery with Telegram file_id reuse.
+
+Every upload returns a `file_id` that this bot can send to any chat again
+without transferring the bytes. `send_document` hashes the file, and when the
+same content was delivered before it sends the stored file_id; only unknown
+content (or a file_id Telegram rejects) is uploaded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from database.crud import delete_telegram_file_id, get_telegram_file_id, save_telegram_file_id
+from services.tracing import trace_span
+
+# Recent content hashes -> file_id, in front of the telegram_files table
+MEMORY_CACHE_SIZE = 2048
+_HASH_CHUNK = 1024 * 1024
+
+_memory: "OrderedDict[str, str]" = OrderedDict()
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _remember(content_hash: str, file_id: str) -> None:
+    _memory[content_hash] = file_id
+    _memory.move_to_end(content_hash)
+    while len(_memory) > MEMORY_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+async def _lookup(content_hash: str) -> Optional[str]:
+    file_id = _memory.get(content_hash)
+    if file_id:
+        _memory.move_to_end(content_hash)
+        return file_id
+    try:
+        file_id = await get_telegram_file_id(content_hash)
+    except Exception as e:
+        print(f"⚠️ file_id cache o'qishda xato: {e}")
+        return None
+    if file_id:
+        _remember(content_hash, file_id)
+    return file_id
+
+
+async def _forget(content_hash: str) -> None:
+    _memory.pop(content_hash, None)
+    try:
+        await delete_telegram_file_id(content_hash)
+    except Exception as e:
+        print(f"⚠️ file_id cache o'chirishda xato: {e}")
+
+
+async def send_document(message: Message, path: str | Path, **kwargs: Any) -> Message:
+    """Drop-in for `message.answer_document(FSInputFile(path), **kwargs)`.
+
+    Identical content is sent by cached file_id (the file name shown is the one
+    of the first upload); otherwise the file is uploaded and its file_id stored.
+    """
+    path = Path(path)
+    async with trace_span("telegram.send_document") as span:
+        content_hash = await asyncio.to_thread(file_sha256, path)
+
+        file_id = await _lookup(content_hash)
+        if file_id:
+            try:
+                sent = await message.answer_document(file_id, **kwargs)
+                if span:
+                    span.set_attribute("reused", True)
+                return sent
+            except TelegramBadRequest as e:
+                # Unknown/expired file_id (e.g. another bot token): upload again
+                print(f"⚠️ Saqlangan file_id ishlamadi, qayta yuklanadi: {e}")
+                await _forget(content_hash)
+
+        sent = await message.answer_document(FSInputFile(path), **kwargs)
+        if span:
+            span.set_attribute("reused", False)
+            span.set_attribute("bytes", path.stat().st_size)
+
+        if sent.document:
+            _remember(content_hash, sent.document.file_id)
+            try:
+                await save_telegram_file_id(
+                    content_hash,
+                    sent.document.file_id,
+                    file_unique_id=sent.document.file_unique_id,
+                    file_name=path.name,
+                    file_size=sent.document.file_size,
+                )
+            except Exception as e:
+                print(f"⚠️ file_id cache yozishda xato: {e}")
+        return sent
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import asyncio
 from datetime import datetime, timezone
-from pathlib import Path
 from typing import Any, Dict, List
 
 from database.crud import (
@@ -13,6 +12,7 @@ from database.crud import (
     save_multi_analysis_evaluation,
 )
 from services.analysis_evaluator import evaluate_analyses_via_ai
+from services.artifact_storage import get_artifact_storage
 
 
 def _pick_best_analysis_id(evaluations: List[Dict[str, Any]]) -> int:
@@ -37,16 +37,13 @@ def _pick_best_analysis_id(evaluations: List[Dict[str, Any]]) -> int:
 
 
 async def _delete_pdf_best_effort(pdf_path: str | None) -> bool:
+    """Delete a non-best PDF: artefact handle or legacy plain path."""
     if not pdf_path:
         return False
     try:
-        p = Path(pdf_path)
-        if p.exists() and p.is_file():
-            p.unlink()
-            return True
+        return await asyncio.to_thread(get_artifact_storage().delete, pdf_path)
     except Exception:
         return False
-    return False
 
 
 async def run_multi_analysis_optimizer_once() -> int:
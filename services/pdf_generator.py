@@ -1,8 +1,14 @@
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+from abc import ABC, abstractmethod
 from datetime import datetime
 from pathlib import Path
+import importlib
 import re
 import json
+from typing import Any, Iterator, List, Tuple
+
+from services.tracing import current_span, trace_span, traced
 
 
 def format_evaluation_json_to_table(json_data: dict | str) -> str:
@@ -263,6 +269,23 @@ def format_machine_data_to_table(json_data: dict | str) -> str:
     return '\n'.join(html_parts)
 
 
+_HTML_TAG_PATTERNS = (
+    re.compile(r'</?strong>'),
+    re.compile(r'</?em>'),
+    re.compile(r'</?b>'),
+    re.compile(r'</?i>'),
+    re.compile(r'</?code>'),
+    re.compile(r'</?span[^>]*>'),
+)
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+_ITALIC_RE = re.compile(r'(?<!\*)\*([^*]+?)\*(?!\*)')
+_INLINE_CODE_RE = re.compile(r'`([^`]+?)`')
+_BULLET_RE = re.compile(r'^[-*]\s+')
+_NUMBERED_RE = re.compile(r'^\d+\.\s+')
+_HEADING_EMOJI_RE = re.compile(r'^([\U0001F300-\U0001F9FF\U00002600-\U000027BF\U0001F600-\U0001F64F\U0001FA00-\U0001FAFF]+)\s*(.+)?$')
+_TABLE_SEPARATOR_RE = re.compile(r'^[-:]+$')
+
+
 def clean_html_tags_in_text(text: str) -> str:
     """
     AI javobidagi HTML taglarni tozalash.
@@ -270,13 +293,11 @@ def clean_html_tags_in_text(text: str) -> str:
     """
     if not text:
         return ""
-    # HTML taglarni olib tashlash
-    text = re.sub(r'</?strong>', '', text)
-    text = re.sub(r'</?em>', '', text)
-    text = re.sub(r'</?b>', '', text)
-    text = re.sub(r'</?i>', '', text)
-    text = re.sub(r'</?code>', '', text)
-    text = re.sub(r'</?span[^>]*>', '', text)
+    if '<' not in text:
+        return text
+    # HTML taglarni olib tashlash (tartib muhim: har bir pattern ketma-ket)
+    for pattern in _HTML_TAG_PATTERNS:
+        text = pattern.sub('', text)
     return text
 
 
@@ -284,150 +305,162 @@ def process_inline_formatting(text: str) -> str:
     """Markdown inline formatlash -> HTML"""
     if not text:
         return ""
-    # **bold** -> <strong>
-    text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
-    # *italic* -> <em>
-    text = re.sub(r'(?<!\*)\*([^*]+?)\*(?!\*)', r'<em>\1</em>', text)
-    # `code` -> <code>
-    text = re.sub(r'`([^`]+?)`', r'<code>\1</code>', text)
+    if '*' in text:
+        # **bold** -> <strong>
+        text = _BOLD_RE.sub(r'<strong>\1</strong>', text)
+        # *italic* -> <em>
+        text = _ITALIC_RE.sub(r'<em>\1</em>', text)
+    if '`' in text:
+        # `code` -> <code>
+        text = _INLINE_CODE_RE.sub(r'<code>\1</code>', text)
     return text
 
 
-def clean_markdown(content: str) -> str:
-    """Markdown -> HTML konvertatsiya"""
-    
+def _is_list_item(stripped: str) -> bool:
+    return bool(_BULLET_RE.match(stripped) or _NUMBERED_RE.match(stripped))
+
+
+def iter_markdown_blocks(content: str) -> Iterator[Tuple[str, Any]]:
+    """Markdown -> bloklar oqimi (bitta o'tishda, generator).
+
+    Bloklar: ("heading", (level, text)), ("metrics_header", text),
+    ("metrics_footer", None), ("paragraph", text), ("list", items),
+    ("table", lines), ("code", (lines, lang)). Inline formatlash qo'llanmagan —
+    uni har bir backend (HTML / ReportLab) o'zi bajaradi.
+    """
     # AI javobidagi HTML taglarni tozalash
     content = clean_html_tags_in_text(content)
-    
-    lines = content.split('\n')
-    html_parts = []
-    in_table = False
-    table_lines = []
-    in_list = False
-    list_items = []
-    in_code_block = False
-    code_block_lines = []
+
+    table_lines: List[str] = []
+    list_items: List[str] = []
+    code_block_lines: List[str] = []
     code_block_lang = ""
-    
-    for line in lines:
+    in_table = in_list = in_code_block = False
+
+    for line in content.split('\n'):
         stripped = line.strip()
-        
+
         # Code block (```json, ```python, etc.)
         if stripped.startswith('```'):
             if not in_code_block:
-                # Code block boshlanishi
                 in_code_block = True
                 code_block_lang = stripped[3:].strip().lower()
                 code_block_lines = []
                 # Oldingi list/table yopish
                 if in_list:
-                    html_parts.append(format_list(list_items))
+                    yield "list", list_items
                     list_items = []
                     in_list = False
                 if in_table:
-                    html_parts.append(format_table(table_lines))
+                    yield "table", table_lines
                     table_lines = []
                     in_table = False
             else:
-                # Code block tugashi
                 in_code_block = False
-                html_parts.append(format_code_block(code_block_lines, code_block_lang))
+                yield "code", (code_block_lines, code_block_lang)
                 code_block_lines = []
                 code_block_lang = ""
             continue
-        
-        # Code block ichida
+
+        # Code block ichida (original indentation saqlanadi)
         if in_code_block:
-            code_block_lines.append(line)  # Original indentation saqlanadi
+            code_block_lines.append(line)
             continue
-        
+
         # Jadval boshlanishi/davomi
-        if stripped.startswith('|') and stripped.endswith('|'):
-            if not in_table:
-                # Oldingi listni yopish
-                if in_list:
-                    html_parts.append(format_list(list_items))
-                    list_items = []
-                    in_list = False
-                in_table = True
-                table_lines = []
-            table_lines.append(stripped)
-            continue
-        
-        # Jadval tugadi
-        if in_table and not stripped.startswith('|'):
-            html_parts.append(format_table(table_lines))
+        if stripped.startswith('|'):
+            if stripped.endswith('|'):
+                if not in_table:
+                    if in_list:
+                        yield "list", list_items
+                        list_items = []
+                        in_list = False
+                    in_table = True
+                    table_lines = []
+                table_lines.append(stripped)
+                continue
+        elif in_table:
+            # Jadval tugadi
+            yield "table", table_lines
             table_lines = []
             in_table = False
-        
+
         # List elementi
-        if re.match(r'^[-*]\s+', stripped) or re.match(r'^\d+\.\s+', stripped):
-            if not in_list:
-                in_list = True
-                list_items = []
+        if _is_list_item(stripped):
+            in_list = True
             # List marker ni olib tashlash
-            item_text = re.sub(r'^[-*]\s+', '', stripped)
-            item_text = re.sub(r'^\d+\.\s+', '', item_text)
-            list_items.append(process_inline_formatting(item_text))
+            list_items.append(_NUMBERED_RE.sub('', _BULLET_RE.sub('', stripped, count=1), count=1))
             continue
-        
-        # List tugadi
-        if in_list and stripped and not re.match(r'^[-*]\s+', stripped) and not re.match(r'^\d+\.\s+', stripped):
-            html_parts.append(format_list(list_items))
+
+        # Bo'sh qator yoki boshqa blok — list tugadi
+        if in_list:
+            yield "list", list_items
             list_items = []
             in_list = False
-        
-        # Bo'sh qator
+
         if not stripped:
-            if in_list:
-                html_parts.append(format_list(list_items))
-                list_items = []
-                in_list = False
             continue
-        
+
         # Sarlavhalar
         if stripped.startswith('#'):
-            level = 0
-            for char in stripped:
-                if char == '#':
-                    level += 1
-                else:
-                    break
-            if level > 0 and level <= 6:
+            level = len(stripped) - len(stripped.lstrip('#'))
+            if level <= 6:
                 text = stripped[level:].strip()
-                
+
                 # Maxsus markerlar uchun stil
                 if 'ДАННЫЕ ДЛЯ АГРЕГАЦИИ' in text or 'METRICS' in text.upper():
-                    html_parts.append(f'<div class="metrics-header">{text}</div>')
-                    continue
-                
-                # Emoji ni ajratish
-                emoji_match = re.match(r'^([\U0001F300-\U0001F9FF\U00002600-\U000027BF\U0001F600-\U0001F64F\U0001FA00-\U0001FAFF]+)\s*(.+)?$', text)
-                if emoji_match:
-                    emoji = emoji_match.group(1)
-                    title = emoji_match.group(2) or ""
-                    html_parts.append(f'<h{level}><span class="emoji">{emoji}</span> {process_inline_formatting(title)}</h{level}>')
+                    yield "metrics_header", text
                 else:
-                    html_parts.append(f'<h{level}>{process_inline_formatting(text)}</h{level}>')
+                    yield "heading", (level, text)
                 continue
-        
+
         # Maxsus end marker
         if 'VIDEO_ANALYSIS_METRICS_END' in stripped:
-            html_parts.append('<div class="metrics-footer">— Конец машиночитаемых данных —</div>')
+            yield "metrics_footer", None
             continue
-        
+
         # Oddiy paragraf
-        html_parts.append(f'<p>{process_inline_formatting(stripped)}</p>')
-    
+        yield "paragraph", stripped
+
     # Qolgan jadval/list/code block
     if in_table:
-        html_parts.append(format_table(table_lines))
+        yield "table", table_lines
     if in_list:
-        html_parts.append(format_list(list_items))
+        yield "list", list_items
     if in_code_block:
-        html_parts.append(format_code_block(code_block_lines, code_block_lang))
-    
-    return '\n'.join(html_parts)
+        yield "code", (code_block_lines, code_block_lang)
+
+
+def iter_markdown_html(content: str) -> Iterator[str]:
+    """Markdown bloklarini HTML ga aylantirish (har bir blok alohida)."""
+    for kind, data in iter_markdown_blocks(content):
+        if kind == "paragraph":
+            yield f'<p>{process_inline_formatting(data)}</p>'
+        elif kind == "heading":
+            level, text = data
+            # Emoji ni ajratish
+            emoji_match = _HEADING_EMOJI_RE.match(text)
+            if emoji_match:
+                emoji = emoji_match.group(1)
+                title = emoji_match.group(2) or ""
+                yield f'<h{level}><span class="emoji">{emoji}</span> {process_inline_formatting(title)}</h{level}>'
+            else:
+                yield f'<h{level}>{process_inline_formatting(text)}</h{level}>'
+        elif kind == "table":
+            yield format_table(data)
+        elif kind == "list":
+            yield format_list([process_inline_formatting(item) for item in data])
+        elif kind == "code":
+            yield format_code_block(*data)
+        elif kind == "metrics_header":
+            yield f'<div class="metrics-header">{data}</div>'
+        elif kind == "metrics_footer":
+            yield '<div class="metrics-footer">— Конец машиночитаемых данных —</div>'
+
+
+def clean_markdown(content: str) -> str:
+    """Markdown -> HTML konvertatsiya"""
+    return '\n'.join(iter_markdown_html(content))
 
 
 def format_code_block(lines: list, lang: str = "") -> str:
@@ -601,46 +634,45 @@ def format_list(items: list) -> str:
     """List elementlarini HTML ga aylantirish"""
     if not items:
         return ""
-    
-    html = '<ul class="styled-list">\n'
-    for item in items:
-        html += f'  <li>{item}</li>\n'
-    html += '</ul>'
-    return html
+
+    parts = ['<ul class="styled-list">\n']
+    parts.extend(f'  <li>{item}</li>\n' for item in items)
+    parts.append('</ul>')
+    return ''.join(parts)
 
 
 def format_table(table_lines: list) -> str:
     """Jadval qatorlarini HTML ga aylantirish"""
     if len(table_lines) < 2:
         return ""
-    
+
     # Birinchi qator - sarlavhalar
     headers = [cell.strip() for cell in table_lines[0].strip('|').split('|')]
-    
+
     # Ikkinchi qator separator (---) bo'lishi mumkin
     rows = []
-    for i, line in enumerate(table_lines[1:]):
+    for line in table_lines[1:]:
         cells = [cell.strip() for cell in line.strip('|').split('|')]
         # Separator qatorni o'tkazish
-        if all(re.match(r'^[-:]+$', cell) for cell in cells):
+        if all(_TABLE_SEPARATOR_RE.match(cell) for cell in cells):
             continue
         rows.append(cells)
-    
+
     if not rows:
         return ""
-    
+
     col_count = len(headers)
-    
+
     # Ustun kengliklarini hisoblash
-    max_lens = [len(str(h)) for h in headers]
+    max_lens = [len(h) for h in headers]
     for row in rows:
-        for i, cell in enumerate(row):
-            if i < len(max_lens):
-                max_lens[i] = max(max_lens[i], len(str(cell)))
-    
+        for i, cell in enumerate(row[:col_count]):
+            if len(cell) > max_lens[i]:
+                max_lens[i] = len(cell)
+
     total = sum(max_lens) or 1
     widths = [f"{(l/total)*100:.1f}%" for l in max_lens]
-    
+
     # Jadval klassi
     if col_count >= 8:
         table_class = "table-tiny"
@@ -650,89 +682,43 @@ def format_table(table_lines: list) -> str:
         table_class = "table-medium"
     else:
         table_class = "table-large"
-    
-    html = f'<div class="table-container"><table class="{table_class}">\n'
-    
+
+    parts = [f'<div class="table-container"><table class="{table_class}">\n']
+    append = parts.append
+
     # Colgroup
-    html += '<colgroup>\n'
+    append('<colgroup>\n')
     for w in widths:
-        html += f'  <col style="width: {w};">\n'
-    html += '</colgroup>\n'
-    
+        append(f'  <col style="width: {w};">\n')
+    append('</colgroup>\n')
+
     # Header
-    html += '<thead><tr>\n'
+    append('<thead><tr>\n')
     for h in headers:
-        clean_header = clean_html_tags_in_text(h)
-        html += f'  <th>{process_inline_formatting(clean_header)}</th>\n'
-    html += '</tr></thead>\n'
-    
+        append(f'  <th>{process_inline_formatting(clean_html_tags_in_text(h))}</th>\n')
+    append('</tr></thead>\n')
+
     # Body
-    html += '<tbody>\n'
+    append('<tbody>\n')
     for row in rows:
-        html += '<tr>\n'
-        for i, cell in enumerate(row):
-            clean_cell = clean_html_tags_in_text(str(cell)) if cell else '—'
+        append('<tr>\n')
+        for cell in row:
+            clean_cell = clean_html_tags_in_text(cell) if cell else '—'
             formatted = process_inline_formatting(clean_cell)
             if not formatted.strip():
                 formatted = '—'
-            html += f'  <td>{formatted}</td>\n'
+            append(f'  <td>{formatted}</td>\n')
         # Kam ustunli qatorlarni to'ldirish
         for _ in range(col_count - len(row)):
-            html += '  <td>—</td>\n'
-        html += '</tr>\n'
-    html += '</tbody>\n'
-    
-    html += '</table></div>\n'
-    return html
+            append('  <td>—</td>\n')
+        append('</tr>\n')
+    append('</tbody>\n')
 
+    append('</table></div>\n')
+    return ''.join(parts)
 
-def generate_pdf(content: str, video_url: str, video_id: str) -> str:
-    """PDF hisobot yaratish"""
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_path = f"report_{video_id}_{timestamp}.pdf"
-    
-    html_content = clean_markdown(content)
-    
-    html_template = f"""<!DOCTYPE html>
-<html lang="ru">
-<head>
-    <meta charset="UTF-8">
-    <title>Анализ комментариев - {video_id}</title>
-</head>
-<body>
-    <header class="report-header">
-        <div class="logo">📊</div>
-        <h1 class="main-title">СТРАТЕГИЧЕСКИЙ АНАЛИЗ</h1>
-        <div class="subtitle">Аналитический отчет по комментариям</div>
-    </header>
-    
-    <div class="meta-box">
-        <div class="meta-row">
-            <span class="meta-label">🎬 Видео:</span>
-            <a href="{video_url}" class="meta-link">{video_url}</a>
-        </div>
-        <div class="meta-row">
-            <span class="meta-label">📅 Дата:</span>
-            <span>{datetime.now().strftime('%d.%m.%Y в %H:%M')}</span>
-        </div>
-        <div class="meta-row">
-            <span class="meta-label">🆔 ID:</span>
-            <span class="video-id">{video_id}</span>
-        </div>
-    </div>
-    
-    <main class="content">
-        {html_content}
-    </main>
-    
-    <footer class="report-footer">
-        <div class="footer-line"></div>
-        <p>Автоматически сгенерированный отчет • Video Analyzer Bot</p>
-    </footer>
-</body>
-</html>"""
-    
-    css_styles = """
+
+REPORT_CSS = """
 /* ═══════════════════════════════════════════════════════════════
    PROFESSIONAL PDF STYLES - Video Analyzer Report
    ═══════════════════════════════════════════════════════════════ */
@@ -1316,10 +1302,132 @@ td:first-child {
     }
 }
 """
-    
-    HTML(string=html_template).write_pdf(
-        output_path,
-        stylesheets=[CSS(string=css_styles)]
+
+# Shared by every render in this process: fonts are resolved once, and the
+# stylesheet is tokenised/parsed once instead of on every report.
+FONT_CONFIG = FontConfiguration()
+_REPORT_STYLESHEET = None
+
+
+def get_report_stylesheet() -> CSS:
+    global _REPORT_STYLESHEET
+    if _REPORT_STYLESHEET is None:
+        _REPORT_STYLESHEET = CSS(string=REPORT_CSS, font_config=FONT_CONFIG)
+    return _REPORT_STYLESHEET
+
+
+def warm_up() -> None:
+    """Parse the stylesheet and load fonts (used by PDF render workers)."""
+    HTML(string="<html><body><h1>warm-up</h1><p>warm-up</p></body></html>").write_pdf(
+        stylesheets=[get_report_stylesheet()],
+        font_config=FONT_CONFIG,
     )
+
+
+class PDFBackend(ABC):
+    """Renderer interface: Markdown report -> PDF file at `output_path`."""
+
+    name = "base"
+
+    @abstractmethod
+    def render(self, content: str, video_url: str, video_id: str, output_path: str) -> None:
+        ...
+
+
+class WeasyPrintBackend(PDFBackend):
+    """Full HTML/CSS layout (REPORT_CSS); used for advanced/evolution reports."""
+
+    name = "weasyprint"
+
+    def render(self, content: str, video_url: str, video_id: str, output_path: str) -> None:
+        with trace_span("pdf.markdown"):
+            html_content = clean_markdown(content)
+
+        html_template = f"""<!DOCTYPE html>
+<html lang="ru">
+<head>
+    <meta charset="UTF-8">
+    <title>Анализ комментариев - {video_id}</title>
+</head>
+<body>
+    <header class="report-header">
+        <div class="logo">📊</div>
+        <h1 class="main-title">СТРАТЕГИЧЕСКИЙ АНАЛИЗ</h1>
+        <div class="subtitle">Аналитический отчет по комментариям</div>
+    </header>
+    
+    <div class="meta-box">
+        <div class="meta-row">
+            <span class="meta-label">🎬 Видео:</span>
+            <a href="{video_url}" class="meta-link">{video_url}</a>
+        </div>
+        <div class="meta-row">
+            <span class="meta-label">📅 Дата:</span>
+            <span>{datetime.now().strftime('%d.%m.%Y в %H:%M')}</span>
+        </div>
+        <div class="meta-row">
+            <span class="meta-label">🆔 ID:</span>
+            <span class="video-id">{video_id}</span>
+        </div>
+    </div>
     
+    <main class="content">
+        {html_content}
+    </main>
+    
+    <footer class="report-footer">
+        <div class="footer-line"></div>
+        <p>Автоматически сгенерированный отчет • Video Analyzer Bot</p>
+    </footer>
+</body>
+</html>"""
+
+        with trace_span("pdf.render"):
+            HTML(string=html_template).write_pdf(
+                output_path,
+                stylesheets=[get_report_stylesheet()],
+                font_config=FONT_CONFIG,
+            )
+
+
+# name -> "module:Class"; imported lazily so a worker only loads the backends it uses
+PDF_BACKENDS = {
+    "weasyprint": "services.pdf_generator:WeasyPrintBackend",
+    "reportlab": "services.pdf_reportlab:ReportLabBackend",
+}
+DEFAULT_PDF_BACKEND = "weasyprint"
+_backend_instances = {}
+
+
+def get_pdf_backend(name: str = DEFAULT_PDF_BACKEND) -> PDFBackend:
+    backend = _backend_instances.get(name)
+    if backend is None:
+        if name not in PDF_BACKENDS:
+            raise ValueError(f"Noma'lum PDF backend: {name}")
+        module_name, class_name = PDF_BACKENDS[name].split(":")
+        backend = getattr(importlib.import_module(module_name), class_name)()
+        _backend_instances[name] = backend
+    return backend
+
+
+@traced("pdf.generate")
+def generate_pdf(content: str, video_url: str, video_id: str, backend: str = DEFAULT_PDF_BACKEND) -> str:
+    """PDF hisobot yaratish"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_path = f"report_{video_id}_{timestamp}.pdf"
+
+    span = current_span()
+    if span:
+        span.set_attribute("backend", backend)
+    try:
+        get_pdf_backend(backend).render(content, video_url, video_id, output_path)
+    except Exception as e:
+        if backend == DEFAULT_PDF_BACKEND:
+            raise
+        # A fast backend must never cost the user their report
+        print(f"⚠️ {backend} PDF xatosi, {DEFAULT_PDF_BACKEND} bilan qayta: {e}")
+        if span:
+            span.set_attribute("fallback", DEFAULT_PDF_BACKEND)
+        get_pdf_backend(DEFAULT_PDF_BACKEND).render(content, video_url, video_id, output_path)
+
     return output_path
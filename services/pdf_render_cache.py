@@ -0,0 +1,144 @@
+"""Content-addressed cache of rendered report PDFs.
+
+Key = sha256(report text, backend, template version, video id, video url). The
+template version is derived from the source of the renderer modules
+(services/pdf_generator.py, services/pdf_reportlab.py), so any change to the
+markup/CSS/layout invalidates old entries automatically. Entries are plain
+files; size is bounded with LRU eviction (mtime is refreshed on every hit).
+The directory is scanned only when the running size total goes over the budget
+(or the total is older than RESCAN_SECONDS), not on every put.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+import shutil
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from config import Config
+
+
+TEMPLATE_MODULES = ("services.pdf_generator", "services.pdf_reportlab")
+
+
+@lru_cache(maxsize=1)
+def template_version() -> str:
+    try:
+        h = hashlib.sha256()
+        for module in TEMPLATE_MODULES:
+            h.update(Path(importlib.util.find_spec(module).origin).read_bytes())
+        return h.hexdigest()[:16]
+    except Exception:
+        return "unknown"
+
+
+class PDFRenderCache:
+    # The bot and the queue worker share the directory, so the running total
+    # misses the other process's puts; re-measure it at least this often
+    RESCAN_SECONDS = 600
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Bytes on disk: last scan plus our puts since (None until the first scan)
+        self._total: Optional[int] = None
+        self._scanned_at = 0.0
+
+    @staticmethod
+    def make_key(content: str, video_url: str, video_id: str, backend: str = "weasyprint") -> str:
+        h = hashlib.sha256()
+        for part in (backend, template_version(), video_id or "", video_url or "", content or ""):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.pdf"
+
+    def get(self, key: str, dest: str) -> bool:
+        """Copy a cached PDF to `dest` (callers rename/move their output)."""
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, dest)
+            os.utime(path)  # LRU: mark as recently used
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ PDF cache o'qishda xato: {e}")
+            return False
+
+    def put(self, key: str, src: str) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            shutil.copyfile(src, tmp)
+            size = tmp.stat().st_size
+            os.replace(tmp, path)  # atomic for concurrent readers
+        except Exception as e:
+            print(f"⚠️ PDF cache yozishda xato: {e}")
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total += size - replaced
+            due = (
+                self._total is None
+                or self._total > self.max_bytes
+                or time.monotonic() - self._scanned_at > self.RESCAN_SECONDS
+            )
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits `max_bytes`."""
+        with self._lock:
+            entries = []
+            total = 0
+            for p in self.cache_dir.glob("*/*.pdf"):
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+
+            removed = 0
+            entries.sort()
+            for _, size, p in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    p.unlink()
+                    total -= size
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._total = total
+            self._scanned_at = time.monotonic()
+            return removed
+
+
+_cache: Optional[PDFRenderCache] = None
+
+
+def get_pdf_render_cache() -> Optional[PDFRenderCache]:
+    """Process-wide cache, or None when disabled (PDF_CACHE_MAX_MB=0)."""
+    global _cache
+    if _cache is None:
+        config = Config()
+        if config.PDF_CACHE_MAX_MB <= 0:
+            return None
+        _cache = PDFRenderCache(config.PDF_CACHE_DIR, config.PDF_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
@@ -0,0 +1,172 @@
+"""Off-loop PDF rendering.
+
+PDF layout is pure CPU (WeasyPrint takes seconds for long reports), so
+`generate_pdf` is executed in a pool of warm worker processes instead of the
+bot's event loop. Workers import WeasyPrint and the report stylesheet once
+(initializer) and render a tiny warm-up document to load fonts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Optional
+
+from config import Config
+from services.pdf_render_cache import get_pdf_render_cache
+from services.tracing import trace_span
+
+_config = Config()
+# Parallel renders (0 -> CPU count, capped)
+PDF_RENDER_WORKERS = _config.PDF_RENDER_WORKERS or min(4, os.cpu_count() or 1)
+# Renders waiting + running; further callers wait for a free slot
+PDF_RENDER_MAX_PENDING = _config.PDF_RENDER_MAX_PENDING
+# A render running longer than this is aborted and the pool is recycled
+PDF_RENDER_TIMEOUT_SECONDS = _config.PDF_RENDER_TIMEOUT_SECONDS
+
+
+class PDFRenderTimeout(RuntimeError):
+    pass
+
+
+def _warm_up_worker() -> None:
+    """Pool initializer: pay import/font-loading costs once per process."""
+    try:
+        from services import pdf_generator
+
+        pdf_generator.warm_up()
+    except Exception as e:
+        print(f"⚠️ PDF worker warm-up xatosi: {e}")
+
+
+def _render_in_worker(content: str, video_url: str, video_id: str, backend: str) -> str:
+    from services.pdf_generator import generate_pdf
+
+    return generate_pdf(content, video_url, video_id, backend=backend)
+
+
+def select_pdf_backend(analysis_type: Optional[str]) -> str:
+    """Backend name for an analysis type ("shorts_level_2" counts as "shorts")."""
+    if not analysis_type:
+        return "weasyprint"
+    kind = "shorts" if analysis_type.startswith("shorts") else analysis_type
+    if kind in _config.PDF_FAST_BACKEND_TYPES:
+        return _config.PDF_FAST_BACKEND
+    return "weasyprint"
+
+
+class PDFRenderService:
+    def __init__(
+        self,
+        workers: int = PDF_RENDER_WORKERS,
+        max_pending: int = PDF_RENDER_MAX_PENDING,
+        timeout: float = PDF_RENDER_TIMEOUT_SECONDS,
+    ):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max(1, max_pending))
+        # At most one job per worker is handed to the executor, so a submitted
+        # job starts right away and the timeout measures its render only
+        self._running = asyncio.Semaphore(self.workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork an event loop / DB connections into workers
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+            )
+        return self._pool
+
+    def _recycle_pool(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        # A stuck layout cannot be interrupted inside its process: terminate workers
+        for proc in list(getattr(pool, "_processes", {}).values()):
+            try:
+                proc.terminate()
+            except Exception:
+                pass
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> None:
+        """Spawn workers ahead of the first report (optional)."""
+        pool = self._get_pool()
+        for _ in range(self.workers):
+            pool.submit(os.getpid)
+
+    async def render_pdf(
+        self, content: str, video_url: str, video_id: str, analysis_type: Optional[str] = None
+    ) -> str:
+        """Async counterpart of `generate_pdf`: returns the path of the written PDF.
+
+        The backend is chosen from `analysis_type` (see `select_pdf_backend`).
+        Identical (text, backend, template, video) renders are served from the
+        content-hash cache; the caller always gets its own file and may rename/delete it.
+        """
+        backend = select_pdf_backend(analysis_type)
+        cache = get_pdf_render_cache()
+        if cache is None:
+            return await self._render(content, video_url, video_id, backend)
+
+        key = cache.make_key(content, video_url, video_id, backend=backend)
+        output_path = f"report_{video_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{key[:8]}.pdf"
+        async with trace_span("pdf.cache_lookup") as span:
+            hit = await asyncio.to_thread(cache.get, key, output_path)
+            if span:
+                span.set_attribute("hit", hit)
+        if hit:
+            return output_path
+
+        pdf_path = await self._render(content, video_url, video_id, backend)
+        await asyncio.to_thread(cache.put, key, pdf_path)
+        return pdf_path
+
+    async def _render(self, content: str, video_url: str, video_id: str, backend: str) -> str:
+        async with self._slots, self._running:
+            async with trace_span("pdf.render_async", video_id=video_id, backend=backend):
+                loop = asyncio.get_running_loop()
+                try:
+                    future = loop.run_in_executor(
+                        self._get_pool(), _render_in_worker, content, video_url, video_id, backend
+                    )
+                    return await asyncio.wait_for(future, timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    # Only running jobs reach the executor: this one is stuck
+                    self._recycle_pool()
+                    raise PDFRenderTimeout(f"PDF generatsiyasi {self.timeout:.0f}s dan oshdi")
+                except BrokenProcessPool:
+                    # Worker died (OOM etc.) — start a fresh pool and retry once
+                    self._recycle_pool()
+                    future = loop.run_in_executor(
+                        self._get_pool(), _render_in_worker, content, video_url, video_id, backend
+                    )
+                    return await asyncio.wait_for(future, timeout=self.timeout)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_service: Optional[PDFRenderService] = None
+
+
+def get_pdf_render_service() -> PDFRenderService:
+    global _service
+    if _service is None:
+        _service = PDFRenderService()
+    return _service
+
+
+async def render_pdf(
+    content: str, video_url: str, video_id: str, analysis_type: Optional[str] = None
+) -> str:
+    return await get_pdf_render_service().render_pdf(content, video_url, video_id, analysis_type)
@@ -0,0 +1,293 @@
+"""ReportLab backend for simple/shorts reports.
+
+These reports only contain headings, paragraphs, lists, tables and the odd
+code block, so they are drawn directly with ReportLab flowables instead of a
+full HTML/CSS layout pass. Markdown is parsed by the same
+`iter_markdown_blocks` as the WeasyPrint backend, so both backends see the
+same document structure.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime
+from html import escape
+from pathlib import Path
+from typing import List
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas as rl_canvas
+from reportlab.platypus import (
+    KeepTogether,
+    ListFlowable,
+    ListItem,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+from services.pdf_generator import PDFBackend, iter_markdown_blocks
+
+FONT = "DejaVuSans"
+FONT_BOLD = "DejaVuSans-Bold"
+FONT_MONO = "DejaVuSansMono"
+
+# Shipped regular font first, then system DejaVu (bold/mono are optional)
+_FONT_CANDIDATES = {
+    FONT: [Path(__file__).with_name("DejaVuSans.ttf"), Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")],
+    FONT_BOLD: [Path("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")],
+    FONT_MONO: [Path("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf")],
+}
+
+# Colors follow REPORT_CSS
+TEXT_COLOR = colors.HexColor("#1f2937")
+MUTED_COLOR = colors.HexColor("#6b7280")
+ACCENT_COLOR = colors.HexColor("#1e40af")
+TABLE_HEADER_BG = colors.HexColor("#3b82f6")
+TABLE_STRIPE_BG = colors.HexColor("#f8fafc")
+BORDER_COLOR = colors.HexColor("#e5e7eb")
+CODE_BG = colors.HexColor("#f3f4f6")
+
+# DejaVu has no glyphs for astral-plane emoji; drop them instead of drawing boxes
+_UNSUPPORTED_CHARS_RE = re.compile("[\U00010000-\U0010FFFF️]")
+_EMPHASIS_SPLIT_RE = re.compile(r'(\*\*\*|\*\*|\*)')
+_EMPHASIS_TAGS = {"**": "b", "*": "i"}
+_INLINE_CODE_RE = re.compile(r'`([^`]+?)`')
+_TABLE_SEPARATOR_RE = re.compile(r'^[-:]+$')
+
+_fonts_registered = False
+
+
+def _register_fonts() -> None:
+    global _fonts_registered
+    if _fonts_registered:
+        return
+
+    regular = next((p for p in _FONT_CANDIDATES[FONT] if p.exists()), None)
+    if regular is None:
+        raise RuntimeError("DejaVuSans.ttf topilmadi (ReportLab backend uchun kerak)")
+    pdfmetrics.registerFont(TTFont(FONT, str(regular)))
+
+    for name in (FONT_BOLD, FONT_MONO):
+        path = next((p for p in _FONT_CANDIDATES[name] if p.exists()), regular)
+        pdfmetrics.registerFont(TTFont(name, str(path)))
+
+    pdfmetrics.registerFontFamily(FONT, normal=FONT, bold=FONT_BOLD, italic=FONT, boldItalic=FONT_BOLD)
+    _fonts_registered = True
+
+
+def _style(name: str, **kw) -> ParagraphStyle:
+    base = dict(fontName=FONT, fontSize=10, leading=14, textColor=TEXT_COLOR)
+    base.update(kw)
+    return ParagraphStyle(name, **base)
+
+
+def _build_styles() -> dict:
+    return {
+        "title": _style("title", fontName=FONT_BOLD, fontSize=20, leading=24, alignment=TA_CENTER, textColor=ACCENT_COLOR),
+        "subtitle": _style("subtitle", fontSize=10, alignment=TA_CENTER, textColor=MUTED_COLOR, spaceAfter=10),
+        "meta": _style("meta", fontSize=8.5, leading=12),
+        "body": _style("body", spaceAfter=6),
+        "h1": _style("h1", fontName=FONT_BOLD, fontSize=16, leading=20, textColor=ACCENT_COLOR, spaceBefore=12, spaceAfter=6),
+        "h2": _style("h2", fontName=FONT_BOLD, fontSize=14, leading=18, textColor=ACCENT_COLOR, spaceBefore=10, spaceAfter=5),
+        "h3": _style("h3", fontName=FONT_BOLD, fontSize=12, leading=16, spaceBefore=8, spaceAfter=4),
+        "h4": _style("h4", fontName=FONT_BOLD, fontSize=10.5, leading=14, spaceBefore=6, spaceAfter=3),
+        "metrics": _style("metrics", fontName=FONT_BOLD, fontSize=11, leading=15, textColor=ACCENT_COLOR, spaceBefore=10, spaceAfter=4),
+        "footer_marker": _style("footer_marker", fontSize=8, alignment=TA_CENTER, textColor=MUTED_COLOR, spaceBefore=4, spaceAfter=8),
+        "code": _style("code", fontName=FONT_MONO, fontSize=7.5, leading=10, backColor=CODE_BG, borderPadding=6, spaceBefore=4, spaceAfter=10),
+    }
+
+
+def _emphasis(text: str) -> str:
+    """`**bold**` / `*italic*` -> <b>/<i>.
+
+    Markers pair up innermost-first, so the tags are always well nested
+    (ReportLab's paragraph parser rejects `<b>a <i>b</b> c</i>`); a marker
+    that would close across another open one, or never closes, stays literal.
+    """
+    out: List[str] = []
+    open_markers: List[tuple] = []  # (index in out, marker)
+    for i, part in enumerate(_EMPHASIS_SPLIT_RE.split(text)):
+        if i % 2 == 0:
+            out.append(part)
+            continue
+        markers = [part]
+        if part == "***":
+            # Close the inner one first: "***x***" -> <b><i>x</i></b>
+            markers = ["*", "**"] if open_markers and open_markers[-1][1] == "*" else ["**", "*"]
+        for marker in markers:
+            if open_markers and open_markers[-1][1] == marker:
+                tag = _EMPHASIS_TAGS[marker]
+                out[open_markers.pop()[0]] = f"<{tag}>"
+                out.append(f"</{tag}>")
+            else:
+                if all(m != marker for _, m in open_markers):
+                    open_markers.append((len(out), marker))
+                out.append(marker)
+    return "".join(out)
+
+
+def _inline(text: str) -> str:
+    """Markdown inline -> ReportLab paragraph markup (escaped)."""
+    text = escape(_UNSUPPORTED_CHARS_RE.sub("", text or ""), quote=False)
+    if "*" not in text and "`" not in text:
+        return text
+    # Odd parts are inline code: no emphasis inside, and none spanning it
+    parts = _INLINE_CODE_RE.split(text)
+    return "".join(
+        f'<font face="{FONT_MONO}">{part}</font>' if i % 2 else (_emphasis(part) if "*" in part else part)
+        for i, part in enumerate(parts)
+    )
+
+
+def _table(lines: List[str], available_width: float):
+    if len(lines) < 2:
+        return None
+    headers = [c.strip() for c in lines[0].strip("|").split("|")]
+    rows = []
+    for line in lines[1:]:
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if all(_TABLE_SEPARATOR_RE.match(c) for c in cells):
+            continue
+        rows.append(cells)
+    if not rows:
+        return None
+
+    col_count = len(headers)
+    font_size = 6.5 if col_count >= 8 else 7.5 if col_count >= 6 else 8.5 if col_count >= 4 else 9
+    cell_style = _style("cell", fontSize=font_size, leading=font_size * 1.3)
+    head_style = _style("head", fontName=FONT_BOLD, fontSize=font_size, leading=font_size * 1.3, textColor=colors.white)
+
+    # Column widths proportional to content length (as in format_table), with a floor
+    max_lens = [max(len(h), 3) for h in headers]
+    for row in rows:
+        for i, cell in enumerate(row[:col_count]):
+            max_lens[i] = max(max_lens[i], min(len(cell), 60))
+    total = sum(max_lens) or 1
+    widths = [available_width * l / total for l in max_lens]
+
+    data = [[Paragraph(_inline(h), head_style) for h in headers]]
+    for row in rows:
+        cells = (row + ["—"] * col_count)[:col_count]
+        data.append([Paragraph(_inline(c) if c else "—", cell_style) for c in cells])
+
+    table = Table(data, colWidths=widths, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), TABLE_HEADER_BG),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, TABLE_STRIPE_BG]),
+        ("GRID", (0, 0), (-1, -1), 0.5, BORDER_COLOR),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    return table
+
+
+def _code(lines: List[str], lang: str, style: ParagraphStyle) -> Paragraph:
+    text = "\n".join(lines)
+    if lang == "json":
+        try:
+            text = json.dumps(json.loads(text), indent=2, ensure_ascii=False)
+        except Exception:
+            pass
+    markup = "<br/>".join(
+        escape(_UNSUPPORTED_CHARS_RE.sub("", line), quote=False).replace(" ", "&nbsp;")
+        for line in text.split("\n")
+    )
+    return Paragraph(markup, style)
+
+
+class _NumberedCanvas(rl_canvas.Canvas):
+    """Two-pass canvas: "Страница N из M" footer on every page."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_pages = []
+
+    def showPage(self):
+        self._saved_pages.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        total = len(self._saved_pages)
+        for state in self._saved_pages:
+            self.__dict__.update(state)
+            self.setFont(FONT, 8)
+            self.setFillColor(MUTED_COLOR)
+            self.drawCentredString(A4[0] / 2, 1.2 * cm, f"Страница {self._pageNumber} из {total}")
+            super().showPage()
+        super().save()
+
+
+class ReportLabBackend(PDFBackend):
+    name = "reportlab"
+
+    def __init__(self):
+        _register_fonts()
+        self.styles = _build_styles()
+
+    def render(self, content: str, video_url: str, video_id: str, output_path: str) -> None:
+        st = self.styles
+        doc = SimpleDocTemplate(
+            output_path,
+            pagesize=A4,
+            leftMargin=1.5 * cm,
+            rightMargin=1.5 * cm,
+            topMargin=2 * cm,
+            bottomMargin=2 * cm,
+            title=f"Анализ комментариев - {video_id}",
+        )
+
+        story = [
+            Paragraph("СТРАТЕГИЧЕСКИЙ АНАЛИЗ", st["title"]),
+            Paragraph("Аналитический отчет по комментариям", st["subtitle"]),
+        ]
+        meta = Table(
+            [
+                [Paragraph("Видео:", st["meta"]), Paragraph(f'<link href="{escape(video_url)}">{escape(video_url)}</link>', st["meta"])],
+                [Paragraph("Дата:", st["meta"]), Paragraph(datetime.now().strftime('%d.%m.%Y в %H:%M'), st["meta"])],
+                [Paragraph("ID:", st["meta"]), Paragraph(escape(video_id), st["meta"])],
+            ],
+            colWidths=[2.2 * cm, doc.width - 2.2 * cm],
+        )
+        meta.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, -1), TABLE_STRIPE_BG),
+            ("BOX", (0, 0), (-1, -1), 0.5, BORDER_COLOR),
+        ]))
+        story += [meta, Spacer(1, 12)]
+
+        for kind, data in iter_markdown_blocks(content):
+            if kind == "paragraph":
+                story.append(Paragraph(_inline(data), st["body"]))
+            elif kind == "heading":
+                level, text = data
+                story.append(Paragraph(_inline(text), st[f"h{min(level, 4)}"]))
+            elif kind == "list":
+                story.append(ListFlowable(
+                    [ListItem(Paragraph(_inline(item), st["body"]), leftIndent=12) for item in data],
+                    bulletType="bullet",
+                    bulletFontName=FONT,
+                    bulletFontSize=8,
+                    leftIndent=12,
+                ))
+            elif kind == "table":
+                table = _table(data, doc.width)
+                if table is not None:
+                    story += [table, Spacer(1, 8)]
+            elif kind == "code":
+                story.append(_code(data[0], data[1], st["code"]))
+            elif kind == "metrics_header":
+                story.append(KeepTogether([Paragraph(_inline(data), st["metrics"])]))
+            elif kind == "metrics_footer":
+                story.append(Paragraph("— Конец машиночитаемых данных —", st["footer_marker"]))
+
+        doc.build(story, canvasmaker=_NumberedCanvas)
@@ -1,17 +1,19 @@
 from typing import List
 
-# oddiy adminlar ro‘yxati (keyin DB ga o‘tkazamiz)
-ADMIN_IDS = {
+import config
+
+# oddiy adminlar ro‘yxati (keyin DB ga o‘tkazamiz); .env ADMIN_IDS ham admin
+ADMIN_IDS = frozenset({
     7166331865,
     2119659554,  
-}
+})
 
 
 class PermissionService:
 
     @staticmethod
     def is_admin(user_id: int) -> bool:
-        return user_id in ADMIN_IDS
+        return user_id in ADMIN_IDS or config.is_admin(user_id)
 
     @staticmethod
     def check_access(user_id: int, feature: str) -> bool:
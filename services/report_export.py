@@ -0,0 +1,219 @@
+"""Bulk export of report PDFs as one ZIP (admin panel).
+
+An export is a manifest of AIResponse rows (exports/<id>.json). The ZIP is
+built by one background task per export, entry by entry: stored PDFs are
+taken from artefact storage, missing ones are rendered through the PDF worker
+pool and stored for next time. Entries are written with ZIP_STORED (PDFs are
+already compressed) into an append-only spool file, so memory stays at one
+chunk regardless of the number of reports.
+
+Downloads tail the spool while it grows; the finished file is served with
+HTTP Range support, which is how interrupted downloads resume.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from database.crud import admin_get_ai_response_text, update_ai_response_files_by_id
+from services.artifact_storage import get_artifact_storage
+from services.pdf_render_service import render_pdf
+from services.youtube_service import extract_video_id
+
+EXPORT_DIR = Path("exports")
+CHUNK_SIZE = 256 * 1024
+# How often a download waiting for the next entry checks the spool file
+POLL_INTERVAL_SECONDS = 0.2
+
+_builders: Dict[str, asyncio.Task] = {}
+
+
+def _manifest_path(export_id: str) -> Path:
+    return EXPORT_DIR / f"{export_id}.json"
+
+
+def zip_path(export_id: str) -> Path:
+    return EXPORT_DIR / f"{export_id}.zip"
+
+
+def _part_path(export_id: str) -> Path:
+    return EXPORT_DIR / f"{export_id}.zip.part"
+
+
+def _arcname(entry: dict) -> str:
+    channel = entry.get("channel_id") or "no_channel"
+    return f"{entry['user_id']}/{channel}/{entry['id']}_{entry.get('analysis_type') or 'report'}.pdf"
+
+
+def create_export(rows: List[dict]) -> dict:
+    """Write the manifest for `rows`; the same selection always maps to the same export."""
+    ids = sorted(int(r["id"]) for r in rows)
+    export_id = hashlib.sha256(json.dumps(ids).encode()).hexdigest()[:16]
+    manifest = _manifest_path(export_id)
+    if not manifest.exists():
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        entries = [
+            {
+                "id": int(r["id"]),
+                "user_id": r["user_id"],
+                "channel_id": r.get("channel_id"),
+                "video_url": r.get("video_url"),
+                "analysis_type": r.get("analysis_type"),
+                "pdf_file_path": r.get("pdf_file_path"),
+            }
+            for r in sorted(rows, key=lambda r: int(r["id"]))
+        ]
+        tmp = manifest.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({
+            "export_id": export_id,
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "entries": entries,
+        }, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, manifest)
+    return {"export_id": export_id, "count": len(ids)}
+
+
+def load_manifest(export_id: str) -> Optional[dict]:
+    try:
+        return json.loads(_manifest_path(export_id).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+class _AppendOnlyWriter(io.RawIOBase):
+    """Non-seekable sink: zipfile then writes data descriptors instead of
+    seeking back to patch headers, so bytes already read by a download never change."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._pos
+
+    def write(self, b) -> int:
+        n = self._raw.write(b)
+        self._pos += n
+        return n
+
+
+async def _entry_pdf(entry: dict) -> Optional[Path]:
+    storage = get_artifact_storage()
+    if storage.exists(entry.get("pdf_file_path")):
+        return await asyncio.to_thread(storage.materialize, entry["pdf_file_path"])
+
+    text = await admin_get_ai_response_text(entry["id"])
+    if not text:
+        return None
+    video_url = entry.get("video_url") or ""
+    video_id = extract_video_id(video_url) or str(entry["id"])
+    pdf_file = await render_pdf(text, video_url, video_id, entry.get("analysis_type"))
+    handle = await asyncio.to_thread(
+        storage.put_file, "report_pdf", pdf_file,
+        filename=f"{video_id}_{entry.get('analysis_type')}_{entry['id']}.pdf", remove=True,
+    )
+    await update_ai_response_files_by_id(entry["id"], pdf_path=handle)
+    return await asyncio.to_thread(storage.materialize, handle)
+
+
+async def _build(export_id: str, raw) -> None:
+    manifest = load_manifest(export_id) or {"entries": []}
+    try:
+        zf = zipfile.ZipFile(_AppendOnlyWriter(raw), "w", compression=zipfile.ZIP_STORED)
+        for entry in manifest["entries"]:
+            arcname = _arcname(entry)
+            try:
+                pdf = await _entry_pdf(entry)
+            except Exception as e:
+                print(f"⚠️ Eksport {export_id}: {entry['id']} PDF xatosi: {e}")
+                pdf = None
+            if pdf is None:
+                await asyncio.to_thread(zf.writestr, arcname + ".error.txt", "PDF not available\n")
+                continue
+            await asyncio.to_thread(zf.write, pdf, arcname)
+        await asyncio.to_thread(zf.close)
+    finally:
+        raw.close()
+    os.replace(_part_path(export_id), zip_path(export_id))
+
+
+def ensure_build(export_id: str) -> Optional[asyncio.Task]:
+    """Start (or join) the builder of an export; None when the ZIP is complete."""
+    if zip_path(export_id).exists():
+        return None
+    task = _builders.get(export_id)
+    if task is not None and not task.done():
+        return task
+    # Unbuffered: a download tailing the spool sees every written byte
+    raw = open(_part_path(export_id), "wb", buffering=0)
+    task = asyncio.create_task(_build(export_id, raw))
+    _builders[export_id] = task
+    task.add_done_callback(lambda _t: _builders.pop(export_id, None))
+    return task
+
+
+async def wait_for_export(export_id: str) -> Path:
+    task = ensure_build(export_id)
+    if task is not None:
+        await asyncio.shield(task)
+    return zip_path(export_id)
+
+
+async def stream_export(export_id: str) -> AsyncIterator[bytes]:
+    """Bytes of the ZIP as they are produced (the build survives client disconnects)."""
+    task = ensure_build(export_id)
+    if task is None:
+        path = zip_path(export_id)
+    else:
+        path = _part_path(export_id)
+
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+            if chunk:
+                yield chunk
+                continue
+            if task is None or task.done():
+                if task is not None and task.exception():
+                    raise task.exception()
+                rest = await asyncio.to_thread(f.read)
+                if rest:
+                    yield rest
+                    continue
+                return
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+def export_status(export_id: str) -> Optional[dict]:
+    manifest = load_manifest(export_id)
+    if manifest is None:
+        return None
+    done = zip_path(export_id)
+    part = _part_path(export_id)
+    if done.exists():
+        state, size = "ready", done.stat().st_size
+    elif export_id in _builders:
+        state, size = "building", part.stat().st_size if part.exists() else 0
+    else:
+        state, size = "pending", 0
+    return {
+        "export_id": export_id,
+        "count": len(manifest["entries"]),
+        "created_at": manifest.get("created_at"),
+        "status": state,
+        "bytes": size,
+    }
@@ -0,0 +1,168 @@
+"""Adaptive retry budget for advanced modules 10-1..10-4.
+
+Aggregates ValidationLogger output (validation_logs/<video_id>/<module>_attemptN.json)
+and estimates, per module and attempt number, how often continuing to retry
+after a failed attempt actually ends up passing validation. Retries that historically almost
+never help are skipped, so a weak module output goes straight to the
+"partial" path instead of burning minutes on more AI calls.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+VALIDATION_LOGS_DIR = Path("validation_logs")
+
+# Not enough history -> keep the old behaviour (always retry)
+MIN_SAMPLES = 8
+# Skip a retry when the smoothed chance that it passes is below this
+MIN_RETRY_SUCCESS_RATE = 0.15
+# Share of "hopeless" retries still executed, so the statistics keep updating
+EXPLORATION_RATE = 0.1
+# Aggregated stats are recomputed at most this often per process
+STATS_TTL_SECONDS = 1800
+
+
+@dataclass
+class RetryStats:
+    """Outcome of continuing after failed attempt `attempt` of one module.
+
+    `passed` counts runs where any later attempt passed validation,
+    `improved`/`score_delta_sum` describe the very next attempt.
+    """
+
+    samples: int = 0
+    passed: int = 0
+    improved: int = 0
+    score_delta_sum: float = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing: a few lucky/unlucky runs should not flip the policy
+        return (self.passed + 1) / (self.samples + 2)
+
+    @property
+    def improve_rate(self) -> float:
+        return (self.improved + 1) / (self.samples + 2)
+
+    @property
+    def mean_score_delta(self) -> float:
+        return self.score_delta_sum / self.samples if self.samples else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "samples": self.samples,
+            "passed": self.passed,
+            "improved": self.improved,
+            "success_rate": round(self.success_rate, 3),
+            "improve_rate": round(self.improve_rate, 3),
+            "mean_score_delta": round(self.mean_score_delta, 2),
+        }
+
+
+def _load_run_attempts(video_dir: Path) -> Dict[str, List[dict]]:
+    """Attempt logs of the latest run per module in one video directory.
+
+    Re-running a video overwrites attemptN files, so files older than the
+    latest attempt1 belong to a previous run and are dropped.
+    """
+    by_module: Dict[str, List[dict]] = {}
+    for log_file in video_dir.glob("*_attempt*.json"):
+        try:
+            with open(log_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        module_id = data.get("module_id")
+        if not module_id or not isinstance(data.get("attempt"), int):
+            continue
+        by_module.setdefault(module_id, []).append(data)
+
+    for module_id, logs in by_module.items():
+        logs.sort(key=lambda x: x["attempt"])
+        first = next((l for l in logs if l["attempt"] == 1), None)
+        if first and first.get("timestamp"):
+            logs[:] = [l for l in logs if (l.get("timestamp") or "") >= first["timestamp"]]
+    return by_module
+
+
+def aggregate_retry_stats(logs_dir: Path = VALIDATION_LOGS_DIR) -> Dict[Tuple[str, int], RetryStats]:
+    """Scan validation logs: (module_id, failed attempt) -> outcome of the remaining attempts."""
+    stats: Dict[Tuple[str, int], RetryStats] = {}
+    if not logs_dir.exists():
+        return stats
+
+    for video_dir in logs_dir.iterdir():
+        if not video_dir.is_dir():
+            continue
+        for module_id, logs in _load_run_attempts(video_dir).items():
+            for i, (prev, nxt) in enumerate(zip(logs, logs[1:])):
+                if prev.get("is_valid") or nxt["attempt"] != prev["attempt"] + 1:
+                    continue
+                s = stats.setdefault((module_id, prev["attempt"]), RetryStats())
+                delta = float(nxt.get("quality_score") or 0) - float(prev.get("quality_score") or 0)
+                s.samples += 1
+                s.passed += 1 if any(l.get("is_valid") for l in logs[i + 1:]) else 0
+                s.improved += 1 if delta > 0 else 0
+                s.score_delta_sum += delta
+    return stats
+
+
+@dataclass
+class RetryPolicy:
+    stats: Dict[Tuple[str, int], RetryStats] = field(default_factory=dict)
+    min_samples: int = MIN_SAMPLES
+    min_success_rate: float = MIN_RETRY_SUCCESS_RATE
+    exploration_rate: float = EXPLORATION_RATE
+
+    def is_retry_worthy(self, module_id: str, attempt: int) -> bool:
+        """Deterministic part: does history say retrying after failed `attempt` pays off?"""
+        s = self.stats.get((module_id, attempt))
+        if not s or s.samples < self.min_samples:
+            return True
+        return s.success_rate >= self.min_success_rate
+
+    def should_retry(self, module_id: str, attempt: int) -> bool:
+        if self.is_retry_worthy(module_id, attempt):
+            return True
+        return random.random() < self.exploration_rate
+
+    def retry_budget(self, module_id: str, max_retries: int) -> int:
+        """Number of retries history currently considers worthwhile for a module."""
+        budget = 0
+        while budget < max_retries and self.is_retry_worthy(module_id, budget + 1):
+            budget += 1
+        return budget
+
+    def summary(self, max_retries: int = 4) -> Dict[str, Dict]:
+        out: Dict[str, Dict] = {}
+        for (module_id, attempt), s in sorted(self.stats.items()):
+            out.setdefault(module_id, {})[f"after_attempt_{attempt}"] = s.as_dict()
+        for module_id in out:
+            out[module_id]["retry_budget"] = self.retry_budget(module_id, max_retries)
+        return out
+
+
+_cached_policy: Optional[RetryPolicy] = None
+_cached_at: float = 0.0
+
+
+async def get_retry_policy() -> RetryPolicy:
+    """Process-wide policy, rebuilt from logs every STATS_TTL_SECONDS (in a thread)."""
+    global _cached_policy, _cached_at
+    now = time.monotonic()
+    if _cached_policy is None or now - _cached_at > STATS_TTL_SECONDS:
+        try:
+            stats = await asyncio.to_thread(aggregate_retry_stats)
+            _cached_policy = RetryPolicy(stats=stats)
+        except Exception as e:
+            print(f"⚠️ Retry statistikasini yig'ishda xato: {e}")
+            _cached_policy = _cached_policy or RetryPolicy()
+        _cached_at = now
+    return _cached_policy
@@ -1,36 +1,118 @@
 import json
 import random
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
 from sqlalchemy import select, insert, update
 from database.engine import async_session
 from database.models import SampleReport
+from services.document_delivery import send_document
+
+DEMO_DIR = Path("reports/demo")
 
 
 class SampleReportsService:
     
     @staticmethod
     async def get_random_sample_report(video_type: str = 'regular'):
+        """Random active demo without loading every row.
+
+        Each row carries a uniform `random_key`; the first key >= random() on
+        idx_sample_reports_pick (wrapping around to the smallest) is one index seek.
+        """
+        columns = (
+            SampleReport.id,
+            SampleReport.report_name,
+            SampleReport.video_url,
+            SampleReport.video_type,
+            SampleReport.pdf_path,
+            SampleReport.telegram_file_id,
+        )
+        base = (
+            select(*columns)
+            .where(SampleReport.is_active == True)
+            .where(SampleReport.video_type == video_type)
+        )
         async with async_session() as session:
-            result = await session.execute(
-                select(SampleReport)
-                .where(SampleReport.is_active == True)
-                .where(SampleReport.video_type == video_type)  # 🆕 YANGI
-            )
-            reports = result.scalars().all()
-            
-            if not reports:
+            row = (await session.execute(
+                base.where(SampleReport.random_key >= random.random())
+                .order_by(SampleReport.random_key)
+                .limit(1)
+            )).first()
+            if row is None:
+                row = (await session.execute(base.order_by(SampleReport.random_key).limit(1))).first()
+            if row is None:
                 return None
-            
-            selected_report = random.choice(reports)
-            
-            return {
-                'id': selected_report.id,
-                'report_name': selected_report.report_name,
-                'video_url': selected_report.video_url,
-                'video_type': selected_report.video_type,  # 🆕 YANGI
-                'analysis_data': json.loads(selected_report.analysis_data),
-                'is_active': selected_report.is_active,
-                'created_at': selected_report.created_at
-            }
+
+            report = dict(row._mapping)
+            if not report['pdf_path']:
+                # Rows uploaded before pdf_path existed: read it once from analysis_data and keep it
+                data = (await session.execute(
+                    select(SampleReport.analysis_data).where(SampleReport.id == report['id'])
+                )).scalar_one_or_none()
+                try:
+                    report['pdf_path'] = json.loads(data or "{}").get('pdf_path')
+                except (TypeError, ValueError):
+                    report['pdf_path'] = None
+                if report['pdf_path']:
+                    await session.execute(
+                        update(SampleReport)
+                        .where(SampleReport.id == report['id'])
+                        .values(pdf_path=report['pdf_path'])
+                    )
+                    await session.commit()
+            return report
+
+    @staticmethod
+    async def set_telegram_file_id(report_id: int, file_id: Optional[str]):
+        async with async_session() as session:
+            await session.execute(
+                update(SampleReport).where(SampleReport.id == report_id).values(telegram_file_id=file_id)
+            )
+            await session.commit()
+
+    @staticmethod
+    async def send_sample_report(message: Message, sample_report: dict, caption: str) -> bool:
+        """Send the demo PDF: cached Telegram file_id first, upload from disk otherwise.
+
+        After the first upload the file_id is stored, so later demos are a single
+        API call without reading or uploading the file. Returns False if no PDF exists.
+        """
+        file_id = sample_report.get('telegram_file_id')
+        if file_id:
+            try:
+                await message.answer_document(file_id, caption=caption, parse_mode="HTML")
+                return True
+            except TelegramBadRequest:
+                # file_id of another bot token / expired: upload again below
+                await SampleReportsService.set_telegram_file_id(sample_report['id'], None)
+
+        pdf_path = sample_report.get('pdf_path')
+        if not pdf_path or not Path(pdf_path).exists():
+            return False
+
+        sent = await send_document(message, pdf_path, caption=caption, parse_mode="HTML")
+        if sent.document:
+            await SampleReportsService.set_telegram_file_id(sample_report['id'], sent.document.file_id)
+        return True
+
+    @staticmethod
+    async def render_sample_pdf(video_url: str, report_text: str, analysis_type: Optional[str] = None) -> str:
+        """Render a demo report once (at upload) into reports/demo and return its path."""
+        from services.pdf_render_service import render_pdf
+        from services.youtube_service import extract_video_id
+
+        video_id = extract_video_id(video_url) or "unknown"
+        safe_video_id = "".join([c for c in video_id if c.isalnum() or c in ("_", "-")])[:32]
+        pdf_file = await render_pdf(report_text, video_url, safe_video_id, analysis_type)
+
+        DEMO_DIR.mkdir(parents=True, exist_ok=True)
+        pdf_path = DEMO_DIR / f"demo_{safe_video_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        Path(pdf_file).replace(pdf_path)
+        return str(pdf_path)
     
     @staticmethod
     async def get_all_sample_reports(active_only: bool = True):
@@ -51,6 +133,8 @@ class SampleReportsService:
                     'video_type': report.video_type,
                     'analysis_data': json.loads(report.analysis_data),
                     'is_active': report.is_active,
+                    'pdf_path': report.pdf_path,
+                    'telegram_file_id': report.telegram_file_id,
                     'created_at': report.created_at
                 }
                 for report in reports
@@ -74,18 +158,29 @@ class SampleReportsService:
                 'video_type': report.video_type,
                 'analysis_data': json.loads(report.analysis_data),
                 'is_active': report.is_active,
+                'pdf_path': report.pdf_path,
+                'telegram_file_id': report.telegram_file_id,
                 'created_at': report.created_at
             }
     
     @staticmethod
-    async def add_sample_report(report_name: str, video_url: str, analysis_data: dict, video_type: str = 'regular'):
+    async def add_sample_report(
+        report_name: str,
+        video_url: str,
+        analysis_data: dict,
+        video_type: str = 'regular',
+        telegram_file_id: Optional[str] = None,
+    ):
         async with async_session() as session:
             stmt = insert(SampleReport).values(
                 report_name=report_name,
                 video_url=video_url,
                 video_type=video_type,  # 🆕 YANGI
                 analysis_data=json.dumps(analysis_data, ensure_ascii=False),
-                is_active=True
+                is_active=True,
+                pdf_path=analysis_data.get('pdf_path'),
+                telegram_file_id=telegram_file_id,
+                random_key=random.random(),
             )
             result = await session.execute(stmt)
             await session.commit()
@@ -120,6 +215,10 @@ class SampleReportsService:
     async def update_sample_report(report_id: int, **kwargs):
         async with async_session() as session:
             if 'analysis_data' in kwargs and isinstance(kwargs['analysis_data'], dict):
+                if 'pdf_path' in kwargs['analysis_data']:
+                    # New PDF: the cached Telegram file_id belongs to the old one
+                    kwargs.setdefault('pdf_path', kwargs['analysis_data']['pdf_path'])
+                    kwargs.setdefault('telegram_file_id', None)
                 kwargs['analysis_data'] = json.dumps(kwargs['analysis_data'], ensure_ascii=False)
             
             stmt = update(SampleReport).where(
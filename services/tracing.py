@@ -0,0 +1,273 @@
+"""Lightweight stage tracer for the analysis pipeline.
+
+Spans use the OpenTelemetry data model (trace_id/span_id/parent_span_id as hex,
+start/end in unix nanoseconds, attributes, status), so the rows can be shipped
+to any OTel backend later. Locally they are exported to a SQLite file that the
+Web Admin reads for per-stage p50/p95.
+
+Usage:
+    async with trace_span("analysis.ai_module", module="10-1", attempt=2):
+        ...
+    with trace_span("pdf.render"):
+        ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+_CURRENT_SPAN: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    trace_id TEXT NOT NULL,
+    span_id TEXT PRIMARY KEY,
+    parent_span_id TEXT,
+    name TEXT NOT NULL,
+    start_time_unix_nano INTEGER NOT NULL,
+    end_time_unix_nano INTEGER NOT NULL,
+    duration_ms REAL NOT NULL,
+    status_code TEXT NOT NULL,
+    status_message TEXT,
+    attributes TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_spans_name_start ON spans (name, start_time_unix_nano);
+CREATE INDEX IF NOT EXISTS ix_spans_trace ON spans (trace_id);
+"""
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time_unix_nano: int = 0
+    end_time_unix_nano: int = 0
+    status_code: str = "UNSET"  # UNSET/OK/ERROR (OTel)
+    status_message: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return max(0, self.end_time_unix_nano - self.start_time_unix_nano) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class SQLiteSpanExporter:
+    """Buffers finished spans and writes them in one transaction per trace."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._buffer: List[Span] = []
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._initialized:
+            conn.executescript(_SCHEMA)
+            self._initialized = True
+        return conn
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span)
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if not spans:
+            return
+        try:
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            s.trace_id,
+                            s.span_id,
+                            s.parent_span_id,
+                            s.name,
+                            s.start_time_unix_nano,
+                            s.end_time_unix_nano,
+                            s.duration_ms,
+                            s.status_code,
+                            s.status_message,
+                            json.dumps(s.attributes, ensure_ascii=False, default=str),
+                        )
+                        for s in spans
+                    ],
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"⚠️ Trace eksportida xato: {e}")
+
+    def stage_latency_stats(self, *, since_hours: int = 24 * 7, limit_per_stage: int = 500) -> List[Dict[str, Any]]:
+        """Per-stage count/p50/p95/max over the most recent spans."""
+        if not self.path.exists():
+            return []
+        since_ns = time.time_ns() - since_hours * 3600 * 1_000_000_000
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """
+                SELECT name, duration_ms, status_code FROM (
+                    SELECT name, duration_ms, status_code,
+                           ROW_NUMBER() OVER (PARTITION BY name ORDER BY start_time_unix_nano DESC) AS rn
+                    FROM spans
+                    WHERE start_time_unix_nano >= ?
+                ) WHERE rn <= ?
+                """,
+                (since_ns, limit_per_stage),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        by_stage: Dict[str, List[tuple]] = {}
+        for name, duration_ms, status_code in rows:
+            by_stage.setdefault(name, []).append((float(duration_ms), status_code))
+
+        result = []
+        for name, items in by_stage.items():
+            durations = sorted(d for d, _ in items)
+            result.append({
+                "stage": name,
+                "count": len(durations),
+                "errors": sum(1 for _, s in items if s == "ERROR"),
+                "p50_ms": round(_percentile(durations, 50), 1),
+                "p95_ms": round(_percentile(durations, 95), 1),
+                "max_ms": round(durations[-1], 1),
+                "total_ms": round(sum(durations), 1),
+            })
+        result.sort(key=lambda x: x["total_ms"], reverse=True)
+        return result
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+_config = Config()
+exporter = SQLiteSpanExporter(_config.TRACE_DB_PATH)
+
+
+class trace_span:
+    """Sync/async context manager creating a child span of the current one.
+
+    Root spans (no parent) flush the exporter when they end: in `async with`
+    the write happens in a worker thread, so the event loop is not blocked.
+    """
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+        self._token = None
+
+    def _start(self) -> Optional[Span]:
+        if not _config.TRACING_ENABLED:
+            return None
+        parent = _CURRENT_SPAN.get()
+        self.span = Span(
+            name=self.name,
+            trace_id=parent.trace_id if parent else _new_id(16),
+            span_id=_new_id(8),
+            parent_span_id=parent.span_id if parent else None,
+            attributes=dict(self.attributes),
+            start_time_unix_nano=time.time_ns(),
+        )
+        self._token = _CURRENT_SPAN.set(self.span)
+        return self.span
+
+    def _end(self, exc: Optional[BaseException]) -> bool:
+        """Finish the span; returns True when the trace should be flushed."""
+        span = self.span
+        if span is None:
+            return False
+        span.end_time_unix_nano = time.time_ns()
+        if exc is None:
+            span.status_code = "OK"
+        elif isinstance(exc, asyncio.CancelledError):
+            span.status_code = "ERROR"
+            span.status_message = "cancelled"
+        else:
+            span.status_code = "ERROR"
+            span.status_message = f"{type(exc).__name__}: {exc}"[:500]
+        try:
+            _CURRENT_SPAN.reset(self._token)
+        except ValueError:
+            # Reset from another context (task switch) — just detach
+            _CURRENT_SPAN.set(None)
+        exporter.add(span)
+        return span.parent_span_id is None
+
+    def __enter__(self) -> Optional[Span]:
+        return self._start()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._end(exc):
+            exporter.flush()
+        return False
+
+    async def __aenter__(self) -> Optional[Span]:
+        return self._start()
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if self._end(exc):
+            await asyncio.to_thread(exporter.flush)
+        return False
+
+
+def current_span() -> Optional[Span]:
+    return _CURRENT_SPAN.get()
+
+
+def traced(name: str, **attributes: Any):
+    """Decorator form of `trace_span` for sync and async functions."""
+    import functools
+    import inspect
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                async with trace_span(name, **attributes):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with trace_span(name, **attributes):
+                return func(*args, **kwargs)
+
+        return sync_wrapper
+
+    return decorator
@@ -3,6 +3,7 @@ import string
 from datetime import datetime, timezone
 from typing import Optional, Tuple
 from sqlalchemy import select, update
+from database.crud import notify_user_changed
 from database.engine import async_session
 from database.models import User, VerificationAttempt
 import re
@@ -141,6 +142,7 @@ class VerificationService:
                     verification_date=datetime.now(tz=timezone.utc)
                 )
                 await session.execute(user_stmt)
+                await notify_user_changed(session, attempt.user_id)
                 
                 await session.commit()
                 
@@ -178,6 +180,7 @@ class VerificationService:
                 verification_date=datetime.now(tz=timezone.utc)
             )
             await session.execute(stmt)
+            await notify_user_changed(session, user_id)
 
             attempt = VerificationAttempt(
                 user_id=user.id,
@@ -342,28 +342,35 @@ def get_video_comments(video_id):
 
 # ===== BARCHA QOLGAN FUNKSIYALAR (ESKI) =====
 
+def format_comments_text(comments_data) -> str:
+    """Kommentarlarni AI konteksti matniga aylantirish (save_comments_to_file formati)"""
+    parts = []
+    for comment in comments_data:
+        # Yangi va eski formatni qo'llab-quvvatlash
+        time_key = comment.get('time') or comment.get('time', '')
+        author_key = comment.get('author') or comment.get('author', 'Unknown')
+        likes_key = comment.get('likes', 0)
+        text_key = comment.get('text') or comment.get('text', '')
+
+        parts.append(f"[{time_key}] ({author_key}, {likes_key} likes) {text_key}\n")
+
+        if comment.get("replies"):
+            parts.append("{\n")
+            for reply in comment["replies"]:
+                reply_time = reply.get('time', '')
+                reply_author = reply.get('author', 'Unknown')
+                reply_likes = reply.get('likes', 0)
+                reply_text = reply.get('text', '')
+                parts.append(f"\t[{reply_time}] ({reply_author}, {reply_likes} likes) {reply_text}\n")
+            parts.append("}\n")
+        parts.append("\n\n")
+    return "".join(parts)
+
+
 def save_comments_to_file(comments_data, file_path):
     """Kommentarlarni faylga saqlash"""
     with open(file_path, "w", encoding="utf-8") as f:
-        for comment in comments_data:
-            # Yangi va eski formatni qo'llab-quvvatlash
-            time_key = comment.get('time') or comment.get('time', '')
-            author_key = comment.get('author') or comment.get('author', 'Unknown')
-            likes_key = comment.get('likes', 0)
-            text_key = comment.get('text') or comment.get('text', '')
-            
-            f.write(f"[{time_key}] ({author_key}, {likes_key} likes) {text_key}\n")
-            
-            if comment.get("replies"):
-                f.write("{\n")
-                for reply in comment["replies"]:
-                    reply_time = reply.get('time', '')
-                    reply_author = reply.get('author', 'Unknown')
-                    reply_likes = reply.get('likes', 0)
-                    reply_text = reply.get('text', '')
-                    f.write(f"\t[{reply_time}] ({reply_author}, {reply_likes} likes) {reply_text}\n")
-                f.write("}\n")
-            f.write("\n\n")
+        f.write(format_comments_text(comments_data))
 
 
 def get_comments_file_path(video_id):
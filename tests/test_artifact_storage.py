@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from services.artifact_storage import (
+    ArtifactStorage,
+    MemoryBackend,
+    StorageBackend,
+    is_handle,
+)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return ArtifactStorage(MemoryBackend(), str(tmp_path / "materialized"))
+
+
+def _blobs(storage):
+    return [b.key for b in storage.backend.list("") if ".refs/" not in b.key]
+
+
+def test_equal_content_is_stored_once(storage):
+    first = storage.put_text("report_txt", "same report", "a.txt")
+    second = storage.put_text("report_txt", "same report", "b.txt")
+
+    assert is_handle(first) and is_handle(second)
+    assert len(_blobs(storage)) == 1
+    assert storage.read_text(first) == storage.read_text(second) == "same report"
+
+
+def test_delete_keeps_blob_shared_with_another_owner(storage):
+    first = storage.put_bytes("report_pdf", b"%PDF same", "a.pdf")
+    second = storage.put_bytes("report_pdf", b"%PDF same", "b.pdf")
+
+    assert storage.delete(first)
+    assert storage.exists(second)
+    assert storage.read_bytes(second) == b"%PDF same"
+
+    assert storage.delete(second)
+    assert not storage.exists(second)
+    assert list(storage.backend.list("")) == []
+
+
+def test_blob_without_references_is_left_to_retention(storage):
+    # Written before reference counting: may be shared, so delete() keeps it
+    storage.backend.put(f"report_pdf/{'0' * 2}/{'0' * 64}", b"%PDF legacy")
+    handle = f"artifact://report_pdf/{'0' * 64}/old.pdf"
+
+    assert not storage.delete(handle)
+    assert storage.exists(handle)
+
+
+def test_retention_removes_blob_with_its_references(storage, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # legacy dirs (results/, ai_logs/, ...) are cwd-relative
+    handle = storage.put_text("comments", "old dump", "c.json")
+    storage.put_text("report_txt", "kept forever", "r.txt")
+
+    removed = storage.apply_retention({"comments": 14, "report_txt": 0}, now=time.time() + 15 * 86400)
+
+    assert removed == {"comments": 1}
+    assert not storage.exists(handle)
+    assert not any(key.startswith("comments/") for key in (b.key for b in storage.backend.list("")))
+    assert len(_blobs(storage)) == 1
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class NoList(StorageBackend):
+        def put(self, key, data): ...
+        def get(self, key): ...
+        def exists(self, key): ...
+        def touch(self, key): ...
+        def delete(self, key): ...
+
+    with pytest.raises(TypeError):
+        NoList()
@@ -0,0 +1,37 @@
+import os
+
+from services.pdf_render_cache import PDFRenderCache
+
+
+def _put(cache, tmp_path, key, size):
+    src = tmp_path / f"{key}.src"
+    src.write_bytes(b"x" * size)
+    cache.put(key, str(src))
+
+
+def test_puts_under_budget_scan_once(tmp_path, monkeypatch):
+    cache = PDFRenderCache(str(tmp_path / "cache"), max_bytes=10_000)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(True) or evict())
+
+    for i in range(5):
+        _put(cache, tmp_path, f"{i:02d}" + "a" * 62, 1000)
+
+    # Only the first put measures the directory; the rest update the total
+    assert len(scans) == 1
+    assert cache._total == 5000
+
+
+def test_over_budget_evicts_least_recently_used(tmp_path):
+    cache = PDFRenderCache(str(tmp_path / "cache"), max_bytes=2500)
+    keys = [f"{i:02d}" + "b" * 62 for i in range(3)]
+    for n, key in enumerate(keys[:2]):
+        _put(cache, tmp_path, key, 1000)
+        os.utime(cache._path(key), (n, n))
+
+    _put(cache, tmp_path, keys[2], 1000)
+
+    assert not cache._path(keys[0]).exists()
+    assert cache._path(keys[1]).exists() and cache._path(keys[2]).exists()
+    assert cache._total == 2000
@@ -0,0 +1,34 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import pdf_render_service
+from services.pdf_render_service import PDFRenderService
+
+
+def _slow_render(content, video_url, video_id, backend):
+    time.sleep(0.3)
+    return f"{video_id}.pdf"
+
+
+def test_queued_renders_do_not_time_out(monkeypatch, tmp_path):
+    # Spans go to the cwd-relative TRACE_DB_PATH
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pdf_render_service, "_render_in_worker", _slow_render)
+    service = PDFRenderService(workers=1, max_pending=4, timeout=0.5)
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(service, "_get_pool", lambda: pool)
+    recycled = []
+    monkeypatch.setattr(service, "_recycle_pool", lambda: recycled.append(True))
+
+    async def render_all():
+        return await asyncio.gather(
+            *(service._render("text", "https://youtu.be/x", f"v{i}", "weasyprint") for i in range(3))
+        )
+
+    try:
+        # Each render takes 0.3s of the 0.5s budget; the queue wait is not counted
+        assert asyncio.run(render_all()) == ["v0.pdf", "v1.pdf", "v2.pdf"]
+        assert not recycled
+    finally:
+        pool.shutdown(wait=True)
@@ -0,0 +1,128 @@
+"""Index regression check for the hot CRUD queries (Postgres only).
+
+Runs the real database.crud functions against TEST_DATABASE_URL, captures the
+SQL they send and EXPLAINs every SELECT with enable_seqscan=off. With a usable
+index the planner avoids a sequential scan even on tiny tables, so any
+"Seq Scan" on ai_responses / videos / comments / users means a query shape lost
+its index (see the composite indexes in database/engine.py).
+
+Schema, seed rows and patches live in one transaction that is rolled back.
+Skipped when TEST_DATABASE_URL is not set.
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+if not TEST_DATABASE_URL.startswith("postgresql"):
+    pytest.skip("TEST_DATABASE_URL (postgresql+asyncpg://...) is not set", allow_module_level=True)
+# database.engine builds its (unused here) engine from DATABASE_URL at import
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+
+from sqlalchemy import event, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from database import crud  # noqa: E402
+from database.engine import Base, _apply_schema_patches  # noqa: E402
+from database.models import AIResponse, Comment, User, Video, VideoAnalysisSet  # noqa: E402
+
+HOT_TABLES = {"ai_responses", "videos", "comments", "users"}
+TELEGRAM_ID = 777_000_001
+CHANNEL_ID = "UCexplaincheck"
+
+# name -> seed ids -> (crud function, args)
+CHECKS = {
+    "get_user_analysis_history": lambda s: (crud.get_user_analysis_history, (TELEGRAM_ID,)),
+    "get_balanced_evolution_analyses": lambda s: (crud.get_balanced_evolution_analyses, (TELEGRAM_ID, CHANNEL_ID, 0)),
+    "get_channel_analysis_stats": lambda s: (crud.get_channel_analysis_stats, (TELEGRAM_ID, CHANNEL_ID)),
+    "get_user_videos_history": lambda s: (crud.get_user_videos_history, (TELEGRAM_ID,)),
+    "get_final_advanced_analyses_for_set": lambda s: (crud.get_final_advanced_analyses_for_set, (s["set_id"],)),
+    "get_comments": lambda s: (crud.get_comments, (s["video_id"],)),
+    "admin_list_users": lambda s: (crud.admin_list_users, ()),
+    "admin_list_users(search)": lambda s: (crud.admin_list_users, ("abc",)),
+}
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def _seed(sessions) -> dict:
+    async with sessions() as session:
+        user = User(user_id=TELEGRAM_ID, username="explain_check")
+        session.add(user)
+        await session.flush()
+        video = Video(user_id=user.id, video_url="https://youtu.be/explain", channel_id=CHANNEL_ID)
+        session.add(video)
+        await session.flush()
+        analysis_set = VideoAnalysisSet(user_id=user.id, video_id="explain", db_video_id=video.id)
+        session.add(analysis_set)
+        await session.flush()
+        session.add(Comment(video_id=video.id, raw_text="comment"))
+        for analysis_type in ("simple", "advanced"):
+            session.add(AIResponse(
+                user_id=user.id, video_id=video.id, chunk_id=0, analysis_type=analysis_type,
+                response_text="report", txt_file_path="report.txt", analysis_set_id=analysis_set.id,
+            ))
+        await session.commit()
+        return {"video_id": video.id, "set_id": analysis_set.id}
+
+
+async def _explain_check(name: str, monkeypatch) -> list[str]:
+    """'<tables>: <statement>' for every captured SELECT that seq-scans a hot table."""
+    engine = create_async_engine(TEST_DATABASE_URL)
+    failures = []
+    try:
+        async with engine.connect() as conn:
+            await conn.begin()
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.run_sync(Base.metadata.create_all)
+            await _apply_schema_patches(conn)
+            # crud commits become savepoint releases inside this transaction
+            sessions = async_sessionmaker(
+                bind=conn, class_=AsyncSession, expire_on_commit=False,
+                join_transaction_mode="create_savepoint",
+            )
+            monkeypatch.setattr(crud, "async_session", sessions)
+            fn, args = CHECKS[name](await _seed(sessions))
+
+            captured = []
+
+            def on_execute(connection, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    captured.append((statement, tuple(parameters or ())))
+
+            event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+            try:
+                await fn(*args)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+            assert captured, f"{name} sent no SELECT"
+
+            await conn.execute(text("SET LOCAL enable_seqscan = off"))
+            for statement, params in captured:
+                plan = (await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, params)).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = seq_scans(plan[0]["Plan"])
+                if scans:
+                    failures.append(f"{', '.join(sorted(set(scans)))}: {' '.join(statement.split())}")
+            await conn.rollback()
+    finally:
+        await engine.dispose()
+    return failures
+
+
+@pytest.mark.parametrize("name", list(CHECKS))
+def test_hot_query_uses_indexes(name, monkeypatch):
+    monkeypatch.setattr(crud, "_user_cache", crud._UserCache())
+    failures = asyncio.run(_explain_check(name, monkeypatch))
+    assert not failures, "Seq Scan on " + "\n".join(failures)
@@ -5,8 +5,13 @@ conform to required machine-readable formats.
 """
 
 from .final_synthesis_validator import FinalSynthesisValidator, FinalSynthesisValidationResult
+from .formulas import PrecomputedIndices
+from .pre_synthesis import build_fixed_indices_prompt, precompute_synthesis_indices
 
 __all__ = [
     "FinalSynthesisValidator",
     "FinalSynthesisValidationResult",
+    "PrecomputedIndices",
+    "build_fixed_indices_prompt",
+    "precompute_synthesis_indices",
 ]
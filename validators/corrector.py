@@ -123,3 +123,25 @@ def auto_correct_report(
         applied.append("fixed_cyrillic_ve")
 
     return CorrectionResult(corrected_report=text, applied=applied)
+
+
+_INDEX_DIGITS = {"CONTENT_HEALTH_INDEX": 1, "STRATEGIC_STABILITY_INDEX": 2}
+
+
+def apply_fixed_indices(text: str, indices: Dict[str, Optional[float]]) -> CorrectionResult:
+    """Overwrite index values in 'KEY: value' lines with precomputed ones.
+
+    Used when indices were calculated before synthesis: the model's numbers are
+    replaced instead of triggering a regeneration.
+    """
+    applied: List[str] = []
+    for key, value in indices.items():
+        if value is None:
+            continue
+        formatted = f"{value:.{_INDEX_DIGITS.get(key, 2)}f}"
+        pattern = re.compile(rf"^(\s*[-*]?\s*(?:\*\*)?{re.escape(key)}(?:\*\*)?\s*:\s*)(.*)$", re.MULTILINE)
+        new_text, count = pattern.subn(lambda m: m.group(1) + formatted, text)
+        if count and new_text != text:
+            text = new_text
+            applied.append(f"fixed_index:{key}")
+    return CorrectionResult(corrected_report=text, applied=applied)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Any, Dict, List, Optional, Set, Tuple
 
-from .corrector import auto_correct_report
-from .formulas import calculate_expected_chi, calculate_expected_ssi
+from .corrector import apply_fixed_indices, auto_correct_report
+from .formulas import (
+    PrecomputedIndices,
+    calculate_expected_chi,
+    calculate_expected_ssi,
+    normalize_mode,
+)
 from .modules_data_extractor import extract_ids_by_type, extract_modules_data
 from .report_parser import ParsedReport, parse_report
 
@@ -38,7 +43,8 @@ class FinalSynthesisValidator:
       - Structure checks (mandatory markers/sections, order)
       - Completeness checks (required fields)
       - Consistency checks (ID referential integrity, percentages)
-      - Index checks (CHI/SSI formulas)
+      - Index checks (CHI/SSI formulas; when indices were precomputed before
+        synthesis, mismatching values are overwritten instead of retried)
       - Insight checks (count and required links)
       - Adaptive mode rules (A/Б/В)
     """
@@ -64,7 +70,7 @@ class FinalSynthesisValidator:
     @staticmethod
     def _severity_penalty(sev: str) -> int:
         sev = sev.upper().strip()
-        return {"LOW": 5, "MEDIUM": 15, "HIGH": 30}.get(sev, 10)
+        return {"INFO": 0, "LOW": 5, "MEDIUM": 15, "HIGH": 30}.get(sev, 10)
 
     @staticmethod
     def _extract_mode(parsed: ParsedReport) -> str:
@@ -122,6 +128,7 @@ class FinalSynthesisValidator:
         raw_report: str,
         video_meta: Dict[str, Any],
         partial_responses: Optional[Dict[str, str]] = None,
+        precomputed_indices: Optional[PrecomputedIndices] = None,
     ) -> FinalSynthesisValidationResult:
         parsed = parse_report(raw_report)
         mode = self._extract_mode(parsed)
@@ -272,47 +279,85 @@ class FinalSynthesisValidator:
         reported_chi = self._extract_float_from_meta(parsed.strategic_meta, "CONTENT_HEALTH_INDEX")
         reported_ssi = self._extract_float_from_meta(parsed.strategic_meta, "STRATEGIC_STABILITY_INDEX")
 
-        calculated_chi = calculate_expected_chi(
-            mode=mode,
-            themes=themes,
-            emotions=emotions,
-            personas=personas,
-            risks=risks,
-            critical_signals_pct=None,
-            negative_pct=tone.get("Негативные") if tone else None,
-        )
-        calculated_ssi = calculate_expected_ssi(risks=risks, opportunities=opportunities)
+        negative_pct = tone.get("Негативные") if tone else None
+        if precomputed_indices is not None and negative_pct is not None and normalize_mode(mode) == "В":
+            # Mode В uses the report's negative tone share, known only after synthesis
+            chi_v = calculate_expected_chi(
+                mode="В",
+                themes=themes,
+                emotions=emotions,
+                personas=personas,
+                risks=risks,
+                negative_pct=negative_pct,
+            )
+            if chi_v is not None:
+                precomputed_indices = replace(
+                    precomputed_indices,
+                    chi_by_mode={**precomputed_indices.chi_by_mode, "В": round(chi_v, 1)},
+                )
+
+        if precomputed_indices is not None:
+            calculated_chi = precomputed_indices.chi_for_mode(mode)
+            calculated_ssi = precomputed_indices.strategic_stability_index
+        else:
+            calculated_chi = calculate_expected_chi(
+                mode=mode,
+                themes=themes,
+                emotions=emotions,
+                personas=personas,
+                risks=risks,
+                critical_signals_pct=None,
+                negative_pct=negative_pct,
+            )
+            calculated_ssi = calculate_expected_ssi(risks=risks, opportunities=opportunities)
 
         indices_calculated: Dict[str, Any] = {
             "CONTENT_HEALTH_INDEX": {"reported": reported_chi, "calculated": calculated_chi},
             "STRATEGIC_STABILITY_INDEX": {"reported": reported_ssi, "calculated": calculated_ssi},
+            "precomputed": precomputed_indices is not None,
         }
 
-        if reported_chi is not None and calculated_chi is not None:
-            deviation = abs(reported_chi - calculated_chi)
-            if deviation > self.chi_tolerance_points:
-                issues.append(ValidationIssue(
-                    type="CONTENT_HEALTH_MISMATCH",
-                    severity="MEDIUM",
-                    message=(
-                        f"CONTENT_HEALTH_INDEX не соответствует формуле (указано: {reported_chi:.1f}, "
-                        f"расчёт: {calculated_chi:.1f}, отклонение: {deviation:.1f}, допустимо: ±{self.chi_tolerance_points})"
-                    ),
-                    details={"reported": reported_chi, "calculated": calculated_chi, "deviation": deviation},
-                ))
+        # Working copy of the report; precomputed indices are written into it.
+        working_report = parsed.raw
+        indices_fixed = False
 
-        if reported_ssi is not None and calculated_ssi is not None:
-            deviation = abs(reported_ssi - calculated_ssi)
-            if deviation > self.ssi_tolerance:
+        if precomputed_indices is not None:
+            fixed = apply_fixed_indices(working_report, precomputed_indices.as_dict(mode))
+            if fixed.applied:
+                working_report = fixed.corrected_report
+                indices_fixed = True
                 issues.append(ValidationIssue(
-                    type="STRATEGIC_STABILITY_MISMATCH",
-                    severity="MEDIUM",
-                    message=(
-                        f"STRATEGIC_STABILITY_INDEX не соответствует формуле (указано: {reported_ssi:.2f}, "
-                        f"расчёт: {calculated_ssi:.2f}, отклонение: {deviation:.2f}, допустимо: ±{self.ssi_tolerance})"
-                    ),
-                    details={"reported": reported_ssi, "calculated": calculated_ssi, "deviation": deviation},
+                    type="INDICES_NORMALIZED",
+                    severity="INFO",
+                    message="Индексы в отчёте заменены на значения, рассчитанные до синтеза",
+                    details={"applied": fixed.applied, "indices": indices_calculated},
                 ))
+        else:
+            if reported_chi is not None and calculated_chi is not None:
+                deviation = abs(reported_chi - calculated_chi)
+                if deviation > self.chi_tolerance_points:
+                    issues.append(ValidationIssue(
+                        type="CONTENT_HEALTH_MISMATCH",
+                        severity="MEDIUM",
+                        message=(
+                            f"CONTENT_HEALTH_INDEX не соответствует формуле (указано: {reported_chi:.1f}, "
+                            f"расчёт: {calculated_chi:.1f}, отклонение: {deviation:.1f}, допустимо: ±{self.chi_tolerance_points})"
+                        ),
+                        details={"reported": reported_chi, "calculated": calculated_chi, "deviation": deviation},
+                    ))
+
+            if reported_ssi is not None and calculated_ssi is not None:
+                deviation = abs(reported_ssi - calculated_ssi)
+                if deviation > self.ssi_tolerance:
+                    issues.append(ValidationIssue(
+                        type="STRATEGIC_STABILITY_MISMATCH",
+                        severity="MEDIUM",
+                        message=(
+                            f"STRATEGIC_STABILITY_INDEX не соответствует формуле (указано: {reported_ssi:.2f}, "
+                            f"расчёт: {calculated_ssi:.2f}, отклонение: {deviation:.2f}, допустимо: ±{self.ssi_tolerance})"
+                        ),
+                        details={"reported": reported_ssi, "calculated": calculated_ssi, "deviation": deviation},
+                    ))
 
         # AUDIENCE_EVOLUTION_VECTOR format
         aev = parsed.strategic_meta.get("AUDIENCE_EVOLUTION_VECTOR")
@@ -384,7 +429,7 @@ class FinalSynthesisValidator:
         missing_sections = [i.details.get("section") for i in high_issues if i.type == "MISSING_SECTION"]
         non_recoverable_missing = [s for s in missing_sections if s and s != "ДАННЫЕ ДЛЯ АГРЕГАЦИИ"]
         retry_needed = bool(high_issues) and bool(non_recoverable_missing or any(i.type != "MISSING_MARKER" and i.type != "MISSING_SECTION" for i in high_issues))
-        corrected_report = None
+        corrected_report = working_report if indices_fixed else None
 
         # Prepare IDs used for aggregation block (best-effort)
         used_ids = {
@@ -406,7 +451,7 @@ class FinalSynthesisValidator:
             )
             if not high_issues or only_recoverable_high:
                 corr = auto_correct_report(
-                    raw_report=parsed.raw,
+                    raw_report=working_report,
                     video_id=video_id or "unknown",
                     mode=mode,
                     indices=indices_for_block,
@@ -155,3 +155,74 @@ def calculate_expected_ssi(*, risks: List[Dict], opportunities: List[Dict]) -> O
     avg_risk = _safe_mean(risk_iuv) or 0.0
     # Spec: (opps/(risks+1)) * (avg_opp/(avg_risk+0.1))
     return (num_opps / (num_risks + 1.0)) * (avg_opp / (avg_risk + 0.1))
+
+
+_CHI_MODES = ("А", "Б", "В")
+
+
+def normalize_mode(mode: str) -> str:
+    """Map Latin/Cyrillic mode letters to the Cyrillic А/Б/В used in the spec."""
+    mode_norm = (mode or "").strip().upper()
+    if mode_norm in {"A", "А"}:
+        return "А"
+    if mode_norm in {"B", "Б"}:
+        return "Б"
+    return "В"
+
+
+@dataclass
+class PrecomputedIndices:
+    """Indices calculated locally before the final synthesis request.
+
+    The mode (А/Б/В) is chosen by the model during synthesis, so CHI is
+    precomputed for every mode and resolved once the report states its mode.
+    """
+
+    chi_by_mode: Dict[str, Optional[float]]
+    strategic_stability_index: Optional[float] = None
+    positive_percentage: Optional[float] = None
+
+    def chi_for_mode(self, mode: str) -> Optional[float]:
+        return self.chi_by_mode.get(normalize_mode(mode))
+
+    def as_dict(self, mode: str) -> Dict[str, Optional[float]]:
+        return {
+            "CONTENT_HEALTH_INDEX": self.chi_for_mode(mode),
+            "STRATEGIC_STABILITY_INDEX": self.strategic_stability_index,
+        }
+
+
+def precompute_indices(modules_data: Dict, negative_pct: Optional[float] = None) -> PrecomputedIndices:
+    """Calculate CHI (for all modes) and SSI from parsed module tables.
+
+    `modules_data` is the structure returned by
+    `modules_data_extractor.extract_modules_data`. `negative_pct` is the
+    report's negative tone share (problem density of mode В); before
+    synthesis it is unknown and the formula's default is used.
+    """
+    themes = (modules_data.get("10-1") or {}).get("themes", [])
+    emotions = (modules_data.get("10-2") or {}).get("emotions", [])
+    personas = (modules_data.get("10-3") or {}).get("personas", [])
+    risks = (modules_data.get("10-4") or {}).get("risks", [])
+    opportunities = (modules_data.get("10-4") or {}).get("opportunities", [])
+
+    chi_by_mode: Dict[str, Optional[float]] = {}
+    for mode in _CHI_MODES:
+        chi = calculate_expected_chi(
+            mode=mode,
+            themes=themes,
+            emotions=emotions,
+            personas=personas,
+            risks=risks,
+            negative_pct=negative_pct,
+        )
+        chi_by_mode[mode] = round(chi, 1) if chi is not None else None
+
+    ssi = calculate_expected_ssi(risks=risks, opportunities=opportunities)
+    positive = calculate_positive_percentage_from_emotions(emotions)
+
+    return PrecomputedIndices(
+        chi_by_mode=chi_by_mode,
+        strategic_stability_index=round(ssi, 2) if ssi is not None else None,
+        positive_percentage=round(positive, 1) if positive is not None else None,
+    )
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from .formulas import PrecomputedIndices, precompute_indices
+from .modules_data_extractor import extract_modules_data
+
+
+def precompute_synthesis_indices(partial_responses: Dict[str, str]) -> PrecomputedIndices:
+    """Pre-synthesis stage: calculate indices from module outputs 10-1..10-4.
+
+    The result is injected into the synthesis request as fixed values and later
+    handed to `FinalSynthesisValidator`, so the model never has to do the
+    arithmetic itself.
+    """
+    return precompute_indices(extract_modules_data(partial_responses or {}))
+
+
+def _fmt(value: Optional[float], digits: int) -> str:
+    if value is None:
+        return "Нет данных"
+    return f"{value:.{digits}f}"
+
+
+def build_fixed_indices_prompt(indices: PrecomputedIndices) -> str:
+    """Instruction block appended to the synthesis prompt."""
+    lines = [
+        "ФИКСИРОВАННЫЕ ИНДЕКСЫ (рассчитаны системой по таблицам модулей 10-1..10-4):",
+        f"- CONTENT_HEALTH_INDEX для режима А: {_fmt(indices.chi_by_mode.get('А'), 1)}",
+        f"- CONTENT_HEALTH_INDEX для режима Б: {_fmt(indices.chi_by_mode.get('Б'), 1)}",
+        f"- CONTENT_HEALTH_INDEX для режима В: {_fmt(indices.chi_by_mode.get('В'), 1)}",
+        f"- STRATEGIC_STABILITY_INDEX: {_fmt(indices.strategic_stability_index, 2)}",
+    ]
+    if indices.positive_percentage is not None:
+        lines.append(f"- Доля позитивных эмоций: {indices.positive_percentage:.1f}%")
+    lines.append(
+        "Не пересчитывай эти индексы. В 'СТРАТЕГИЧЕСКИЕ МЕТА-ДАННЫЕ' и в блоке "
+        "'ДАННЫЕ ДЛЯ АГРЕГАЦИИ' укажи значения без изменений "
+        "(CONTENT_HEALTH_INDEX — для выбранного режима анализа)."
+    )
+    return "\n".join(lines)
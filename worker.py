@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.client.default import DefaultBotProperties
+from config import Config
+from database.engine import create_db
+from database.crud import run_cache_invalidation_listener
+from services.analysis_queue import run_analysis_worker
+from services.pdf_render_service import get_pdf_render_service
+
+logging.basicConfig(level=logging.INFO)
+
+async def main():
+    config = Config()
+    if not config.BOT_TOKEN:
+        raise RuntimeError("BOT_TOKEN is required in .env to run the analysis worker")
+    if not config.DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is required in .env")
+
+    # Worker does not poll updates: it only sends progress/results via Bot API
+    bot = Bot(
+        token=config.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+
+    await create_db()
+    get_pdf_render_service().start()
+
+    # Prompt/user edits in the admin panel invalidate the in-memory prompt registry and user cache
+    asyncio.create_task(run_cache_invalidation_listener())
+
+    logging.info("🛠 Analysis worker ishga tushdi...")
+
+    try:
+        await run_analysis_worker(bot, concurrency=config.ANALYSIS_WORKER_CONCURRENCY)
+    finally:
+        await bot.session.close()
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logging.info("❌ Worker to'xtatildi")